@@ -3,9 +3,12 @@ from typing import *
 from typing import List
 from enums import *
 from stroke import *
+import sys
 import tkinter as tk
 from copy import copy
 from stroke import  List, Stroke
+from stroke_store import StrokeStore
+from journal import Entry, stroke_entry
 
 
 class Action():
@@ -13,11 +16,42 @@ class Action():
     Base class for actions performed on strokes in the canvas.
 
     Attributes:
-        painter_strokes (List[Stroke]): List of all strokes on the canvas. (pointer to the list the painter holds)
+        painter_strokes (StrokeStore): All strokes on the canvas, in layer order. (pointer to the strokes the painter holds)
     """
 
-    def __init__(self, painter_strokes: List[Stroke]) -> None:
+    def __init__(self, painter_strokes: StrokeStore) -> None:
         self.painter_strokes = painter_strokes
+        self.strokes: List[Stroke] = []
+
+    def memory_size(self) -> int:
+        """Estimate the memory the action keeps alive in bytes.
+        strokes that are on the canvas are not counted, only the ones kept alive by the action.
+        """
+        return sys.getsizeof(self) + sys.getsizeof(self.__dict__) + sys.getsizeof(self.strokes) + \
+            sum(stroke.memory_size() for stroke in self.strokes if stroke not in self.painter_strokes)
+
+    def release(self) -> None:
+        """Drop the references the action holds, called when the action is removed from the history."""
+        self.strokes = []
+
+    def remap_keys(self, remap: Callable[[float], float]) -> None:
+        """Move the layer keys the action keeps to a new numbering, see ZOrder.renumber.
+        the keys of the strokes themselves (stroke.z) are moved by the history.
+        """
+        pass
+
+    def journal(self) -> Union[Literal[None], List[Entry]]:
+        """Describe the changes the action made for the autosave journal.
+        called right after the action was done, or on the action returned by undo / redo.
+
+        Returns:
+            Union[None, List[Entry]]: the journal entries, None if the whole drawing has to be saved again
+        """
+        entries = [stroke_entry(stroke) for stroke in self.strokes if stroke in self.painter_strokes]
+        removed = [stroke.id for stroke in self.strokes if stroke not in self.painter_strokes]
+        if len(removed):
+            entries.append({"op": "remove", "ids": removed})
+        return entries
     
     def undo(self) -> Any:
         """
@@ -39,7 +73,7 @@ class Action():
 class CreateAction(Action):
     """a create action
     """
-    def __init__(self, painter_strokes: List[Stroke], strokes: List[Stroke]) -> None:
+    def __init__(self, painter_strokes: StrokeStore, strokes: List[Stroke]) -> None:
         super().__init__(painter_strokes)
         self.strokes = strokes
         
@@ -50,16 +84,17 @@ class CreateAction(Action):
         return CreateAction(strokes=self.strokes, painter_strokes=self.painter_strokes)
     
     def redo(self) -> Action:
-        for stroke in self.strokes:
-            self.painter_strokes.append(stroke)
+        # bottom to top, so every stroke is put above a stroke that is already in place
+        for stroke in self.painter_strokes.restore_many(self.strokes):
             stroke.paint()
+            self.painter_strokes.restack(stroke)
         return CreateAction(strokes=self.strokes, painter_strokes=self.painter_strokes)
 
 
 class ChangePropAction(Action):
     """a change properties action.
     """
-    def __init__(self, painter_strokes: List[Stroke], strokes:List[Stroke], og_props: List[Dict[str, Any]]) -> None:
+    def __init__(self, painter_strokes: StrokeStore, strokes:List[Stroke], og_props: List[Dict[str, Any]]) -> None:
         super().__init__(painter_strokes)
         self.strokes = strokes
         self.og_props = og_props
@@ -73,37 +108,114 @@ class ChangePropAction(Action):
                     new_props[i][prop] = getattr(stroke, prop)
                     setattr(stroke, prop,self.og_props[i][prop])
                     stroke.paint()
+            if stroke in self.painter_strokes:
+                self.painter_strokes.restack(stroke)
         return ChangePropAction(self.painter_strokes, strokes=self.strokes, og_props=new_props)
                     
     def redo(self) -> Action:
         return self.undo()
 
+    def memory_size(self) -> int:
+        size = super().memory_size() + sys.getsizeof(self.og_props)
+        for props in self.og_props:
+            size += sys.getsizeof(props)
+            for value in props.values():
+                size += sys.getsizeof(value)
+                if isinstance(value, list):
+                    size += sum(sys.getsizeof(item) for item in value)
+        return size
+
+    def release(self) -> None:
+        super().release()
+        self.og_props = []
+
+class TranslateAction(Action):
+    """a move strokes action, keeps only the ids of the moved strokes and the offset.
+
+    Attributes:
+        stroke_ids (List[int]): the ids of the moved strokes.
+        dx (int): the horizontal offset of the move.
+        dy (int): the vertical offset of the move.
+        nudge (bool): whether the move was made with the keyboard, following nudges are merged into it.
+    """
+    def __init__(self, painter_strokes: StrokeStore, stroke_ids: List[int], dx: int, dy: int, nudge: bool = False) -> None:
+        super().__init__(painter_strokes)
+        self.stroke_ids = stroke_ids
+        self.dx = dx
+        self.dy = dy
+        self.nudge = nudge
+
+    def undo(self) -> Action:
+        for stroke_id in self.stroke_ids:
+            stroke = self.painter_strokes.get(stroke_id)
+            if stroke:
+                # moves the drawn items in place, nothing is repainted
+                stroke.move(-self.dx, -self.dy)
+        return TranslateAction(self.painter_strokes, self.stroke_ids, -self.dx, -self.dy)
+
+    def redo(self) -> Action:
+        return self.undo()
+
+    def memory_size(self) -> int:
+        return super().memory_size() + sys.getsizeof(self.stroke_ids) + len(self.stroke_ids) * sys.getsizeof(0)
+
+    def journal(self) -> Union[Literal[None], List[Entry]]:
+        return [{"op": "move", "ids": self.stroke_ids, "dx": self.dx, "dy": self.dy}]
+
+    def merge(self, stroke_ids: List[int], dx: int, dy: int) -> bool:
+        """Add a nudge to this action if it moved the same strokes.
+
+        Returns:
+            bool: True if the nudge was merged
+        """
+        if not self.nudge or set(stroke_ids) != set(self.stroke_ids):
+            return False
+        self.dx += dx
+        self.dy += dy
+        return True
+
+
 class ChangeOrderAction(Action):
     """a change order of strokes action
+
+    Attributes:
+        og_keys (List[Tuple[Stroke, float]]): the moved strokes and their layer keys before the move.
     """
-    def __init__(self, painter_strokes: List[Stroke], og_indexes:List[int], canvas:tk.Canvas) -> None:
+    def __init__(self, painter_strokes: StrokeStore, og_keys: List[Tuple[Stroke, float]]) -> None:
         super().__init__(painter_strokes)
-        self.og_indexes = og_indexes
-        self.canvas = canvas
+        self.og_keys = og_keys
         
     def undo(self) -> Action:
-        new_indexes = [self.og_indexes.index(i) for i, _ in enumerate(self.og_indexes)]
-        self.copied_strokes = [i for i in self.painter_strokes]
-        self.painter_strokes.sort(key=lambda stroke: self.og_indexes[self.copied_strokes.index(stroke)])
-        for stroke in self.painter_strokes:
-            for p in stroke.tk_painting:
-                self.canvas.tag_raise(p)
+        new_keys = [(stroke, stroke.z) for stroke, _ in self.og_keys]
+        for stroke, key in self.og_keys:
+            self.painter_strokes.set_key(stroke, key)
+        # bottom to top, so every stroke is put above a stroke that is already in place
+        for stroke in self.painter_strokes.sorted(stroke for stroke, _ in self.og_keys):
+            self.painter_strokes.restack(stroke)
             
-        return ChangeOrderAction(self.painter_strokes, og_indexes=new_indexes, canvas=self.canvas)
+        return ChangeOrderAction(self.painter_strokes, og_keys=new_keys)
     
     def redo(self) -> Action:
         return self.undo()
+
+    def memory_size(self) -> int:
+        return super().memory_size() + sys.getsizeof(self.og_keys) + len(self.og_keys) * (sys.getsizeof((None, 0.0)) + sys.getsizeof(0.0))
+
+    def release(self) -> None:
+        super().release()
+        self.og_keys = []
+
+    def remap_keys(self, remap: Callable[[float], float]) -> None:
+        self.og_keys = [(stroke, remap(key)) for stroke, key in self.og_keys]
+
+    def journal(self) -> Union[Literal[None], List[Entry]]:
+        return [{"op": "z", "keys": [[stroke.id, stroke.z] for stroke, _ in self.og_keys]}]
     
 
 class ClearCanvasAction(Action):
     """clear canvas action
     """
-    def __init__(self, painter_strokes: List[Stroke], strokes: List[Stroke], canvas:tk.Canvas) -> None:
+    def __init__(self, painter_strokes: StrokeStore, strokes: List[Stroke], canvas:tk.Canvas) -> None:
         super().__init__(painter_strokes)
         self.canvas = canvas
         self.strokes = strokes
@@ -115,7 +227,7 @@ class ClearCanvasAction(Action):
         return ClearCanvasAction(self.painter_strokes, self.strokes, self.canvas)
     
     def redo(self) -> Action:
-        action =  ClearCanvasAction(self.painter_strokes, [i for i in self.painter_strokes], self.canvas)
+        action =  ClearCanvasAction(self.painter_strokes, list(self.painter_strokes), self.canvas)
         self.canvas.delete("all")
         self.painter_strokes.clear()
         return action
@@ -123,15 +235,15 @@ class ClearCanvasAction(Action):
 class LoadJsonAction(Action):
     """load data from json file action
     """
-    def __init__(self, painter_strokes: List[Stroke], strokes: List[Stroke]) -> None:
+    def __init__(self, painter_strokes: StrokeStore, strokes: List[Stroke]) -> None:
         super().__init__(painter_strokes)
         self.strokes = strokes
     
     def undo(self) -> Action:
-        old_strokes = copy(self.painter_strokes)
-        for stroke in [i for i in self.painter_strokes]:
+        old_strokes = list(self.painter_strokes)
+        for stroke in old_strokes:
             stroke.delete()
-            self.painter_strokes.remove(stroke)
+        self.painter_strokes.clear()
         for stroke in self.strokes:
             self.painter_strokes.append(stroke)
             stroke.paint()
@@ -139,15 +251,20 @@ class LoadJsonAction(Action):
     
     def redo(self) -> Action:
         return self.undo()
+
+    def journal(self) -> Union[Literal[None], List[Entry]]:
+        # the whole drawing was replaced
+        return None
     
 class DeleteAction(Action):
-    def __init__(self, painter_strokes: List[Stroke], strokes_deleted: List[Stroke]) -> None:
+    def __init__(self, painter_strokes: StrokeStore, strokes_deleted: List[Stroke]) -> None:
         super().__init__(painter_strokes)
         self.strokes = strokes_deleted
     def undo(self) -> Action:
-        for stroke in self.strokes:
-            self.painter_strokes.append(stroke)
+        # bottom to top, so every stroke is put above a stroke that is already in place
+        for stroke in self.painter_strokes.restore_many(self.strokes):
             stroke.paint()
+            self.painter_strokes.restack(stroke)
         return DeleteAction(painter_strokes=self.painter_strokes, strokes_deleted=self.strokes)
     def redo(self) -> Action:
         for stroke in self.strokes:
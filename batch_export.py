@@ -0,0 +1,188 @@
+"""Export many saved canvas files to PNG and SVG at once, on all the cores, without Tk.
+
+run from the repository root:
+    python -m batch_export saves/ "more/canvas-data-*.json" --out-dir exported --formats png svg --jobs 8
+
+every input file is exported to <out dir>/<file name without .json/.json.gz>.<format>, existing
+outputs are overwritten so running again gives the same files.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import *
+
+from helper_funcs.save_funcs import read_canvas_data
+from render import CANVAS_SIZE, report_missing_fonts, take_missing_fonts, write_png, write_svg
+
+FORMATS = ("png", "svg")
+
+
+class Result(NamedTuple):
+    """The outcome of exporting one file.
+
+    Attributes:
+        input_path (str): the saved canvas file.
+        outputs (List[str]): the files written.
+        seconds (float): the time the export took.
+        error (str): what went wrong, "" if the export succeeded.
+        missing_fonts (Dict[str, int]): the fonts missing from the assets, and how many texts were drawn with a fallback.
+    """
+    input_path: str
+    outputs: List[str]
+    seconds: float
+    error: str
+    missing_fonts: Dict[str, int] = {}
+
+
+def find_inputs(patterns: Iterable[str]) -> List[str]:
+    """Find the saved canvas files to export.
+
+    Args:
+        patterns (Iterable[str]): files, directories (all the .json and .json.gz files in them) or glob patterns
+
+    Returns:
+        List[str]: the files, sorted and without duplicates
+    """
+    paths: Set[str] = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.update(glob.glob(os.path.join(pattern, "*.json")))
+            paths.update(glob.glob(os.path.join(pattern, "*.json.gz")))
+        elif os.path.isfile(pattern):
+            paths.add(pattern)
+        else:
+            paths.update(path for path in glob.glob(pattern) if os.path.isfile(path))
+    return sorted(paths)
+
+
+def output_stem(input_path: str) -> str:
+    """The name of the outputs of a file, the file name without its .json/.json.gz extension."""
+    name = os.path.basename(input_path)
+    for extension in (".json.gz", ".json"):
+        if name.lower().endswith(extension):
+            return name[:-len(extension)]
+    return os.path.splitext(name)[0]
+
+
+def export_file(input_path: str, out_dir: str, formats: Sequence[str], size: Tuple[int, int], scale: float,
+                dpi: Union[Literal[None], float] = None) -> Result:
+    """Export one saved canvas file, runs in the worker processes.
+
+    Args:
+        input_path (str): the saved canvas file
+        out_dir (str): the directory to write the outputs to
+        formats (Sequence[str]): the formats to export to, png and/or svg
+        size (Tuple[int, int]): the size of the canvas
+        scale (float): how much to enlarge the images
+        dpi (float, optional): the resolution to print the PNG images at, instead of the scale. Default is the scale.
+
+    Returns:
+        Result: the outputs written and the time it took, or the error
+    """
+    start = time.perf_counter()
+    outputs: List[str] = []
+    take_missing_fonts()
+    try:
+        records = read_canvas_data(input_path)
+        stem = os.path.join(out_dir, output_stem(input_path))
+        if "png" in formats:
+            # drawn in strips, the memory stays bounded however large the image is
+            write_png(records, stem + ".png", size, scale, dpi)
+            outputs.append(stem + ".png")
+        if "svg" in formats:
+            write_svg(records, stem + ".svg", size, scale)
+            outputs.append(stem + ".svg")
+    except Exception as error:
+        return Result(input_path, outputs, time.perf_counter() - start, f"{type(error).__name__}: {error}", take_missing_fonts())
+    return Result(input_path, outputs, time.perf_counter() - start, "", take_missing_fonts())
+
+
+def export_files(inputs: Sequence[str], out_dir: str, formats: Sequence[str] = FORMATS, jobs: Union[Literal[None], int] = None,
+                 size: Tuple[int, int] = CANVAS_SIZE, scale: float = 1, dpi: Union[Literal[None], float] = None) -> Iterator[Result]:
+    """Export saved canvas files in parallel processes.
+
+    Args:
+        inputs (Sequence[str]): the saved canvas files
+        out_dir (str): the directory to write the outputs to, created if missing
+        formats (Sequence[str], optional): the formats to export to. Default is png and svg.
+        jobs (int, optional): the number of processes. Default is the number of cores.
+        size (Tuple[int, int], optional): the size of the canvas. Default is 640x480.
+        scale (float, optional): how much to enlarge the images. Default is 1.
+        dpi (float, optional): the resolution to print the PNG images at, instead of the scale. Default is the scale.
+
+    Yields:
+        Result: the outcome of every file, in the order they finish
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    # the outputs are named after the inputs, two inputs with the same name would overwrite each other
+    stems: Dict[str, str] = {}
+    unique: List[str] = []
+    for input_path in inputs:
+        stem = output_stem(input_path)
+        if stem in stems:
+            yield Result(input_path, [], 0.0, f"same output name as {stems[stem]}")
+            continue
+        stems[stem] = input_path
+        unique.append(input_path)
+
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(unique) <= 1:
+        for input_path in unique:
+            yield export_file(input_path, out_dir, formats, size, scale, dpi)
+        return
+    with ProcessPoolExecutor(max_workers=min(jobs, len(unique))) as executor:
+        futures = {executor.submit(export_file, input_path, out_dir, formats, size, scale, dpi): input_path for input_path in unique}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as error:
+                # the worker process died (killed, out of memory, crashed in PIL), the pool is broken
+                # and the files that were not exported yet fail with it
+                result = Result(futures[future], [], 0.0, f"{type(error).__name__}: {error}")
+            yield result
+
+
+def main(argv: Union[Literal[None], List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m batch_export", description="Export saved canvas files to PNG and SVG in parallel.")
+    parser.add_argument("inputs", nargs="+", help="saved canvas files, directories of them or glob patterns")
+    parser.add_argument("--out-dir", default="exported", help="the directory to write the images to (default: exported)")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS), help="the formats to export to (default: png svg)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="the number of processes (default: the number of cores)")
+    parser.add_argument("--scale", type=float, default=1, help="how much to enlarge the images (default: 1)")
+    parser.add_argument("--dpi", type=float, help="the resolution to print the PNG images at, the canvas is shown at 96 dpi (overrides --scale)")
+    parser.add_argument("--width", type=int, default=CANVAS_SIZE[0], help=f"the width of the canvas (default: {CANVAS_SIZE[0]})")
+    parser.add_argument("--height", type=int, default=CANVAS_SIZE[1], help=f"the height of the canvas (default: {CANVAS_SIZE[1]})")
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    inputs = find_inputs(args.inputs)
+    if not len(inputs):
+        print("no saved canvas files found", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    failed: List[Result] = []
+    missing: "Counter[str]" = Counter()
+    for done, result in enumerate(export_files(inputs, args.out_dir, args.formats, args.jobs, (args.width, args.height), args.scale, args.dpi), 1):
+        status = "FAILED " + result.error if result.error else "ok"
+        print(f"[{done}/{len(inputs)}] {result.input_path}: {result.seconds * 1000:.1f} ms {status}")
+        if result.error:
+            failed.append(result)
+        missing.update(result.missing_fonts)
+
+    elapsed = time.perf_counter() - start
+    print(f"exported {len(inputs) - len(failed)} of {len(inputs)} files in {elapsed:.2f}s "
+          f"({len(inputs) / max(elapsed, 1e-9):.1f} files/s, {args.jobs} jobs)")
+    report_missing_fonts(missing)
+    for result in failed:
+        print(f"failed: {result.input_path}: {result.error}", file=sys.stderr)
+    return 1 if len(failed) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""Benchmark the scalar geometry functions against their vectorized counterparts.
+
+run from the repository root:
+    python benchmarks/bench_calc_points.py --sizes 1000 10000 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import *
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+
+from helper_funcs.calc_points_funcs import *
+from helper_funcs import batch_calc_points_funcs
+
+
+def timed(function: Callable[[], Any], repeat: int = 3) -> float:
+    """Run a function a few times and return the best time in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def bench(size: int) -> Dict[str, Tuple[float, float]]:
+    """Time every scalar function and its vectorized counterpart on `size` inputs.
+
+    Args:
+        size (int): number of points / shapes / edges
+
+    Returns:
+        Dict[str, Tuple[float, float]]: for each case, the scalar and the vectorized time in milliseconds
+    """
+    random.seed(size)
+    points = [(random.randint(0, 640), random.randint(0, 480)) for _ in range(size)]
+    points_array = np.array(points)
+    A, B, C = (100, 400), (320, 50), (540, 400)
+    triangles = [((x, y), (x + 40, y + 80), (x + 80, y)) for x, y in points]
+    triangles_array = np.array(triangles)
+    ovals = [(x, y, x + 60, y + 30) for x, y in points]
+    ovals_array = np.array(ovals)
+    edges = list(zip(points, points[1:] + points[:1]))
+    x0, y0 = points_array[:, 0], points_array[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+
+    return {
+        "points in triangle": (
+            timed(lambda: [is_point_inside_triangle(p, A, B, C) for p in points]),
+            timed(lambda: batch_calc_points_funcs.are_points_inside_triangle(points_array, A, B, C))),
+        "points in oval": (
+            timed(lambda: [is_point_inside_oval(p, (100, 50), (540, 400)) for p in points]),
+            timed(lambda: batch_calc_points_funcs.are_points_inside_oval(points_array, (100, 50), (540, 400)))),
+        "point in triangles": (
+            timed(lambda: [is_point_inside_triangle((320, 240), *t) for t in triangles]),
+            timed(lambda: batch_calc_points_funcs.is_point_inside_triangles((320, 240), triangles_array))),
+        "point in ovals": (
+            timed(lambda: [is_point_inside_oval((320, 240), o[:2], o[2:]) for o in ovals]),
+            timed(lambda: batch_calc_points_funcs.is_point_inside_ovals((320, 240), ovals_array))),
+        "points on edges": (
+            timed(lambda: [calculate_points_on_line(*p, *q) for p, q in edges]),
+            timed(lambda: batch_calc_points_funcs.calculate_points_on_lines(x0, y0, x1, y1))),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    print(f"{'case':<20}{'size':>8}{'scalar ms':>12}{'numpy ms':>12}{'speedup':>10}")
+    for size in args.sizes:
+        for case, (scalar, vectorized) in bench(size).items():
+            print(f"{case:<20}{size:>8}{scalar:>12.2f}{vectorized:>12.2f}{scalar / vectorized:>9.1f}x")
@@ -0,0 +1,93 @@
+"""Benchmark drawing a long freestyle stroke, one line item per segment vs a single polyline item.
+
+run from the repository root (needs a display):
+    python benchmarks/bench_freestyle.py --points 10000
+"""
+import argparse
+import math
+import os
+import sys
+import time
+from typing import *
+
+import tkinter as tk
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from components.document_canvas import DocumentCanvas
+from stroke import FreeStyleStroke
+
+
+def stroke_points(count: int) -> List[Tuple[int, int]]:
+    """Generate the points of a wavy stroke across the canvas.
+
+    Args:
+        count (int): number of points
+
+    Returns:
+        List[Tuple[int, int]]: the points
+    """
+    return [(20 + (i * 600) // count, 240 + int(200 * math.sin(i / 50))) for i in range(count)]
+
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def bench(canvas: DocumentCanvas, points: List[Tuple[int, int]], polyline: bool) -> Dict[str, float]:
+    """Draw one stroke point by point like <B1-Motion> does, then time the canvas-wide operations.
+
+    Args:
+        canvas (DocumentCanvas): the canvas to draw on
+        points (List[Tuple[int, int]]): the points of the stroke
+        polyline (bool): whether to use the single polyline item mode
+
+    Returns:
+        Dict[str, float]: the results, times are in milliseconds
+    """
+    FreeStyleStroke.polyline = polyline
+    canvas.delete("all")
+    stroke = FreeStyleStroke(*points[0], color="#ffffff", width=3, canvas=canvas)
+    latencies = []
+    for x, y in points[1:]:
+        start = time.perf_counter()
+        stroke.continue_stroke(x, y)
+        canvas.update_idletasks()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    results = {
+        "items": len(canvas.find_all()),
+        "event_mean_ms": sum(latencies) / len(latencies),
+        "event_p95_ms": percentile(latencies, 0.95),
+        "event_last_100_mean_ms": sum(latencies[-100:]) / len(latencies[-100:]),
+    }
+
+    for name, operation in [("paint_ms", stroke.paint),
+                            ("tag_raise_ms", lambda: [canvas.tag_raise(i) for i in stroke.tk_painting]),
+                            ("bbox_ms", lambda: canvas.bbox("all")),
+                            ("delete_all_ms", lambda: canvas.delete("all"))]:
+        start = time.perf_counter()
+        operation()
+        canvas.update_idletasks()
+        results[name] = (time.perf_counter() - start) * 1000
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=10000)
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    canvas = DocumentCanvas(root, width=640, height=480, bg="#000000")
+    canvas.pack()
+    root.update()
+
+    points = stroke_points(args.points)
+    for polyline in (False, True):
+        results = bench(canvas, points, polyline)
+        print(f"{'polyline' if polyline else 'per-segment':>12}: " +
+              ", ".join(f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+                        for key, value in results.items()))
+    root.destroy()
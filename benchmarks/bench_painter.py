@@ -0,0 +1,250 @@
+"""Benchmark the painter hot paths on synthetic drawings, without a display (see headless.py).
+
+every size gets a fresh painter with a drawing of that many strokes, spread over a document that grows with it
+(about a thousand strokes per window). then a quarter of the document is selected, dragged, moved to the front
+and to the back, the three actions are undone and redone, the view is scrolled, and the drawing is saved, loaded
+back and exported.
+each operation includes the idle work it schedules (the culling of the viewport), the save, the load and the
+export run until the worker finished. last the drawing is cleared with autosave on: the history must count the
+cleared strokes, and recovering the autosave of the cleared drawing must give nothing back. every size is run
+with the strokes as canvas items (culled by the viewport) and with the raster cache, see --raster-cache.
+
+the times and the canvas calls of every operation are written as JSON, for comparing runs:
+    python benchmarks/bench_painter.py --strokes 1000 10000 100000 --output bench_painter.json
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from typing import *
+
+import tkinter as tk
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from headless import HeadlessTk, event
+from enums import State
+from helper_funcs.save_funcs import Record
+from journal import Journal
+from painter import Painter
+
+# strokes per window of 640x480 in the generated drawings
+DENSITY = 1000
+
+
+def document_size(strokes: int) -> Tuple[int, int]:
+    """The size of a document that has about DENSITY strokes per window."""
+    scale = max(1.0, math.sqrt(strokes / DENSITY))
+    return round(640 * scale), round(480 * scale)
+
+
+def make_drawing(strokes: int, size: Tuple[int, int], points: int = 20) -> List[Record]:
+    """Generate the records of a drawing over a document: mostly freestyle strokes, with shapes, polygons and texts."""
+    random.seed(strokes)
+    colors = ["#ffffff", "#ff0000", "#00ff00", "#0000ff"]
+    records = []
+    for i in range(strokes):
+        record: Record = {"type": "FreeStyleStroke", "coordinates": [], "color": random.choice(colors), "fill": "",
+                          "width": random.randint(1, 9), "font": "", "font_size": "", "shape": "",
+                          "italic": "", "bold": "", "text": ""}
+        x, y = random.randint(0, size[0]), random.randint(0, size[1])
+        kind = i % 10
+        if kind == 0:
+            record.update(type="ShapeStroke", shape=random.choice(["RECT", "OVAL"]), coordinates=[(x, y), (x + 40, y + 30)])
+        elif kind == 1:
+            record.update(type="TriangleStroke", shape="TRIANGLE", coordinates=[(x, y), (x + 30, y + 40)])
+        elif kind == 2:
+            record.update(type="PolygonStroke", coordinates=[(x, y), (x + 30, y + 5), (x + 20, y + 30), (x - 5, y + 20)])
+        elif kind == 3:
+            record.update(type="TextStroke", coordinates=[(x, y)], font="Arial", font_size=14,
+                          italic=False, bold=False, text=f"text {i}")
+        else:
+            for _ in range(points):
+                x, y = x + random.randint(-6, 6), y + random.randint(-6, 6)
+                record["coordinates"].append((x, y))
+        records.append(record)
+    return records
+
+
+def make_painter(root: HeadlessTk, size: Tuple[int, int], raster_cache: bool = False) -> Painter:
+    """A painter like the application creates, handling every motion event as it comes."""
+    frame = tk.Frame(root)
+    return Painter(frame, root=root,
+                   color=tk.StringVar(frame, "#ffffff"),
+                   fill=tk.StringVar(frame, ""),
+                   state=tk.StringVar(frame, State.SELECT.value),
+                   font=tk.StringVar(frame, "Arial"),
+                   font_size=tk.IntVar(frame, 14),
+                   width=tk.IntVar(frame, 3),
+                   bold=tk.BooleanVar(frame, False),
+                   italic=tk.BooleanVar(frame, False),
+                   frame_rate=0,
+                   raster_cache=raster_cache,
+                   document_size=size)
+
+
+def draw(root: HeadlessTk, painter: Painter, records: List[Record]) -> None:
+    """Paint the strokes of a drawing like loading a file does, and let the viewport cull them."""
+    for record in records:
+        stroke = painter.stroke_from_record(record)
+        stroke.paint()
+        painter.strokes.append(stroke)
+    root.update()
+
+
+def drag(painter: Painter, start: Tuple[int, int], end: Tuple[int, int], steps: int) -> None:
+    """Press, move in steps and release the left button, at points of the window."""
+    for step in range(steps + 1):
+        x = start[0] + (end[0] - start[0]) * step // steps
+        y = start[1] + (end[1] - start[1]) * step // steps
+        painter.queue_drag(event(painter.canvas, x, y))
+    painter.handle_btn_release()
+
+
+def teardown(root: HeadlessTk) -> None:
+    """Destroy a root once the painters on it are closed (their exporters), and collect the painters.
+
+    the idle jobs of the viewports and the raster caches are run first, Tcl would run them after the root
+    is gone (invalid command name "...flush"). the painters are collected here on the main thread: collected
+    by gc on the thread of a canvas loader of a later run, their Tk variables fail to be deleted there
+    (main thread is not in main loop) and that load takes seconds longer.
+    """
+    root.update()
+    root.destroy()
+    gc.collect()
+
+
+def check_renumber(root: HeadlessTk) -> None:
+    """Undo a move to the back after the layer keys were renumbered: the stroke must go back to its layer.
+
+    a stroke is moved to the back, then the top stroke is moved to the same place again and again until
+    the keys there run out of precision and all the keys are renumbered.
+    """
+    painter = make_painter(root, (640, 480))
+    draw(root, painter, make_drawing(200, (640, 480)))
+    strokes = list(painter.strokes)
+    painter.selected_strokes.append(strokes[50])
+    painter.move_forward_backward_selected(False)
+    painter.remove_select()
+    renumbers = painter.strokes.renumbers
+    while painter.strokes.renumbers == renumbers:
+        painter.strokes.move_to(painter.strokes.ordered[-1], 3)
+    painter.undo()
+    ordered = list(painter.strokes)
+    i = ordered.index(strokes[50])
+    assert ordered[i - 1] is strokes[49] and ordered[i + 1] is strokes[51], \
+        f"the stroke went back between strokes {strokes.index(ordered[i - 1])} and {strokes.index(ordered[i + 1])}"
+    painter.exporter.close()
+
+
+def bench(root: HeadlessTk, painter: Painter, directory: str) -> Dict[str, Dict[str, Any]]:
+    """Time the operations on the drawing of the painter.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: for each operation, the time in milliseconds and the canvas calls it made
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+
+    def measure(name: str, operation: Callable[[], Any], done: Callable[[], bool] = lambda: True) -> None:
+        calls = root.calls()
+        start = time.perf_counter()
+        operation()
+        root.run_until(done)
+        root.update()
+        ms = (time.perf_counter() - start) * 1000
+        results[name] = {"ms": round(ms, 3), "canvas_calls": dict(root.calls() - calls)}
+
+    width, height = painter.viewport.size
+
+    def select() -> None:
+        painter.active_select_start = (0, 0)
+        painter.active_select_end = (width // 2, height // 2)
+        painter.select_by_rect()
+        painter.active_select_start = painter.active_select_end = None
+
+    measure("select_by_rect", select)
+    results["select_by_rect"]["selected"] = len(painter.selected_strokes)
+    # the selection starts in the window, at the top left of the document
+    measure("drag_move", lambda: drag(painter, (20, 20), (220, 120), steps=20))
+    measure("move_to_front", lambda: painter.move_forward_backward_selected(True))
+    measure("move_to_back", lambda: painter.move_forward_backward_selected(False))
+    measure("undo", lambda: [painter.undo() for _ in range(3)])
+    measure("redo", lambda: [painter.redo() for _ in range(3)])
+    painter.remove_select()
+    measure("scroll", lambda: [painter.viewport.scroll(1, 1) for _ in range(5)])
+
+    os.chdir(directory)
+    exporter = painter.exporter
+    measure("save_to_json", painter.save_to_json, done=lambda: not exporter.busy())
+    saved = next(name for name in os.listdir(directory) if name.startswith("canvas-data-"))
+    results["save_to_json"]["size_kb"] = round(os.path.getsize(saved) / 1024, 1)
+    measure("restore_data_from_json", lambda: painter.restore_data_from_json(saved), done=lambda: painter.loader is None)
+    measure("export_to_png", painter.export_to_png, done=lambda: not exporter.busy())
+
+    # clearing with autosave on, then a crash: the recovered drawing must be empty
+    autosave = os.path.join(directory, "autosave")
+    painter.start_autosave(autosave)
+    cleared_bytes = sum(stroke.memory_size() for stroke in painter.strokes)
+    history_bytes = painter.history.bytes
+    measure("delete_all", painter.delete_all)
+    # the cleared strokes are only kept alive by the history, they count in its budget
+    assert painter.history.bytes - history_bytes >= cleared_bytes, "the cleared strokes are not counted in the history size"
+    journal = painter.history.journal
+    painter.history.journal = None
+    if journal:
+        journal.close(discard=False)
+    recovered = make_painter(root, painter.viewport.size)
+    recovered.recover(*Journal.read(autosave))
+    assert not len(recovered.strokes), f"{len(recovered.strokes)} cleared strokes recovered"
+    recovered.exporter.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strokes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--raster-cache", choices=["off", "on", "both"], default="both",
+                        help="run without the raster cache, with it, or both (the default)")
+    parser.add_argument("--output", default="bench_painter.json", help="the JSON file the results are written to")
+    args = parser.parse_args()
+    output = os.path.abspath(args.output)
+    cwd = os.getcwd()
+
+    root = HeadlessTk()
+    check_renumber(root)
+    teardown(root)
+
+    modes = {"off": [False], "on": [True], "both": [False, True]}[args.raster_cache]
+    runs = []
+    for strokes, raster_cache in [(strokes, raster_cache) for strokes in args.strokes for raster_cache in modes]:
+        size = document_size(strokes)
+        records = make_drawing(strokes, size)
+        root = HeadlessTk()
+        painter = make_painter(root, size, raster_cache)
+        start = time.perf_counter()
+        draw(root, painter, records)
+        draw_ms = (time.perf_counter() - start) * 1000
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                results = bench(root, painter, directory)
+            finally:
+                os.chdir(cwd)
+        painter.exporter.close()
+        del painter
+        teardown(root)
+        runs.append({"strokes": strokes, "raster_cache": raster_cache, "document_size": list(size), "draw_ms": round(draw_ms, 3), "results": results})
+        print(f"{strokes:>7} strokes, {size[0]}x{size[1]}{', raster cache' if raster_cache else ''}: draw={draw_ms:.1f}ms, " +
+              ", ".join(f"{name}={result['ms']:.1f}ms" for name, result in results.items()))
+
+    with open(output, "w") as file:
+        json.dump({"benchmark": "painter", "time": datetime.now().isoformat(timespec="seconds"),
+                   "python": platform.python_version(), "platform": platform.platform(), "runs": runs}, file, indent=2)
+    print(f"results written to {output}")
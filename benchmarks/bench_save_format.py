@@ -0,0 +1,95 @@
+"""Benchmark saving and loading canvas data in the version 1 (indented json list) and version 2 (columnar) formats.
+
+the load is the time to read the file into records. the version 2 records keep their points in the columns
+(save_funcs.Points) until they are used, the time to turn all of them into tuples is shown apart (points ms).
+
+run from the repository root:
+    python benchmarks/bench_save_format.py --strokes 2000 --points 200
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import *
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from helper_funcs.save_funcs import Record, read_canvas_data, write_canvas_data
+
+
+def make_records(strokes: int, points: int) -> List[Record]:
+    """Generate the records of a drawing: mostly freestyle strokes, with some shapes and texts."""
+    random.seed(strokes)
+    colors = ["#ffffff", "#ff0000", "#00ff00", "#0000ff"]
+    records = []
+    for i in range(strokes):
+        record: Record = {"type": "FreeStyleStroke", "coordinates": [], "color": random.choice(colors), "fill": "",
+                          "width": random.randint(1, 9), "font": "", "font_size": "", "shape": "",
+                          "italic": "", "bold": "", "text": ""}
+        x, y = random.randint(0, 640), random.randint(0, 480)
+        if i % 10 == 0:
+            record.update(type="ShapeStroke", shape="RECT", coordinates=[(x, y), (x + 40, y + 30)])
+        elif i % 10 == 1:
+            record.update(type="TextStroke", coordinates=[(x, y)], font="Arial", font_size=14,
+                          italic=False, bold=False, text=f"text {i}")
+        else:
+            for _ in range(points):
+                x, y = x + random.randint(-3, 3), y + random.randint(-3, 3)
+                record["coordinates"].append((x, y))
+        records.append(record)
+    return records
+
+
+def write_v1(filename: str, records: List[Record]) -> None:
+    """Save like the first format did."""
+    with open(filename, "w") as json_file:
+        json.dump(records, json_file, indent=4)
+
+
+def timed(function: Callable[[], Any]) -> float:
+    """Run a function once and return the time in milliseconds."""
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000
+
+
+def bench(records: List[Record], directory: str) -> Dict[str, Dict[str, float]]:
+    """Save and load the records in every format.
+
+    Returns:
+        Dict[str, Dict[str, float]]: for each format, the save, load and points times in milliseconds and the size in KB
+    """
+    formats: Dict[str, Callable[[str], None]] = {
+        "v1": lambda filename: write_v1(filename, records),
+        "v2": lambda filename: write_canvas_data(filename, records, compress=False),
+        "v2 gzip": lambda filename: write_canvas_data(filename, records, compress=True),
+    }
+    results = {}
+    for name, write in formats.items():
+        filename = os.path.join(directory, name.replace(" ", "-") + ".json")
+        save_ms = timed(lambda: write(filename))
+        loaded: List[Record] = []
+        load_ms = timed(lambda: loaded.extend(read_canvas_data(filename)))
+        points_ms = timed(lambda: [list(record["coordinates"]) for record in loaded])
+        assert [list(map(tuple, r["coordinates"])) for r in loaded] == [list(map(tuple, r["coordinates"])) for r in records]
+        results[name] = {"save_ms": save_ms, "load_ms": load_ms, "points_ms": points_ms, "size_kb": os.path.getsize(filename) / 1024}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strokes", type=int, default=2000)
+    parser.add_argument("--points", type=int, default=200)
+    args = parser.parse_args()
+
+    records = make_records(args.strokes, args.points)
+    with tempfile.TemporaryDirectory() as directory:
+        results = bench(records, directory)
+    v1 = results["v1"]
+    print(f"{'format':<10}{'save ms':>10}{'load ms':>10}{'points ms':>11}{'size KB':>10}{'save x':>8}{'load x':>8}{'size x':>8}")
+    for name, result in results.items():
+        print(f"{name:<10}{result['save_ms']:>10.1f}{result['load_ms']:>10.1f}{result['points_ms']:>11.1f}{result['size_kb']:>10.1f}"
+              f"{v1['save_ms'] / result['save_ms']:>8.1f}{v1['load_ms'] / result['load_ms']:>8.1f}{v1['size_kb'] / result['size_kb']:>8.1f}")
@@ -0,0 +1,103 @@
+"""Benchmark deleting strokes and undoing / redoing the delete, on the stroke store and on a plain list.
+
+run from the repository root (needs a display):
+    python benchmarks/bench_stroke_store.py --strokes 50000 --deleted 25000
+
+--list also times the plain list operations the painter used before, they are quadratic and take minutes here.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import *
+
+import tkinter as tk
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from action import DeleteAction
+from components.document_canvas import DocumentCanvas
+from enums import Shape
+from stroke import ShapeStroke, Stroke
+from stroke_store import Selection, StrokeStore
+
+
+def timed(function: Callable[[], Any]) -> float:
+    """Run a function once and return the time in milliseconds."""
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000
+
+
+def make_strokes(canvas: DocumentCanvas, count: int) -> List[Stroke]:
+    """Create small rectangles spread over the canvas."""
+    random.seed(count)
+    strokes = []
+    for _ in range(count):
+        x, y = random.randint(0, 620), random.randint(0, 460)
+        stroke = ShapeStroke(x, y, color="#ffffff", width=1, canvas=canvas, fill="", shape=Shape.RECT)
+        stroke.coordinates.append((x + 20, y + 20))
+        stroke.paint()
+        strokes.append(stroke)
+    return strokes
+
+
+def bench_store(strokes: List[Stroke], deleted: List[Stroke]) -> Dict[str, float]:
+    """Delete strokes like Painter.delete_selected does, then undo and redo the delete.
+
+    Args:
+        strokes (List[Stroke]): all the strokes, painted on the canvas
+        deleted (List[Stroke]): the strokes to delete
+
+    Returns:
+        Dict[str, float]: the times in milliseconds
+    """
+    store = StrokeStore(strokes)
+    selection = Selection(deleted)
+
+    def delete() -> None:
+        for stroke in selection:
+            stroke.delete()
+            store.remove(stroke)
+
+    results = {"delete_ms": timed(delete)}
+    action = DeleteAction(store, list(selection))
+    results["undo_ms"] = timed(lambda: action.undo())
+    results["redo_ms"] = timed(lambda: action.redo())
+    assert len(store) == len(strokes) - len(deleted)
+    return results
+
+
+def bench_list(strokes: List[Stroke], deleted: List[Stroke]) -> Dict[str, float]:
+    """The same operations on a plain list, without the canvas work: membership, remove and index."""
+    ordered = list(strokes)
+    selection = list(deleted)
+    results = {"membership_ms": timed(lambda: [stroke in selection for stroke in ordered])}
+    results["delete_ms"] = timed(lambda: [ordered.remove(stroke) for stroke in selection])
+    ordered = list(strokes)
+    results["index_ms"] = timed(lambda: [ordered.index(stroke) for stroke in selection])
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strokes", type=int, default=50000)
+    parser.add_argument("--deleted", type=int, default=25000)
+    parser.add_argument("--list", action="store_true")
+    args = parser.parse_args()
+
+    root = tk.Tk()
+    canvas = DocumentCanvas(root, width=640, height=480, bg="#000000")
+    canvas.pack()
+    root.update()
+
+    strokes = make_strokes(canvas, args.strokes)
+    deleted = random.sample(strokes, min(args.deleted, len(strokes)))
+    runs = [("store", bench_store)]
+    if args.list:
+        runs.insert(0, ("list", bench_list))
+    for name, bench in runs:
+        results = bench(strokes, deleted)
+        print(f"{name:>6}: " + ", ".join(f"{key}={value:.1f}" for key, value in results.items()))
+    root.destroy()
@@ -0,0 +1,70 @@
+"""Benchmark the SVG export: the stroke model writer against an SVG with one <line> per segment and inline styles,
+which is what walking the canvas items gives (a freestyle stroke is a line item per segment on the canvas).
+
+run from the repository root:
+    python benchmarks/bench_svg_export.py --strokes 2000 --points 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import *
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bench_save_format import make_records
+from helper_funcs.save_funcs import Record
+from render import write_svg
+
+
+def write_per_item(filename: str, records: List[Record]) -> None:
+    """Write an SVG element per canvas item, every element with all its style attributes."""
+    elements = ['<svg xmlns="http://www.w3.org/2000/svg" width="640" height="480">']
+    for record in records:
+        coordinates = record["coordinates"]
+        style = f'stroke="{record["color"]}" stroke-width="{record["width"]}.0" stroke-linecap="butt" stroke-linejoin="round"'
+        if record["type"] == "FreeStyleStroke":
+            for (x1, y1), (x2, y2) in zip(coordinates, coordinates[1:]):
+                elements.append(f'<line x1="{x1}.0" y1="{y1}.0" x2="{x2}.0" y2="{y2}.0" {style} fill="none" />')
+        elif record["type"] == "TextStroke":
+            x, y = coordinates[0]
+            elements.append(f'<text x="{x}.0" y="{y}.0" fill="{record["color"]}" font-family="{record["font"]}" '
+                            f'font-size="{record["font_size"]}pt" text-anchor="middle">{escape(record["text"])}</text>')
+        else:
+            (x1, y1), (x2, y2) = coordinates[0], coordinates[1]
+            elements.append(f'<rect x="{x1}.0" y="{y1}.0" width="{x2 - x1}.0" height="{y2 - y1}.0" {style} fill="none" />')
+    elements.append("</svg>")
+    with open(filename, "w") as file:
+        file.write("\n".join(elements))
+
+
+def timed(function: Callable[[], Any]) -> float:
+    """Run a function once and return the time in milliseconds."""
+    start = time.perf_counter()
+    function()
+    return (time.perf_counter() - start) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strokes", type=int, default=2000)
+    parser.add_argument("--points", type=int, default=200)
+    args = parser.parse_args()
+
+    records = make_records(args.strokes, args.points)
+    writers: Dict[str, Callable[[str], None]] = {
+        "per item": lambda filename: write_per_item(filename, records),
+        "model": lambda filename: write_svg(records, filename),
+    }
+    results: Dict[str, Tuple[float, float]] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, write in writers.items():
+            filename = os.path.join(directory, name.replace(" ", "-") + ".svg")
+            results[name] = timed(lambda: write(filename)), os.path.getsize(filename) / 1024
+
+    base_ms, base_kb = results["per item"]
+    print(f"{'writer':<10}{'ms':>10}{'size KB':>10}{'time x':>8}{'size x':>8}")
+    for name, (ms, kb) in results.items():
+        print(f"{name:<10}{ms:>10.1f}{kb:>10.1f}{base_ms / ms:>8.1f}{base_kb / kb:>8.1f}")
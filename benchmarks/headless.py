@@ -0,0 +1,458 @@
+"""A Tk stand-in for running the painter without a display.
+
+HeadlessTk is a Tcl interpreter without Tk (tk.Tk(useTk=False)), with the Tk commands the painter uses
+(widgets, grid, bind, winfo...) implemented in Python. Tcl itself runs after, update and the variables, so
+tk.StringVar, after_idle and the worker polling work as they do in the app. every canvas is a RecordingCanvas:
+it keeps the items, their tags and their display order, answers coords, bbox and find like Tk does, and counts
+the calls made to it. the widgets go through tkinter as usual, so the Python side costs what it costs in the app.
+photo images keep their size only, the pixels PIL pastes into them (ImageTk) are counted and dropped.
+
+    root = HeadlessTk()
+    painter = Painter(tk.Frame(root), root=root, ...)
+    root.canvases[0].calls  # Counter({"create line": 1000, "coords": 20, ...})
+
+no events are generated: the handlers are called directly, with tk.Event objects made by event().
+"""
+import time
+from collections import Counter
+from typing import *
+
+import tkinter as tk
+from tkinter import _tkinter
+
+# the size texts get in bbox, Tk measures them with the font
+TEXT_WIDTH = 0.6
+TEXT_HEIGHT = 1.4
+
+
+class CanvasItem():
+    """an item of a RecordingCanvas
+
+    Attributes:
+        type (str): line, rectangle, oval, polygon, text or image.
+        coords (List[float]): the flat coordinates of the item.
+        options (Dict[str, str]): the options the item was given (without the dash).
+        tags (Tuple[str, ...]): the tags of the item.
+    """
+    def __init__(self, type: str, coords: List[float], options: Dict[str, str], tags: Tuple[str, ...]) -> None:
+        self.type = type
+        self.coords = coords
+        self.options = options
+        self.tags = tags
+
+
+class Widget():
+    """a widget of HeadlessTk, keeps its options and ignores the other commands."""
+
+    def __init__(self, root: "HeadlessTk", path: str, kind: str, options: Dict[str, str]) -> None:
+        self.root = root
+        self.path = path
+        self.kind = kind
+        self.options = options
+
+    def command(self, *args: str) -> Any:
+        if not len(args):
+            return ""
+        if args[0] == "configure":
+            if len(args) == 1:
+                return ()
+            if len(args) == 2:
+                # tkinter asks for one option as (name, dbname, dbclass, default, value)
+                name = args[1].lstrip("-")
+                return (args[1], name, name, "", self.options.get(name, ""))
+            self.options.update(parse_options(args[1:]))
+            return ""
+        if args[0] == "cget":
+            return self.options.get(args[1].lstrip("-"), "")
+        return ""
+
+
+class RecordingCanvas(Widget):
+    """a canvas widget of HeadlessTk, it draws nothing but keeps the items like Tk does.
+
+    Attributes:
+        items (Dict[int, CanvasItem]): the items by their ids.
+        order (Dict[int, None]): the ids of the items in display order, bottom to top (a dict keeps the order
+            and removes in constant time).
+        tagged (Dict[str, Set[int]]): the ids of the items that have each tag.
+        calls (Counter[str]): how many times each canvas command was called ("create line", "coords"...).
+        origin (List[float]): the canvas coordinates of the top left corner of the window (the scrolling).
+    """
+
+    def __init__(self, root: "HeadlessTk", path: str, kind: str, options: Dict[str, str]) -> None:
+        super().__init__(root, path, kind, {"background": "#ffffff", "width": "640", "height": "480",
+                                            "highlightthickness": "0", "borderwidth": "0", "scrollregion": "", **options})
+        if "bg" in options:
+            self.options["background"] = options["bg"]
+        self.items: Dict[int, CanvasItem] = {}
+        self.order: Dict[int, None] = {}
+        self.tagged: Dict[str, Set[int]] = {}
+        self.next_id = 1
+        self.calls: Counter[str] = Counter()
+        self.origin = [0.0, 0.0]
+        self.mark = (0, 0, 0.0, 0.0)
+
+    def size(self) -> Tuple[int, int]:
+        return int(float(self.options["width"])), int(float(self.options["height"]))
+
+    def ids(self, tag: str) -> Set[int]:
+        """the ids of the items a tag or an id stands for"""
+        if tag.isdigit():
+            return {int(tag)} if int(tag) in self.items else set()
+        if tag == "all":
+            return set(self.order)
+        return self.tagged.get(tag, set())
+
+    def find(self, tag: str) -> List[int]:
+        """the ids of the items a tag or an id stands for, in display order"""
+        ids = self.ids(tag)
+        if len(ids) <= 1:
+            return list(ids)
+        return [i for i in self.order if i in ids]
+
+    def command(self, *args: str) -> Any:
+        name = args[0] if len(args) else ""
+        self.calls[name if name != "create" else "create " + args[1]] += 1
+        handler = getattr(self, "do_" + name, None)
+        if handler is None:
+            return super().command(*args)
+        return handler(*args[1:])
+
+    def do_create(self, type: str, *args: str) -> int:
+        split = next((i for i, arg in enumerate(args) if arg.startswith("-") and not is_number(arg)), len(args))
+        coords = [float(c) for arg in args[:split] for c in self.root.tk.splitlist(arg)]
+        options = parse_options(args[split:])
+        tags = tuple(self.root.tk.splitlist(options.pop("tags", "")))
+        item_id = self.next_id
+        self.next_id += 1
+        self.items[item_id] = CanvasItem(type, coords, options, tags)
+        self.order[item_id] = None
+        for tag in tags:
+            self.tagged.setdefault(tag, set()).add(item_id)
+        return item_id
+
+    def do_coords(self, tag: str, *args: str) -> Any:
+        ids = self.find(tag)
+        if not len(args):
+            return tuple(self.items[ids[0]].coords) if len(ids) else ()
+        coords = [float(c) for arg in args for c in self.root.tk.splitlist(arg)]
+        if len(ids):
+            self.items[ids[0]].coords = coords
+        return ""
+
+    def do_move(self, tag: str, dx: str, dy: str) -> str:
+        x, y = float(dx), float(dy)
+        for item_id in self.ids(tag):
+            coords = self.items[item_id].coords
+            coords[0::2] = [c + x for c in coords[0::2]]
+            coords[1::2] = [c + y for c in coords[1::2]]
+        return ""
+
+    def do_delete(self, *tags: str) -> str:
+        for tag in tags:
+            ids = set(self.ids(tag))
+            if not len(ids):
+                continue
+            for item_id in ids:
+                del self.order[item_id]
+                for item_tag in self.items.pop(item_id).tags:
+                    self.tagged[item_tag].discard(item_id)
+                    if not len(self.tagged[item_tag]):
+                        del self.tagged[item_tag]
+        return ""
+
+    def do_bbox(self, *tags: str) -> Any:
+        boxes = [self.item_bbox(self.items[item_id]) for tag in tags for item_id in self.ids(tag)]
+        if not len(boxes):
+            return ""
+        return (min(box[0] for box in boxes), min(box[1] for box in boxes),
+                max(box[2] for box in boxes), max(box[3] for box in boxes))
+
+    def item_bbox(self, item: CanvasItem) -> Tuple[int, int, int, int]:
+        xs, ys = item.coords[0::2], item.coords[1::2]
+        if item.type == "text":
+            font = self.root.tk.splitlist(item.options.get("font", "TkDefaultFont 10"))
+            size = abs(int(font[1])) if len(font) > 1 else 10
+            width = len(item.options.get("text", "")) * size * TEXT_WIDTH
+            height = size * TEXT_HEIGHT
+            return int(xs[0] - width / 2), int(ys[0] - height / 2), int(xs[0] + width / 2) + 1, int(ys[0] + height / 2) + 1
+        if item.type == "image":
+            return int(xs[0]), int(ys[0]), int(xs[0]) + 1, int(ys[0]) + 1
+        pad = float(item.options.get("width", 1)) / 2 + 1
+        return int(min(xs) - pad), int(min(ys) - pad), int(max(xs) + pad) + 1, int(max(ys) + pad) + 1
+
+    def do_raise(self, tag: str, above: Union[Literal[None], str] = None) -> str:
+        moving = self.find(tag)
+        if not len(moving):
+            return ""
+        if above is not None and not len(self.ids(above)):
+            raise tk.TclError(f'tagOrId "{above}" doesn\'t match any items')
+        if above is None:
+            for item_id in moving:
+                del self.order[item_id]
+                self.order[item_id] = None
+            return ""
+        target = self.ids(above)
+        taken = set(moving)
+        order = [i for i in self.order if i not in taken]
+        above_position = max((position for position, i in enumerate(order) if i in target), default=None)
+        if above_position is None:
+            # raised above itself
+            return ""
+        position = above_position + 1
+        self.order = dict.fromkeys(order[:position] + moving + order[position:])
+        return ""
+
+    def do_lower(self, tag: str, below: Union[Literal[None], str] = None) -> str:
+        moving = self.find(tag)
+        if not len(moving):
+            return ""
+        if below is not None and not len(self.ids(below)):
+            raise tk.TclError(f'tagOrId "{below}" doesn\'t match any items')
+        target = self.ids(below) if below is not None else set()
+        taken = set(moving)
+        order = [i for i in self.order if i not in taken]
+        position = min((position for position, i in enumerate(order) if i in target), default=0)
+        self.order = dict.fromkeys(order[:position] + moving + order[position:])
+        return ""
+
+    def do_itemconfigure(self, tag: str, *args: str) -> str:
+        options = parse_options(args)
+        for item_id in self.ids(tag):
+            self.items[item_id].options.update(options)
+        return ""
+
+    def do_itemcget(self, tag: str, option: str) -> str:
+        ids = self.find(tag)
+        return self.items[ids[0]].options.get(option.lstrip("-"), "") if len(ids) else ""
+
+    def do_find(self, how: str, *args: str) -> Tuple[int, ...]:
+        if how == "all":
+            return tuple(self.order)
+        if how == "withtag":
+            return tuple(self.find(args[0]))
+        if how == "overlapping":
+            x1, y1, x2, y2 = (float(arg) for arg in args)
+            return tuple(i for i in self.order if overlaps(self.item_bbox(self.items[i]), (x1, y1, x2, y2)))
+        return ()
+
+    def do_gettags(self, tag: str) -> Tuple[str, ...]:
+        ids = self.find(tag)
+        return self.items[ids[0]].tags if len(ids) else ()
+
+    def do_type(self, tag: str) -> str:
+        ids = self.find(tag)
+        return self.items[ids[0]].type if len(ids) else ""
+
+    def do_canvasx(self, x: str, *args: str) -> float:
+        return float(x) + self.origin[0]
+
+    def do_canvasy(self, y: str, *args: str) -> float:
+        return float(y) + self.origin[1]
+
+    def scroll_region(self) -> Tuple[float, float, float, float]:
+        region = self.root.tk.splitlist(self.options["scrollregion"])
+        if len(region) != 4:
+            width, height = self.size()
+            return 0, 0, width, height
+        x1, y1, x2, y2 = (float(c) for c in region)
+        return x1, y1, x2, y2
+
+    def scroll_to(self, axis: int, position: float) -> None:
+        """scroll so that a canvas coordinate is at the left or the top of the window, kept in the scrollregion"""
+        region = self.scroll_region()
+        window = self.size()[axis]
+        self.origin[axis] = max(region[axis], min(position, region[axis + 2] - window))
+
+    def view(self, axis: int, *args: str) -> Any:
+        region = self.scroll_region()
+        length = max(1.0, region[axis + 2] - region[axis])
+        if not len(args):
+            start = (self.origin[axis] - region[axis]) / length
+            return start, min(1.0, start + self.size()[axis] / length)
+        if args[0] == "moveto":
+            self.scroll_to(axis, region[axis] + float(args[1]) * length)
+        elif args[0] == "scroll":
+            # a unit is a tenth of the window, like the canvas without an increment
+            step = self.size()[axis] * (0.9 if args[2] == "pages" else 0.1)
+            self.scroll_to(axis, self.origin[axis] + int(args[1]) * step)
+        return ""
+
+    def do_xview(self, *args: str) -> Any:
+        return self.view(0, *args)
+
+    def do_yview(self, *args: str) -> Any:
+        return self.view(1, *args)
+
+    def do_scan(self, how: str, x: str, y: str, gain: str = "10") -> str:
+        if how == "mark":
+            self.mark = (int(x), int(y), self.origin[0], self.origin[1])
+        else:
+            mark_x, mark_y, left, top = self.mark
+            self.scroll_to(0, left - (int(x) - mark_x) * int(gain))
+            self.scroll_to(1, top - (int(y) - mark_y) * int(gain))
+        return ""
+
+
+class HeadlessTk(tk.Tk):
+    """a Tk root without a display, see the module docstring.
+
+    Attributes:
+        widgets (Dict[str, Widget]): the widgets by their paths.
+        canvases (List[RecordingCanvas]): the canvases, in the order they were created.
+        bindings (Dict[Tuple[str, str], str]): the scripts bound to the events of each widget, never called.
+        photos (Dict[str, Dict[str, str]]): the options of the photo images by their names.
+        image_calls (Counter[str]): how many times each photo image command was called ("image create",
+            "photo paste"...).
+    """
+
+    widget_commands = ["frame", "toplevel", "canvas", "scrollbar", "menu", "label", "button", "entry",
+                       "checkbutton", "radiobutton", "listbox", "text", "spinbox", "scale",
+                       "ttk::frame", "ttk::label", "ttk::button", "ttk::progressbar", "ttk::combobox", "ttk::spinbox"]
+    ignored_commands = ["grid", "pack", "place", "wm", "focus", "grab", "bell", "option", "event", "tk_setPalette",
+                        "bindtags", "font", "tkwait", "raise", "lower"]
+
+    def __init__(self) -> None:
+        super().__init__(useTk=False)
+        self.widgets: Dict[str, Widget] = {}
+        self.canvases: List[RecordingCanvas] = []
+        self.bindings: Dict[Tuple[str, str], str] = {}
+        self.photos: Dict[str, Dict[str, str]] = {}
+        self.image_calls: Counter[str] = Counter()
+        for kind in self.widget_commands:
+            self.tk.createcommand(kind, self.widget_creator(kind))
+        for name in self.ignored_commands:
+            self.tk.createcommand(name, lambda *args: "")
+        self.tk.createcommand("bind", self.bind_command)
+        self.tk.createcommand("winfo", self.winfo_command)
+        self.tk.createcommand("destroy", self.destroy_command)
+        self.tk.createcommand("image", self.image_command)
+        # what ImageTk.PhotoImage.paste calls, without it PIL hooks into a Tk that isn't there
+        self.tk.createcommand("PyImagingPhoto", self.paste_command)
+
+    def widget_creator(self, kind: str) -> Callable[..., str]:
+        def create(path: str, *args: str) -> str:
+            options = parse_options(args)
+            widget = (RecordingCanvas if kind == "canvas" else Widget)(self, path, kind, options)
+            self.widgets[path] = widget
+            if isinstance(widget, RecordingCanvas):
+                self.canvases.append(widget)
+            self.tk.createcommand(path, widget.command)
+            return path
+        return create
+
+    def bind_command(self, *args: str) -> str:
+        if len(args) == 3:
+            self.bindings[args[0], args[1]] = args[2]
+        return ""
+
+    def winfo_command(self, what: str, path: str = ".", *args: str) -> Any:
+        widget = self.widgets.get(path)
+        if what == "exists":
+            return int(path == "." or widget is not None)
+        if what in ("width", "reqwidth") and isinstance(widget, RecordingCanvas):
+            return widget.size()[0]
+        if what in ("height", "reqheight") and isinstance(widget, RecordingCanvas):
+            return widget.size()[1]
+        if what in ("width", "height", "reqwidth", "reqheight"):
+            return 1
+        if what == "children":
+            return tuple(p for p in self.widgets if p.rsplit(".", 1)[0] == (path if path != "." else ""))
+        if what == "toplevel":
+            return "."
+        return 0
+
+    def destroy_command(self, *paths: str) -> str:
+        for path in paths:
+            for child in [p for p in self.widgets if p == path or p.startswith(path + ".")]:
+                del self.widgets[child]
+                try:
+                    self.tk.deletecommand(child)
+                except tk.TclError:
+                    pass
+        return ""
+
+    def image_command(self, how: str, *args: str) -> Any:
+        self.image_calls["image " + how] += 1
+        if how == "create":
+            # image create photo ?name? ?options?
+            if len(args) > 1 and not args[1].startswith("-"):
+                name, options = args[1], args[2:]
+            else:
+                name, options = f"image{len(self.photos) + 1}", args[1:]
+            self.photos[name] = parse_options(options)
+            self.tk.createcommand(name, lambda *args, name=name: self.photo_command(name, *args))
+            return name
+        if how == "delete":
+            for name in args:
+                if self.photos.pop(name, None) is not None:
+                    self.tk.deletecommand(name)
+            return ""
+        if how in ("width", "height"):
+            return int(self.photos[args[0]].get(how, 0))
+        if how == "names":
+            return tuple(self.photos)
+        return ""
+
+    def photo_command(self, name: str, *args: str) -> Any:
+        self.image_calls["photo " + (args[0] if len(args) else "")] += 1
+        if len(args) == 2 and args[0] == "cget":
+            return self.photos[name].get(args[1].lstrip("-"), "")
+        if len(args) and args[0] == "configure":
+            self.photos[name].update(parse_options(args[1:]))
+        return ""
+
+    def paste_command(self, photo: str, pointer: str) -> str:
+        self.image_calls["photo paste"] += 1
+        return ""
+
+    def calls(self) -> Counter[str]:
+        """the canvas and photo image commands called so far, on every canvas"""
+        total: Counter[str] = Counter(self.image_calls)
+        for canvas in self.canvases:
+            total.update(canvas.calls)
+        return total
+
+    def run_until(self, done: Callable[[], bool], timeout: float = 600) -> None:
+        """run the Tcl event loop (after callbacks and idle callbacks) until done() is true
+
+        Raises:
+            TimeoutError: if done() is still false after timeout seconds
+        """
+        deadline = time.perf_counter() + timeout
+        while not done():
+            if time.perf_counter() > deadline:
+                raise TimeoutError("the event loop did not finish in time")
+            if not self.tk.dooneevent(_tkinter.DONT_WAIT):
+                # waiting for a worker thread
+                time.sleep(0.001)
+
+
+def parse_options(args: Sequence[str]) -> Dict[str, str]:
+    """-name value pairs, without the dashes"""
+    return {args[i].lstrip("-"): args[i + 1] for i in range(0, len(args) - 1, 2)}
+
+
+def is_number(arg: str) -> bool:
+    try:
+        float(arg)
+        return True
+    except ValueError:
+        return False
+
+
+def overlaps(a: Tuple[float, ...], b: Tuple[float, ...]) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def event(widget: tk.Misc, x: int, y: int, state: int = 0, num: Union[int, str] = "??", delta: int = 0) -> tk.Event:
+    """an event at a point of a widget, like the ones Tk gives the handlers"""
+    e: tk.Event = tk.Event()
+    e.widget = widget
+    e.x, e.y = x, y
+    e.x_root, e.y_root = x, y
+    e.state = state
+    e.num = num
+    e.delta = delta
+    e.keysym = e.char = ""
+    return e
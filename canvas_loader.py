@@ -0,0 +1,71 @@
+import queue
+import threading
+from typing import *
+
+from helper_funcs.save_funcs import Record, iter_canvas_data
+
+
+class CanvasLoader():
+    """Reads a saved canvas file on a worker thread and hands the records over in batches.
+
+    the worker never touches Tk, the Tk thread takes the batches with next_batch (from an after callback).
+
+    Attributes:
+        filename (str): the path of the file.
+        batch_size (int): the number of records in a batch.
+        batches (queue.Queue): the batches read so far, None marks the end of the file.
+        progress (float): the part of the file read so far (0 to 1).
+        error (Exception): the error that stopped the reading, if any.
+        cancelled (threading.Event): set to stop the worker.
+    """
+
+    def __init__(self, filename: str, batch_size: int = 500, max_batches: int = 8) -> None:
+        self.filename = filename
+        self.batch_size = batch_size
+        # a bounded queue, the worker waits for the drawing instead of reading the whole file ahead
+        self.batches: "queue.Queue[Union[Literal[None], Tuple[List[Record], float]]]" = queue.Queue(max_batches)
+        self.progress = 0.0
+        self.error: Union[Literal[None], Exception] = None
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def cancel(self) -> None:
+        """Stop the worker, the batches that were not taken are dropped."""
+        self.cancelled.set()
+
+    def run(self) -> None:
+        try:
+            for batch in iter_canvas_data(self.filename, self.batch_size):
+                if not self.put(batch):
+                    return
+        except Exception as error:
+            self.error = error
+        self.put(None)
+
+    def put(self, item: Union[Literal[None], Tuple[List[Record], float]]) -> bool:
+        """Wait for room in the queue, returns False if the loading was cancelled in the meantime."""
+        while not self.cancelled.is_set():
+            try:
+                self.batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def next_batch(self) -> Union[Literal[None], List[Record]]:
+        """Take the next batch without waiting.
+
+        Returns:
+            Union[None, List[Record]]: the next batch, an empty list if none is ready yet, None once the file is done
+        """
+        try:
+            item = self.batches.get_nowait()
+        except queue.Empty:
+            return []
+        if item is None:
+            return None
+        batch, self.progress = item
+        return batch
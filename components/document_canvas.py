@@ -0,0 +1,54 @@
+from math import ceil, floor
+from typing import *
+
+import tkinter as tk
+
+
+class DocumentCanvas(tk.Canvas):
+    """a canvas that shows the document at a zoom.
+    the strokes keep their coordinates in the document, their items are created at the document coordinates
+    times the zoom. scrolling is left to Tk (scrollregion, xview and yview), see Viewport.
+
+    Attributes:
+        zoom (float): how many pixels of the canvas a pixel of the document takes.
+    """
+    def __init__(self, master: tk.Misc, **kwargs: Any) -> None:
+        super().__init__(master, **kwargs)
+        self.zoom = 1.0
+
+    def view(self, points: Iterable[Tuple[float, float]]) -> List[float]:
+        """the flat canvas coordinates of points of the document
+        """
+        zoom = self.zoom
+        if zoom == 1:
+            return [c for point in points for c in point]
+        return [c * zoom for point in points for c in point]
+
+    def view_flat(self, coordinates: List[int]) -> List[float]:
+        """the canvas coordinates of flat coordinates of the document (x1, y1, x2, y2...)
+        """
+        zoom = self.zoom
+        if zoom == 1:
+            return cast(List[float], coordinates)
+        return [c * zoom for c in coordinates]
+
+    def view_width(self, width: float) -> float:
+        """the width of a line of the document on the canvas
+        """
+        return width * self.zoom
+
+    def view_font_size(self, font_size: int) -> int:
+        """the size of a font of the document on the canvas, in points
+        """
+        return max(1, round(font_size * self.zoom))
+
+    def document_point(self, x: int, y: int) -> Tuple[int, int]:
+        """the point of the document under a point of the window, like the position of a mouse event
+        """
+        return round(self.canvasx(x) / self.zoom), round(self.canvasy(y) / self.zoom)
+
+    def document_bbox(self, bbox: Tuple[int, int, int, int]) -> Tuple[int, int, int, int]:
+        """the part of the document a bounding box on the canvas covers
+        """
+        zoom = self.zoom
+        return floor(bbox[0] / zoom), floor(bbox[1] / zoom), ceil(bbox[2] / zoom), ceil(bbox[3] / zoom)
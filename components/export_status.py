@@ -0,0 +1,36 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import *
+
+if TYPE_CHECKING:
+    from export_worker import ExportWorker
+
+
+class ExportStatus(tk.Frame):
+    """the progress of the exports and saves written on the export worker, with a button to cancel them.
+    hidden while nothing is written.
+    """
+    def __init__(self, master: tk.Misc, on_cancel: Callable[[], None]) -> None:
+        super().__init__(master)
+        self.label = tk.Label(self, text="", wraplength=120)
+        self.label.pack()
+        self.progress = ttk.Progressbar(self, orient=tk.HORIZONTAL, mode="determinate", maximum=100, length=110)
+        self.progress.pack(pady=2)
+        self.cancel_btn = tk.Button(self, text="Cancel", command=on_cancel)
+        self.cancel_btn.pack()
+        self.shown = False
+
+    def update_status(self, worker: "ExportWorker") -> None:
+        """show the running export of the worker, or hide if there is none
+        """
+        if not worker.busy():
+            if self.shown:
+                self.pack_forget()
+                self.shown = False
+            return
+        waiting = len(worker.pending) - 1
+        self.label.configure(text=worker.pending[0].name + (f" (+{waiting} waiting)" if waiting else ""))
+        self.progress["value"] = worker.progress * 100
+        if not self.shown:
+            self.pack(pady=5)
+            self.shown = True
@@ -0,0 +1,33 @@
+import tkinter as tk
+from typing import *
+
+if TYPE_CHECKING:
+    from painter import Painter
+    from profiler import Profiler
+
+
+class PerfOverlay(tk.Label):
+    """a small overlay in the corner of the canvas with the latencies of the busiest handlers,
+    refreshed every refresh_ms while the profiler is on.
+    """
+    def __init__(self, master: "Painter", profiler: "Profiler", rows: int = 8, refresh_ms: int = 500) -> None:
+        super().__init__(master, text="", justify=tk.LEFT, anchor=tk.NW, font=("Courier", 9),
+                         bg="#202020", fg="#e0e0e0", padx=4, pady=2)
+        self.painter = master
+        self.profiler = profiler
+        self.rows = rows
+        self.refresh_ms = refresh_ms
+        self.refresh()
+
+    def refresh(self) -> None:
+        """show the p50 / p95 / p99 of the handlers that took the most time, the number of canvas items
+        and how much the last freestyle stroke was simplified
+        """
+        lines = [f"{'handler':<34}{'calls':>7}{'p50':>8}{'p95':>8}{'p99':>8} ms"]
+        for label, histogram in self.profiler.busiest(self.rows):
+            lines.append(f"{label[-34:]:<34}{histogram.count:>7}{histogram.percentile(0.5):>8.2f}"
+                         f"{histogram.percentile(0.95):>8.2f}{histogram.percentile(0.99):>8.2f}")
+        lines.append(f"canvas items: {self.profiler.count_items()} (max {self.profiler.max_canvas_items})")
+        lines.append(f"last stroke simplified: {self.painter.last_simplify_ratio:.1f}x fewer points")
+        self.configure(text="\n".join(lines))
+        self.after(self.refresh_ms, self.refresh)
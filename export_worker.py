@@ -0,0 +1,173 @@
+import os
+import queue
+import threading
+import time
+from typing import *
+
+import tkinter as tk
+
+# a write function gets the path to write to and a function to report its progress (0 to 1) with
+WriteFunc = Callable[[str, Callable[[float], None]], None]
+
+
+class ExportCancelled(Exception):
+    """Raised in the worker thread to stop an export that was cancelled."""
+
+
+class ExportJob(NamedTuple):
+    """An export waiting for the worker.
+
+    Attributes:
+        name (str): what is exported, shown while it runs.
+        path (str): the file to write.
+        write (WriteFunc): writes the file, from a snapshot of the strokes taken on the Tk thread.
+    """
+    name: str
+    path: str
+    write: WriteFunc
+
+
+class ExportWorker():
+    """Writes exports and saves on a worker thread, so the window keeps repainting while a big drawing is written.
+
+    the Tk thread takes a snapshot of the strokes (records that the drawing can't change) and submits a job,
+    the worker writes the file to a temporary path and renames it when done, so a cancelled or failed export
+    leaves nothing behind. the worker never touches Tk, its results go through a queue the Tk thread polls.
+
+    Attributes:
+        master (tk.Misc): the widget the queue is polled from.
+        on_update (Callable[[ExportWorker], None]): called on the Tk thread when the progress or the jobs change.
+        on_error (Callable[[ExportJob, Exception], None]): called on the Tk thread when an export failed.
+        pending (List[ExportJob]): the jobs submitted and not finished yet, the first is running.
+        progress (float): the progress of the running job (0 to 1).
+        last_seconds (float): how long the last finished export took.
+        poll_ms (int): how often the queue is polled while there are jobs.
+    """
+
+    def __init__(self, master: tk.Misc, on_update: Union[Literal[None], Callable[["ExportWorker"], None]] = None,
+                 on_error: Union[Literal[None], Callable[[ExportJob, Exception], None]] = None, poll_ms: int = 50) -> None:
+        self.master = master
+        self.on_update = on_update
+        self.on_error = on_error
+        self.poll_ms = poll_ms
+        self.pending: List[ExportJob] = []
+        self.progress = 0.0
+        self.last_seconds = 0.0
+        self.polling: Union[Literal[None], str] = None
+        self.jobs: "queue.Queue[Union[Literal[None], ExportJob]]" = queue.Queue()
+        self.results: "queue.Queue[Tuple[str, ExportJob, Any]]" = queue.Queue()
+        self.cancelled = threading.Event()
+        self.cancel_jobs: Set[int] = set()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def busy(self) -> bool:
+        return len(self.pending) > 0
+
+    def paths(self) -> Set[str]:
+        """The files that are going to be written, a new export must not pick their names."""
+        return {job.path for job in self.pending}
+
+    def submit(self, name: str, path: str, write: WriteFunc) -> None:
+        """Queue an export.
+
+        Args:
+            name (str): what is exported, shown while it runs
+            path (str): the file to write
+            write (WriteFunc): writes the file to the path it is given, reporting its progress
+        """
+        job = ExportJob(name, path, write)
+        self.pending.append(job)
+        self.jobs.put(job)
+        self.update()
+        if self.polling is None:
+            self.polling = self.master.after(self.poll_ms, self.poll)
+
+    def cancel(self) -> None:
+        """Cancel the running export and the queued ones."""
+        for job in self.pending:
+            self.cancel_jobs.add(id(job))
+        self.cancelled.set()
+
+    def close(self) -> None:
+        """Wait for the queued exports to be written and stop the worker."""
+        self.jobs.put(None)
+        self.thread.join()
+        if self.polling is not None:
+            self.master.after_cancel(self.polling)
+            self.polling = None
+
+    def close_when_done(self, on_closed: Callable[[], None]) -> None:
+        """Stop the worker once the queued exports are written, without blocking the Tk thread:
+        the progress keeps being shown (and the exports can be cancelled) until then.
+
+        Args:
+            on_closed (Callable[[], None]): called on the Tk thread once the worker stopped
+        """
+        self.jobs.put(None)
+
+        def wait() -> None:
+            if self.thread.is_alive():
+                self.master.after(self.poll_ms, wait)
+                return
+            self.close()
+            on_closed()
+        wait()
+
+    def run(self) -> None:
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            if id(job) in self.cancel_jobs:
+                self.results.put(("cancelled", job, None))
+                continue
+            self.cancelled.clear()
+            start = time.perf_counter()
+            temp_path = job.path + ".part"
+
+            def progress(fraction: float) -> None:
+                if self.cancelled.is_set():
+                    raise ExportCancelled()
+                self.results.put(("progress", job, fraction))
+
+            try:
+                job.write(temp_path, progress)
+                os.replace(temp_path, job.path)
+                self.results.put(("done", job, time.perf_counter() - start))
+            except Exception as error:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+                self.results.put(("cancelled", job, None) if isinstance(error, ExportCancelled) else ("failed", job, error))
+
+    def poll(self) -> None:
+        """Take the results of the worker, on the Tk thread."""
+        self.polling = None
+        changed = False
+        while True:
+            try:
+                kind, job, value = self.results.get_nowait()
+            except queue.Empty:
+                break
+            changed = True
+            if kind == "progress":
+                self.progress = value
+                continue
+            self.pending.remove(job)
+            self.cancel_jobs.discard(id(job))
+            self.progress = 0.0
+            if kind == "done":
+                self.last_seconds = value
+            elif kind == "failed":
+                if self.on_error:
+                    self.on_error(job, value)
+        if changed:
+            self.update()
+        if self.busy():
+            self.polling = self.master.after(self.poll_ms, self.poll)
+
+    def update(self) -> None:
+        if self.on_update:
+            self.on_update(self)
@@ -0,0 +1,162 @@
+"""Vectorized counterparts of calc_points_funcs and intersect_funcs.
+
+they take coordinate arrays and return arrays or boolean masks, so the work for many points,
+many shapes or many edges is one numpy call instead of a python loop.
+"""
+from typing import *
+
+import numpy as np
+import numpy.typing as npt
+
+Point = Tuple[float, float]
+Rect = Tuple[float, float, float, float]
+Mask = npt.NDArray[np.bool_]
+
+
+def calculate_points_on_lines(x0: npt.ArrayLike, y0: npt.ArrayLike, x1: npt.ArrayLike, y1: npt.ArrayLike, num_points: int = 20) -> Tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    """Sample points on many line segments at once, like calculate_points_on_line does for one.
+
+    Args:
+        x0, y0 (ArrayLike): the first endpoints of the segments, shape (n,)
+        x1, y1 (ArrayLike): the second endpoints of the segments, shape (n,)
+        num_points (int, optional): Number of points to generate on each segment. Default is 20.
+
+    Returns:
+        Tuple[ndarray, ndarray]: the x and y values of the points, each of shape (n, num_points)
+    """
+    t = np.linspace(0, 1, num_points)
+    x0, y0 = np.asarray(x0, dtype=np.float64)[:, None], np.asarray(y0, dtype=np.float64)[:, None]
+    x1, y1 = np.asarray(x1, dtype=np.float64)[:, None], np.asarray(y1, dtype=np.float64)[:, None]
+    xs = x0 + t * (x1 - x0)
+    ys = y0 + t * (y1 - y0)
+    return xs.astype(np.int64), ys.astype(np.int64)
+
+
+def are_points_inside_triangle(points: npt.ArrayLike, A: Point, B: Point, C: Point) -> Mask:
+    """Check which of many points are inside one triangle (same rule as is_point_inside_triangle).
+
+    Args:
+        points (ArrayLike): the points, shape (n, 2)
+        A, B, C (Point): the vertices of the triangle
+
+    Returns:
+        Mask: True for the points inside the triangle, shape (n,)
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    x, y = pts[:, 0], pts[:, 1]
+
+    def sign(p2: Point, p3: Point) -> npt.NDArray[np.float64]:
+        return (x - p3[0]) * (p2[1] - p3[1]) - (p2[0] - p3[0]) * (y - p3[1])
+
+    b1 = sign(A, B) < 0.0
+    b2 = sign(B, C) < 0.0
+    b3 = sign(C, A) < 0.0
+    return (b1 == b2) & (b2 == b3)
+
+
+def is_point_inside_triangles(point: Point, triangles: npt.ArrayLike) -> Mask:
+    """Check which of many triangles contain one point.
+
+    Args:
+        point (Point): the point
+        triangles (ArrayLike): the vertices of the triangles, shape (m, 3, 2)
+
+    Returns:
+        Mask: True for the triangles containing the point, shape (m,)
+    """
+    tri = np.asarray(triangles, dtype=np.float64).reshape(-1, 3, 2)
+    x, y = point
+
+    def sign(p2: npt.NDArray[np.float64], p3: npt.NDArray[np.float64]) -> npt.NDArray[np.float64]:
+        return (x - p3[:, 0]) * (p2[:, 1] - p3[:, 1]) - (p2[:, 0] - p3[:, 0]) * (y - p3[:, 1])
+
+    A, B, C = tri[:, 0], tri[:, 1], tri[:, 2]
+    b1 = sign(A, B) < 0.0
+    b2 = sign(B, C) < 0.0
+    b3 = sign(C, A) < 0.0
+    return (b1 == b2) & (b2 == b3)
+
+
+def are_points_inside_oval(points: npt.ArrayLike, rect_point1: Point, rect_point2: Point) -> Mask:
+    """Check which of many points are inside one oval given its bounding rectangle.
+
+    Args:
+        points (ArrayLike): the points, shape (n, 2)
+        rect_point1 (Point): one corner of the bounding rectangle
+        rect_point2 (Point): the opposite corner of the bounding rectangle
+
+    Returns:
+        Mask: True for the points inside the oval, shape (n,)
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    rects = np.array([[*rect_point1, *rect_point2]], dtype=np.float64)
+    return ovals_contain(pts[:, 0], pts[:, 1], rects)[:, 0]
+
+
+def is_point_inside_ovals(point: Point, rects: npt.ArrayLike) -> Mask:
+    """Check which of many ovals contain one point.
+
+    Args:
+        point (Point): the point
+        rects (ArrayLike): the bounding rectangles of the ovals (x1, y1, x2, y2), shape (m, 4)
+
+    Returns:
+        Mask: True for the ovals containing the point, shape (m,)
+    """
+    return ovals_contain(np.array([point[0]], dtype=np.float64), np.array([point[1]], dtype=np.float64),
+                         np.asarray(rects, dtype=np.float64).reshape(-1, 4))[0]
+
+
+def ovals_contain(x: npt.NDArray[np.float64], y: npt.NDArray[np.float64], rects: npt.NDArray[np.float64]) -> Mask:
+    """Check every point against every oval, returns a mask of shape (n points, m ovals)."""
+    cx = (rects[:, 0] + rects[:, 2]) / 2
+    cy = (rects[:, 1] + rects[:, 3]) / 2
+    major_axis = np.abs(rects[:, 2] - rects[:, 0]) / 2
+    minor_axis = np.abs(rects[:, 3] - rects[:, 1]) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = ((x[:, None] - cx) ** 2) / (major_axis ** 2) + ((y[:, None] - cy) ** 2) / (minor_axis ** 2)
+    return value <= 1
+
+
+def segments_intersect_rect(starts: npt.ArrayLike, ends: npt.ArrayLike, rect: Rect) -> Mask:
+    """Check which of many line segments intersect a rectangle, vectorized Liang-Barsky clipping.
+
+    Args:
+        starts (ArrayLike): the first endpoints of the segments, shape (n, 2)
+        ends (ArrayLike): the second endpoints of the segments, shape (n, 2)
+        rect (Rect): normalized rectangle (left, top, right, bottom)
+
+    Returns:
+        Mask: True for the segments that intersect the rectangle, shape (n,)
+    """
+    p0 = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+    p1 = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+    dx = p1[:, 0] - p0[:, 0]
+    dy = p1[:, 1] - p0[:, 1]
+    t0 = np.zeros(len(p0))
+    t1 = np.ones(len(p0))
+    inside = np.ones(len(p0), dtype=np.bool_)
+    for p, q in ((-dx, p0[:, 0] - rect[0]), (dx, rect[2] - p0[:, 0]), (-dy, p0[:, 1] - rect[1]), (dy, rect[3] - p0[:, 1])):
+        parallel = p == 0
+        inside &= ~(parallel & (q < 0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = q / p
+        t0 = np.where(~parallel & (p < 0), np.maximum(t0, t), t0)
+        t1 = np.where(~parallel & (p > 0), np.minimum(t1, t), t1)
+    return inside & (t0 <= t1)
+
+
+def polyline_intersects_rect(points: npt.ArrayLike, rect: Rect) -> bool:
+    """Check if a polyline intersects a rectangle, all segments tested at once.
+
+    Args:
+        points (ArrayLike): the points of the line, shape (n, 2)
+        rect (Rect): normalized rectangle (left, top, right, bottom)
+
+    Returns:
+        bool: True if any segment of the line is inside the rectangle
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(pts) == 1:
+        return bool(rect[0] <= pts[0, 0] <= rect[2] and rect[1] <= pts[0, 1] <= rect[3])
+    return bool(segments_intersect_rect(pts[:-1], pts[1:], rect).any())
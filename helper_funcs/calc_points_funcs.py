@@ -83,3 +83,17 @@ Check if a point is inside an oval given the bounding rectangle.
     return (((normalized_point[0] ** 2) / (major_axis ** 2) + (normalized_point[1] ** 2) / (minor_axis ** 2))) <= 1
     
     
+
+
+def triangle_vertices(corner1: Tuple[int, int], corner2: Tuple[int, int]) -> List[Tuple[int, int]]:
+    """Calculate the vertices of a triangle stroke drawn from one corner of its bounding rectangle to the other.
+
+    Args:
+        corner1 (Tuple[int, int]): the corner where the drawing started
+        corner2 (Tuple[int, int]): the corner where the drawing ended
+
+    Returns:
+        List[Tuple[int, int]]: the first corner, the middle of the opposite side and the third corner
+    """
+    mid = (corner1[0] + corner2[0])//2, corner2[1]
+    return [corner1, mid, (corner2[0], corner1[1])]
@@ -1,50 +1,104 @@
 import tkinter as tk
 import os.path
-from canvasvg import saveall # type: ignore
 from typing import * 
 
+from helper_funcs.save_funcs import Record, stroke_to_record
+from render import report_missing_fonts, take_missing_fonts, write_eps, write_png, write_svg
 
+if TYPE_CHECKING:
+    from export_worker import ExportWorker
+    from stroke import Stroke
 
-def export_to_svg(canvas: tk.Canvas, root: tk.Misc) -> None:
+
+
+def snapshot_records(strokes: Iterable["Stroke"]) -> List[Record]:
+    """
+    Describe the strokes as records the drawing can't change anymore, for an export on the worker thread.
+
+    Args:
+        strokes (Iterable[Stroke]): The strokes, in layer order.
+
+    Returns:
+        List[Record]: The records of the strokes.
+    """
+    records = []
+    for stroke in strokes:
+        record = stroke_to_record(stroke)
+        # the stroke keeps its coordinates list and may change it while the worker writes
+        record["coordinates"] = tuple(record["coordinates"])
+        records.append(record)
+    return records
+
+
+def next_image_path(extension: str, taken: AbstractSet[str] = frozenset()) -> str:
+    """
+    Find the first image<i>.<extension> that doesn't exist yet.
+
+    Args:
+        extension (str): The extension of the file, like "png".
+        taken (AbstractSet[str], optional): Paths that are going to be written and must not be picked.
+
+    Returns:
+        str: The path.
+    """
+    i = 1
+    while os.path.isfile(f"image{i}.{extension}") or f"image{i}.{extension}" in taken:
+        i += 1
+    return f"image{i}.{extension}"
+
+
+def export_to_png(exporter: "ExportWorker", strokes: Iterable["Stroke"], size: Tuple[int, int], dpi: Union[Literal[None], float] = None) -> None:
     """
-    Export the canvas to SVG format.
+    Export the strokes to a PNG image on the export worker.
 
     Args:
-        canvas (tk.Canvas): The canvas to export.
+        exporter (ExportWorker): The worker that writes the file.
+        strokes (Iterable[Stroke]): The strokes to export, in layer order.
+        size (Tuple[int, int]): The size of the canvas.
+        dpi (float, optional): The resolution to print the canvas at. Default is the size of the canvas on the screen.
+    """
+    records = snapshot_records(strokes)
+
+    def write(path: str, progress: Callable[[float], None]) -> None:
+        # drawn in strips, see render.py
+        write_png(records, path, size, dpi=dpi, progress=progress)
+        report_missing_fonts(take_missing_fonts())
+
+    path = next_image_path("png", exporter.paths())
+    exporter.submit(f"Exporting {path}", path, write)
+
+
+def export_to_svg(exporter: "ExportWorker", strokes: Iterable["Stroke"], size: Tuple[int, int], root: tk.Misc) -> None:
+    """
+    Export the strokes to SVG format on the export worker, from the strokes themselves rather than the canvas items.
+
+    Args:
+        exporter (ExportWorker): The worker that writes the file.
+        strokes (Iterable[Stroke]): The strokes to export, in layer order.
+        size (Tuple[int, int]): The size of the canvas.
         root: The root window.
     """
-    try:
-        iter(canvas.bbox("all"))
-    except TypeError:
+    records = snapshot_records(strokes)
+    if not len(records):
         error_popup(root, "You cannot export an empty canvas to svg")
         return
 
-    i = 1
-    while True:
-        if os.path.isfile(f"image{i}.svg"):
-            i += 1
-        else:
-            saveall(f"image{i}.svg", canvas)
-            break
-        
-        
+    path = next_image_path("svg", exporter.paths())
+    exporter.submit(f"Exporting {path}", path, lambda path, progress: write_svg(records, path, size, progress=progress))
 
 
-def export_to_eps(canvas: tk.Canvas) -> None:
+def export_to_eps(exporter: "ExportWorker", strokes: Iterable["Stroke"], size: Tuple[int, int]) -> None:
     """
-    Export the canvas to EPS format.
+    Export the strokes to EPS format on the export worker, from the strokes rather than the canvas.
 
     Args:
-        canvas (tk.Canvas): The canvas to export.
+        exporter (ExportWorker): The worker that writes the file.
+        strokes (Iterable[Stroke]): The strokes to export, in layer order.
+        size (Tuple[int, int]): The size of the canvas.
     """
-
-    i = 1
-    while True:
-        if os.path.isfile(f"image{i}.eps"):
-            i += 1
-        else:
-            canvas.postscript(file=f"image{i}.eps")
-            break
+    records = snapshot_records(strokes)
+    path = next_image_path("eps", exporter.paths())
+    exporter.submit(f"Exporting {path}", path, lambda path, progress: write_eps(records, path, size, progress=progress))
 
 
 def error_popup(root: tk.Misc, text: str) -> None:
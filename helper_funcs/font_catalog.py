@@ -0,0 +1,128 @@
+"""The fonts the painter offers, loaded once per process.
+
+the fonts are listed in assets/fonts.json, their styles are ttf files in assets/fonts named
+"<font>[-bold][-italic].ttf" (the names are matched regardless of case, some files are .TTF).
+"""
+import json
+import os
+import sys
+from bisect import bisect_left
+from functools import lru_cache
+from typing import *
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets")
+FONTS_FILE = os.path.join(ASSETS_DIR, "fonts.json")
+FONTS_DIR = os.path.join(ASSETS_DIR, "fonts")
+DEFAULT_FONT = "Arial"
+
+# (bold, italic) -> the suffix of the ttf file name
+STYLES: Dict[Tuple[bool, bool], str] = {
+    (False, False): "",
+    (True, False): "-bold",
+    (False, True): "-italic",
+    (True, True): "-bold-italic",
+}
+
+
+class FontCatalog():
+    """The available fonts, the ttf files of their styles, and an index to search them by name.
+
+    Attributes:
+        fonts (List[str]): the fonts listed in fonts.json, in their order.
+        files (Dict[str, Dict[Tuple[bool, bool], str]]): the ttf file of every style of every font in the
+            fonts directory, by the lower case font name and (bold, italic).
+        unlisted (List[str]): the ttf files of fonts that are not listed in fonts.json.
+        suffixes (List[Tuple[str, int]]): every suffix of every lower case font name and the index of the font,
+            sorted, a substring search is a prefix search of the suffixes.
+    """
+
+    def __init__(self, fonts: List[str], fonts_dir: str = FONTS_DIR) -> None:
+        self.fonts = fonts
+        self.files: Dict[str, Dict[Tuple[bool, bool], str]] = {}
+        try:
+            names = sorted(os.listdir(fonts_dir))
+        except OSError as error:
+            print(error, file=sys.stderr)
+            names = []
+        for name in names:
+            base, extension = os.path.splitext(name)
+            if extension.lower() != ".ttf":
+                continue
+            base = base.lower()
+            # the longest suffix first, "-bold-italic" also ends with "-italic"
+            for style, suffix in sorted(STYLES.items(), key=lambda item: -len(item[1])):
+                if base.endswith(suffix):
+                    self.files.setdefault(base[:len(base) - len(suffix)], {})[style] = os.path.join(fonts_dir, name)
+                    break
+
+        listed = {font.lower() for font in fonts}
+        self.unlisted = sorted(path for font, styles in self.files.items() if font not in listed for path in styles.values())
+        self.suffixes = sorted((font.lower()[i:], index) for index, font in enumerate(fonts) for i in range(len(font)))
+
+    def __contains__(self, font: str) -> bool:
+        return font in self.fonts
+
+    def resolve(self, font: str) -> str:
+        """The font to use for a name, the default font if the name isn't one of the fonts."""
+        return font if font in self else DEFAULT_FONT
+
+    def font_file(self, font: str, bold: bool = False, italic: bool = False) -> Union[Literal[None], str]:
+        """The ttf file of a style of a font, None if it is missing."""
+        return self.files.get(font.lower(), {}).get((bool(bold), bool(italic)))
+
+    def styles(self, font: str) -> List[Tuple[bool, bool]]:
+        """The (bold, italic) styles of a font that have a ttf file."""
+        return [style for style in STYLES if style in self.files.get(font.lower(), {})]
+
+    def missing_styles(self) -> Dict[str, List[Tuple[bool, bool]]]:
+        """The (bold, italic) styles without a ttf file, of every font that misses some."""
+        missing = {font: [style for style in STYLES if style not in self.files.get(font.lower(), {})] for font in self.fonts}
+        return {font: styles for font, styles in missing.items() if len(styles)}
+
+    def search(self, query: str) -> List[str]:
+        """Find the fonts whose name contains a text, regardless of case.
+
+        Args:
+            query (str): the text, all the fonts if empty
+
+        Returns:
+            List[str]: the fonts that start with the text, then the other fonts that contain it, each in the order of fonts.json
+        """
+        query = query.lower()
+        if not query:
+            return list(self.fonts)
+        start = bisect_left(self.suffixes, (query, -1))
+        matches: Set[int] = set()
+        for suffix, index in self.suffixes[start:]:
+            if not suffix.startswith(query):
+                break
+            matches.add(index)
+        return sorted((self.fonts[index] for index in matches),
+                      key=lambda font: (not font.lower().startswith(query), self.fonts.index(font)))
+
+    def report(self) -> List[str]:
+        """Describe the differences between fonts.json and the ttf files."""
+        problems = []
+        for font, styles in self.missing_styles().items():
+            names = ", ".join("regular" if style == (False, False) else STYLES[style][1:] for style in styles)
+            problems.append(f"font {font} has no ttf file for: {names}")
+        for path in self.unlisted:
+            problems.append(f"font file {os.path.basename(path)} is not a style of a font in fonts.json")
+        return problems
+
+
+@lru_cache(maxsize=1)
+def font_catalog() -> FontCatalog:
+    """The font catalog of the process, loaded on the first call.
+
+    Returns:
+        FontCatalog: the catalog
+    """
+    try:
+        with open(FONTS_FILE, encoding="utf-8") as file:
+            fonts: List[str] = json.load(file)["fonts"]
+    except (OSError, ValueError, KeyError) as error:
+        print(error, file=sys.stderr)
+        fonts = [DEFAULT_FONT]
+    # the problems of the catalog are told by report_missing_fonts, when a text fell back because of them
+    return FontCatalog(fonts)
@@ -0,0 +1,171 @@
+from typing import *
+
+Point = Tuple[float, float]
+Rect = Tuple[float, float, float, float]
+
+
+def normalize_rect(rect: Rect) -> Rect:
+    """Order the corners of a rectangle so it is (left, top, right, bottom)."""
+    return min(rect[0], rect[2]), min(rect[1], rect[3]), max(rect[0], rect[2]), max(rect[1], rect[3])
+
+
+def expand_rect(rect: Rect, by: float) -> Rect:
+    """Grow a rectangle by the same amount on every side."""
+    return rect[0] - by, rect[1] - by, rect[2] + by, rect[3] + by
+
+
+def is_point_in_rect(point: Point, rect: Rect) -> bool:
+    """Check if a point is inside a (normalized) rectangle, edges included."""
+    return rect[0] <= point[0] <= rect[2] and rect[1] <= point[1] <= rect[3]
+
+
+def segment_intersects_rect(p0: Point, p1: Point, rect: Rect) -> bool:
+    """Check if a line segment intersects a rectangle, using Liang-Barsky clipping.
+
+    Args:
+        p0 (Point): first endpoint of the segment
+        p1 (Point): second endpoint of the segment
+        rect (Rect): normalized rectangle (left, top, right, bottom)
+
+    Returns:
+        bool: True if any part of the segment is inside the rectangle
+    """
+    dx = p1[0] - p0[0]
+    dy = p1[1] - p0[1]
+    t0, t1 = 0.0, 1.0
+    for p, q in ((-dx, p0[0] - rect[0]), (dx, rect[2] - p0[0]), (-dy, p0[1] - rect[1]), (dy, rect[3] - p0[1])):
+        if p == 0:
+            # parallel to this edge, outside of it
+            if q < 0:
+                return False
+            continue
+        t = q / p
+        if p < 0:
+            if t > t1:
+                return False
+            t0 = max(t0, t)
+        else:
+            if t < t0:
+                return False
+            t1 = min(t1, t)
+    return t0 <= t1
+
+
+def polyline_intersects_rect(points: Sequence[Point], rect: Rect, closed: bool = False) -> bool:
+    """Check if a polyline intersects a rectangle. O(number of points).
+
+    Args:
+        points (Sequence[Point]): the points of the line
+        rect (Rect): normalized rectangle (left, top, right, bottom)
+        closed (bool, optional): whether the last point connects back to the first. Default is False.
+
+    Returns:
+        bool: True if any segment of the line is inside the rectangle
+    """
+    if not len(points):
+        return False
+    if len(points) == 1:
+        return is_point_in_rect(points[0], rect)
+    for i in range(1, len(points)):
+        if segment_intersects_rect(points[i - 1], points[i], rect):
+            return True
+    return closed and segment_intersects_rect(points[-1], points[0], rect)
+
+
+def is_point_inside_polygon(point: Point, polygon: Sequence[Point]) -> bool:
+    """Check if a point is inside a polygon, using the even-odd rule like the canvas fill.
+
+    Args:
+        point (Point): the point to check
+        polygon (Sequence[Point]): the vertices of the polygon
+
+    Returns:
+        bool: True if the point is inside the polygon
+    """
+    x, y = point
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        xi, yi = polygon[i]
+        xj, yj = polygon[j]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def polygon_intersects_rect(polygon: Sequence[Point], rect: Rect, filled: bool) -> bool:
+    """Check if a polygon intersects a rectangle.
+
+    Args:
+        polygon (Sequence[Point]): the vertices of the polygon
+        rect (Rect): normalized rectangle (left, top, right, bottom)
+        filled (bool): whether the inside of the polygon counts, or only its outline
+
+    Returns:
+        bool: True if the polygon intersects the rectangle
+    """
+    if polyline_intersects_rect(polygon, rect, closed=True):
+        return True
+    # the rectangle can only be entirely inside the polygon now
+    return filled and is_point_inside_polygon((rect[0], rect[1]), polygon)
+
+
+def triangle_intersects_rect(A: Point, B: Point, C: Point, rect: Rect, filled: bool = True) -> bool:
+    """Check if a triangle intersects a rectangle, using the separating axis theorem.
+
+    Args:
+        A, B, C (Point): the vertices of the triangle
+        rect (Rect): normalized rectangle (left, top, right, bottom)
+        filled (bool): whether the inside of the triangle counts, or only its outline
+
+    Returns:
+        bool: True if the triangle and the rectangle overlap
+    """
+    triangle = (A, B, C)
+    corners = ((rect[0], rect[1]), (rect[2], rect[1]), (rect[2], rect[3]), (rect[0], rect[3]))
+    axes = [(1.0, 0.0), (0.0, 1.0)]
+    for i in range(3):
+        p, q = triangle[i], triangle[(i + 1) % 3]
+        axis = (q[1] - p[1], p[0] - q[0])
+        if axis != (0, 0):
+            axes.append(axis)
+    for ax, ay in axes:
+        triangle_proj = [ax * p[0] + ay * p[1] for p in triangle]
+        rect_proj = [ax * p[0] + ay * p[1] for p in corners]
+        if max(triangle_proj) < min(rect_proj) or max(rect_proj) < min(triangle_proj):
+            return False
+    # the triangle is convex, the rectangle misses its outline only if all its corners are inside
+    return filled or not all(is_point_inside_polygon(corner, triangle) for corner in corners)
+
+
+def oval_intersects_rect(rect_point1: Point, rect_point2: Point, rect: Rect, filled: bool = True) -> bool:
+    """Check if an oval intersects a rectangle in closed form.
+
+    scaling the axes turns the oval into the unit circle and keeps the rectangle axis aligned,
+    so the point of the rectangle closest to the center is found by clamping.
+
+    Args:
+        rect_point1 (Point): one corner of the bounding rectangle of the oval
+        rect_point2 (Point): the opposite corner of the bounding rectangle of the oval
+        rect (Rect): normalized rectangle (left, top, right, bottom)
+        filled (bool): whether the inside of the oval counts, or only its outline
+
+    Returns:
+        bool: True if the oval and the rectangle overlap
+    """
+    center = ((rect_point1[0] + rect_point2[0]) / 2, (rect_point1[1] + rect_point2[1]) / 2)
+    major_axis = abs(rect_point2[0] - rect_point1[0]) / 2
+    minor_axis = abs(rect_point2[1] - rect_point1[1]) / 2
+    if major_axis == 0 or minor_axis == 0:
+        # a flat oval is just a line
+        return segment_intersects_rect(rect_point1, rect_point2, rect)
+    def inside(point: Point) -> bool:
+        return ((point[0] - center[0]) / major_axis) ** 2 + ((point[1] - center[1]) / minor_axis) ** 2 <= 1
+
+    closest = (min(max(center[0], rect[0]), rect[2]), min(max(center[1], rect[1]), rect[3]))
+    if not inside(closest):
+        return False
+    # the oval is convex, the rectangle misses its outline only if all its corners are inside
+    corners = ((rect[0], rect[1]), (rect[2], rect[1]), (rect[2], rect[3]), (rect[0], rect[3]))
+    return filled or not all(inside(corner) for corner in corners)
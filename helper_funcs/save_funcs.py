@@ -0,0 +1,319 @@
+"""Reading and writing the saved canvas files.
+
+a stroke is saved as a record: a dict with the keys of the first format (type, coordinates, color, fill,
+width, font, font_size, shape, italic, bold, text), "" for the keys the stroke doesn't have.
+
+version 1 is a json list of records. version 2 stores the strokes in columns:
+    {
+        "version": 2,
+        "kinds": [[type, shape], ...],          # table of the stroke types
+        "styles": [[color, fill, width, font, font_size, italic, bold], ...],   # table of the shared styles
+        "kind": [...], "style": [...],          # per stroke, an index into the tables
+        "offsets": [...],                       # per stroke, where its points start in "coordinates", plus the end
+        "coordinates": {"dtype": "<i2", "x": "...", "y": "..."},
+                                                # the points of all the strokes, one after the other: the
+                                                # differences between consecutive xs and between consecutive ys,
+                                                # packed in base64 as the smallest little endian int that fits
+        "texts": [[stroke index, text], ...]    # only for the strokes that have text
+    }
+and can be gzip compressed, the files are told apart by their content, not their name.
+the first version 2 files stored "coordinates" flat (x0, y0, x1, y1, ...) as int32 in base64, or as a json
+list if the points were not ints, they are still read.
+
+the points of the loaded records are Points, they are turned into tuples when they are used: reading a
+file doesn't make a tuple per point.
+"""
+import base64
+import gzip
+import io
+import json
+import os
+from itertools import chain
+from typing import *
+
+import numpy as np
+import numpy.typing as npt
+
+Record = Dict[str, Any]
+
+VERSION = 2
+STYLE_KEYS = ("color", "fill", "width", "font", "font_size", "italic", "bold")
+GZIP_MAGIC = b"\x1f\x8b"
+# the types the coordinate differences are packed in, the smallest that fits is used
+PACK_DTYPES = ("<i1", "<i2", "<i4", "<i8")
+
+
+class Points(Sequence[Tuple[Any, Any]]):
+    """The points of a loaded stroke, a view of the coordinate columns of the file.
+    a sequence of (x, y) tuples, made when the points are used.
+    """
+    __slots__ = ("xs", "ys")
+
+    def __init__(self, xs: npt.NDArray[Any], ys: npt.NDArray[Any]) -> None:
+        self.xs = xs
+        self.ys = ys
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def __getitem__(self, i: Any) -> Any:
+        if isinstance(i, slice):
+            return list(zip(self.xs[i].tolist(), self.ys[i].tolist()))
+        return self.xs.item(i), self.ys.item(i)
+
+    def __iter__(self) -> Iterator[Tuple[Any, Any]]:
+        return zip(self.xs.tolist(), self.ys.tolist())
+
+    def __repr__(self) -> str:
+        return f"Points({list(self)!r})"
+
+
+def stroke_to_record(stroke: Any) -> Record:
+    """Describe a stroke as a record.
+
+    Args:
+        stroke (Stroke): the stroke
+
+    Returns:
+        Record: the record of the stroke
+    """
+    return {
+        "type": stroke.__class__.__name__,
+        "coordinates": stroke.coordinates,
+        "color": stroke.color,
+        "fill": stroke.fill if hasattr(stroke, "fill") else "",
+        "width": stroke.width,
+        "font": stroke.font if hasattr(stroke, "font") else "",
+        "font_size": stroke.font_size if hasattr(stroke, "font_size") else "",
+        "shape": stroke.shape.name if hasattr(stroke, "shape") else "",
+        "italic": stroke.italic if hasattr(stroke, "italic") else "",
+        "bold": stroke.bold if hasattr(stroke, "bold") else "",
+        "text": stroke.text if hasattr(stroke, "text") else ""
+    }
+
+
+def records_to_columns(records: Iterable[Record]) -> Dict[str, Any]:
+    """Convert records to the columns of the version 2 format.
+
+    Args:
+        records (Iterable[Record]): the records of the strokes, in layer order
+
+    Returns:
+        Dict[str, Any]: the version 2 data
+    """
+    kinds: Dict[Tuple[str, str], int] = {}
+    styles: Dict[Tuple[Any, ...], int] = {}
+    kind: List[int] = []
+    style: List[int] = []
+    offsets: List[int] = [0]
+    coordinates: List[int] = []
+    texts: List[Tuple[int, str]] = []
+    for i, record in enumerate(records):
+        kind.append(kinds.setdefault((record["type"], record["shape"]), len(kinds)))
+        style.append(styles.setdefault(tuple(record[key] for key in STYLE_KEYS), len(styles)))
+        coordinates.extend(chain.from_iterable(record["coordinates"]))
+        offsets.append(len(coordinates) // 2)
+        if record["text"]:
+            texts.append((i, record["text"]))
+    return {
+        "version": VERSION,
+        "kinds": list(kinds),
+        "styles": list(styles),
+        "kind": kind,
+        "style": style,
+        "offsets": offsets,
+        "coordinates": pack_points(coordinates),
+        "texts": texts,
+    }
+
+
+def pack_points(values: List[Any]) -> Union[Dict[str, str], List[Any]]:
+    """Pack flat coordinates (x0, y0, x1, y1, ...) as the differences between consecutive xs and ys.
+    the points of a stroke are close to each other, so the differences mostly fit in one or two bytes:
+    much smaller and faster to write and read than a json list. values that are not all ints are kept as a list.
+    """
+    flat = np.array(values) if len(values) else np.zeros(0, dtype=np.int64)
+    if flat.dtype.kind != "i":
+        # floats, or ints too big for int64
+        return values
+    deltas = [np.diff(flat[0::2], prepend=0), np.diff(flat[1::2], prepend=0)]
+    low = min((int(delta.min()) for delta in deltas if len(delta)), default=0)
+    high = max((int(delta.max()) for delta in deltas if len(delta)), default=0)
+    dtype = next(np.dtype(dtype) for dtype in PACK_DTYPES
+                 if np.iinfo(np.dtype(dtype)).min <= low and high <= np.iinfo(np.dtype(dtype)).max)
+    x, y = (base64.b64encode(delta.astype(dtype).tobytes()).decode("ascii") for delta in deltas)
+    return {"dtype": dtype.str, "x": x, "y": y}
+
+
+def unpack_points(packed: Union[Dict[str, str], str, List[Any]]) -> Tuple[npt.NDArray[Any], npt.NDArray[Any]]:
+    """Unpack the coordinates packed by pack_points (or by the first version 2 files), as the xs and the ys."""
+    if isinstance(packed, dict):
+        x, y = (np.frombuffer(base64.b64decode(packed[axis]), dtype=packed["dtype"]).cumsum(dtype=np.int64)
+                for axis in ("x", "y"))
+        return x, y
+    if isinstance(packed, str):
+        flat = np.frombuffer(base64.b64decode(packed), dtype="<i4")
+    else:
+        flat = np.array(packed, dtype=object if len(packed) else np.int64)
+    return flat[0::2], flat[1::2]
+
+
+def columns_to_records(data: Dict[str, Any], start: int = 0, stop: Union[Literal[None], int] = None,
+                       lazy: bool = True) -> List[Record]:
+    """Convert the columns of the version 2 format back to records.
+
+    Args:
+        data (Dict[str, Any]): the version 2 data
+        start (int, optional): the index of the first stroke to convert. Default is 0.
+        stop (int, optional): the index after the last stroke to convert. Default is all the strokes.
+        lazy (bool, optional): whether the coordinates of the records are Points, or lists of tuples. Default is True.
+
+    Returns:
+        List[Record]: the records of the strokes, in layer order
+    """
+    if "texts_by_index" not in data:
+        data["texts_by_index"] = dict(data["texts"])
+        data["points"] = unpack_points(data["coordinates"])
+    texts = data["texts_by_index"]
+    xs, ys = data["points"]
+    offsets = data["offsets"]
+    styles, kinds = data["styles"], data["kinds"]
+    stop = len(data["kind"]) if stop is None else stop
+    records = []
+    for i in range(start, stop):
+        begin, end = offsets[i], offsets[i + 1]
+        record: Record = dict(zip(STYLE_KEYS, styles[data["style"][i]]))
+        record["type"], record["shape"] = kinds[data["kind"][i]]
+        points = Points(xs[begin:end], ys[begin:end])
+        record["coordinates"] = points if lazy else list(points)
+        record["text"] = texts.get(i, "")
+        records.append(record)
+    return records
+
+
+def v1_record(record: Record) -> Record:
+    """Fix a record read from a version 1 file, the points are lists in json."""
+    record["coordinates"] = [tuple(co) for co in record["coordinates"]]
+    return record
+
+
+def write_canvas_data(filename: str, records: Iterable[Record], compress: bool = True,
+                      progress: Union[Literal[None], Callable[[float], None]] = None) -> None:
+    """Save records in the version 2 format.
+
+    Args:
+        filename (str): the path of the file
+        records (Iterable[Record]): the records of the strokes, in layer order
+        compress (bool, optional): whether to gzip the file. Default is True.
+        progress (Callable[[float], None], optional): called with the part of the work done (0 to 1) between the steps.
+    """
+    columns = records_to_columns(records)
+    if progress:
+        progress(0.4)
+    text = json.dumps(columns, separators=(",", ":"))
+    if progress:
+        progress(0.6)
+    if compress:
+        # the packed coordinates barely compress better at higher levels, which are many times slower
+        with gzip.open(filename, "wt", encoding="utf-8", compresslevel=1) as file:
+            file.write(text)
+    else:
+        with open(filename, "w", encoding="utf-8") as file:
+            file.write(text)
+
+
+def read_canvas_data(filename: str) -> List[Record]:
+    """Load the records saved in a file, in any of the formats.
+
+    Args:
+        filename (str): the path of the file
+
+    Returns:
+        List[Record]: the records of the strokes, in layer order
+    """
+    with open(filename, "rb") as file:
+        content = file.read()
+    if content[:2] == GZIP_MAGIC:
+        content = gzip.decompress(content)
+    data = json.loads(content)
+    if isinstance(data, list):
+        return [v1_record(record) for record in data]
+    if data.get("version") != VERSION:
+        raise ValueError(f"unsupported canvas data version: {data.get('version')}")
+    return columns_to_records(data)
+
+
+def is_canvas_data(filename: str) -> bool:
+    """Check quickly if a file looks like saved canvas data (gzip or json), without reading all of it."""
+    try:
+        with open(filename, "rb") as file:
+            start = file.read(64)
+    except OSError:
+        return False
+    return start[:2] == GZIP_MAGIC or start.lstrip()[:1] in (b"[", b"{")
+
+
+def iter_canvas_data(filename: str, batch_size: int = 500, chunk_size: int = 1 << 20) -> Iterator[Tuple[List[Record], float]]:
+    """Load the records saved in a file in batches, without holding the whole version 1 file in memory.
+
+    version 1 files are parsed a record at a time as the file is read, version 2 files are parsed at
+    once (the columns are small) and converted to records a batch at a time.
+
+    Args:
+        filename (str): the path of the file
+        batch_size (int, optional): the number of records in a batch. Default is 500.
+        chunk_size (int, optional): the number of bytes read at a time. Default is 1MB.
+
+    Yields:
+        Tuple[List[Record], float]: a batch of records, in layer order, and the part of the file loaded so far (0 to 1)
+    """
+    size = max(os.path.getsize(filename), 1)
+    with open(filename, "rb") as raw:
+        compressed = raw.read(2) == GZIP_MAGIC
+        raw.seek(0)
+        file = io.TextIOWrapper(cast(IO[bytes], gzip.GzipFile(fileobj=raw)) if compressed else raw, encoding="utf-8")
+
+        buffer = file.read(chunk_size).lstrip()
+        if buffer.startswith("{"):
+            buffer += file.read()
+            data = json.loads(buffer)
+            if data.get("version") != VERSION:
+                raise ValueError(f"unsupported canvas data version: {data.get('version')}")
+            count = len(data["kind"])
+            for start in range(0, count, batch_size):
+                # the tuples are made here, on the reading thread, not when the strokes are created
+                yield columns_to_records(data, start, min(start + batch_size, count), lazy=False), min(start + batch_size, count) / max(count, 1)
+            return
+        if not buffer.startswith("["):
+            raise ValueError("not a canvas data file")
+
+        decoder = json.JSONDecoder()
+        position = 1
+        batch: List[Record] = []
+        eof = False
+        while True:
+            # skip to the next record
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position < len(buffer) and buffer[position] == "]":
+                break
+            try:
+                if position == len(buffer):
+                    raise ValueError("unexpected end of the canvas data file")
+                record, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                if eof:
+                    raise
+                # the record continues in the next chunk
+                more = file.read(chunk_size)
+                eof = not more
+                buffer = buffer[position:] + more
+                position = 0
+                continue
+            batch.append(v1_record(record))
+            position = end
+            if len(batch) >= batch_size:
+                yield batch, min(raw.tell() / size, 1.0)
+                batch = []
+        if len(batch):
+            yield batch, 1.0
@@ -0,0 +1,46 @@
+from typing import *
+
+import numpy as np
+
+
+def simplify_points(points: List[Tuple[int, int]], tolerance: float) -> List[Tuple[int, int]]:
+    """Simplify a polyline with the Ramer-Douglas-Peucker algorithm.
+    points that are closer than the tolerance to the simplified line are dropped.
+
+    Args:
+        points (List[Tuple[int, int]]): the points of the line
+        tolerance (float): the maximal distance in pixels between a dropped point and the simplified line
+
+    Returns:
+        List[Tuple[int, int]]: the kept points, the first and last points are always kept
+    """
+    if len(points) < 3 or tolerance <= 0:
+        return list(points)
+
+    pts = np.asarray(points, dtype=np.float64)
+    keep = np.zeros(len(points), dtype=np.bool_)
+    keep[0] = keep[-1] = True
+
+    # an explicit stack instead of recursion, long strokes would exceed the recursion limit
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        start, end = pts[first], pts[last]
+        between = pts[first + 1:last]
+        dx, dy = end - start
+        length = np.hypot(dx, dy)
+        if length:
+            distances = np.abs(dy * (between[:, 0] - start[0]) - dx * (between[:, 1] - start[1])) / length
+        else:
+            # closed loop, measure the distance from the start point
+            distances = np.hypot(between[:, 0] - start[0], between[:, 1] - start[1])
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            index = first + 1 + farthest
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return [point for point, kept in zip(points, keep) if kept]
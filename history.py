@@ -0,0 +1,143 @@
+from collections import deque
+from typing import *
+
+from action import Action
+from journal import Journal
+from stroke_store import StrokeStore
+
+
+class History():
+    """The undo and redo stacks of the painter, bounded by a number of entries and an estimated memory budget.
+
+    when the history is over budget the oldest undo entries are evicted, and the strokes that only they
+    kept alive (deleted or cleared strokes) are released.
+
+    Attributes:
+        painter_strokes (StrokeStore): All strokes on the canvas. (pointer to the strokes the painter holds)
+        max_entries (int): the maximal number of entries in both stacks together, 0 for no limit.
+        max_bytes (int): the maximal estimated memory of the entries in bytes, 0 for no limit.
+        done (Deque[Tuple[Action, int]]): the actions that can be undone and their estimated size, oldest first.
+        undone (List[Tuple[Action, int]]): the actions that can be redone and their estimated size.
+        evicted (int): the number of entries evicted since the history was created.
+        journal (Journal): the autosave journal the changes are written to, if autosave is on.
+    """
+
+    def __init__(self, painter_strokes: StrokeStore, max_entries: int = 200, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.painter_strokes = painter_strokes
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.done: Deque[Tuple[Action, int]] = deque()
+        self.undone: List[Tuple[Action, int]] = []
+        self.bytes = 0
+        self.evicted = 0
+        self.journal: Union[Literal[None], Journal] = None
+        self.journal_renumbers = 0
+        painter_strokes.on_renumber = self.renumbered
+
+    def __len__(self) -> int:
+        return len(self.done) + len(self.undone)
+
+    def memory_usage(self) -> int:
+        """The estimated memory kept alive by the history in bytes."""
+        return self.bytes
+
+    def last(self) -> Union[Literal[None], Action]:
+        """The action that would be undone next, None if there is nothing to undo or something to redo."""
+        if len(self.undone) or not len(self.done):
+            return None
+        return self.done[-1][0]
+
+    def push(self, action: Action) -> None:
+        """Record a new action. the redo stack is dropped, and old entries are evicted if over budget."""
+        while len(self.undone):
+            self.release(*self.undone.pop())
+        self.add_done(action)
+        self.log(action)
+        self.evict()
+
+    def undo(self) -> None:
+        """Undo the last action, if available, and move it to the redo stack."""
+        if not len(self.done):
+            return
+        action, size = self.done.pop()
+        self.bytes -= size
+        new_action = action.undo()
+        new_size = new_action.memory_size()
+        self.undone.append((new_action, new_size))
+        self.bytes += new_size
+        self.log(new_action)
+        self.evict()
+
+    def redo(self) -> None:
+        """Redo the last undone action, if available, and move it back to the undo stack."""
+        if not len(self.undone):
+            return
+        action, size = self.undone.pop()
+        self.bytes -= size
+        new_action = action.redo()
+        self.add_done(new_action)
+        self.log(new_action)
+        self.evict()
+
+    def log(self, action: Action) -> None:
+        """Write the changes made by an action to the autosave journal, or a new snapshot when needed.
+        also used for changes merged into an action that is already in the history.
+        """
+        if not self.journal:
+            return
+        entries = action.journal()
+        if entries is None or self.journal.needs_snapshot() or self.painter_strokes.renumbers != self.journal_renumbers:
+            # the journal entries use the layer keys, they can't describe renumbered keys
+            self.snapshot()
+        else:
+            self.journal.append(entries)
+
+    def snapshot(self) -> None:
+        """Save the whole drawing to the autosave journal."""
+        if not self.journal:
+            return
+        self.journal_renumbers = self.painter_strokes.renumbers
+        self.journal.snapshot(self.painter_strokes)
+
+    def clear(self) -> None:
+        """Remove all the entries."""
+        while len(self.undone):
+            self.release(*self.undone.pop())
+        while len(self.done):
+            self.release(*self.done.pop())
+
+    def renumbered(self, remap: Callable[[float], float]) -> None:
+        """Move the layer keys kept by the entries to the new numbering of the store, see ZOrder.renumber.
+        the removed strokes (compacted out of the store) and the keys of the moved strokes would otherwise
+        be restored to the wrong layer. the journal gets a new snapshot on the next log.
+        """
+        actions = [action for action, _ in self.done] + [action for action, _ in self.undone]
+        # a stroke can be kept by several entries, its key is moved once
+        strokes = {id(stroke): stroke for action in actions for stroke in action.strokes}
+        for stroke in strokes.values():
+            stroke.z = remap(stroke.z)
+        for action in actions:
+            action.remap_keys(remap)
+
+    def add_done(self, action: Action) -> None:
+        size = action.memory_size()
+        self.done.append((action, size))
+        self.bytes += size
+
+    def over_budget(self) -> bool:
+        return (self.max_entries > 0 and len(self) > self.max_entries) or \
+            (self.max_bytes > 0 and self.bytes > self.max_bytes)
+
+    def evict(self) -> None:
+        """Remove the oldest undo entries until the history is within its budget."""
+        while len(self.done) and self.over_budget():
+            self.release(*self.done.popleft())
+            self.evicted += 1
+
+    def release(self, action: Action, size: int) -> None:
+        """Drop an entry and the strokes it kept alive."""
+        self.bytes -= size
+        action.release()
+        # removed strokes also stay in the store as tombstones until it is compacted
+        if self.painter_strokes.dead > self.painter_strokes.compact_threshold:
+            self.painter_strokes.compact()
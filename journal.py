@@ -0,0 +1,189 @@
+"""An append-only journal of the changes to the drawing, for autosave and crash recovery.
+
+the autosave directory holds a snapshot of the whole drawing (snapshot.json.gz, the version 2 save
+format with the ids and layer keys of the strokes) and a journal of the changes made since
+(journal.jsonl, one json entry per line):
+    {"seq": 12, "op": "put", "id": 3, "z": 2.5, "record": {...}}   # a stroke was added or changed
+    {"seq": 13, "op": "remove", "ids": [3, 4]}                     # strokes were removed
+    {"seq": 14, "op": "move", "ids": [3, 4], "dx": 1, "dy": 0}     # strokes were moved
+    {"seq": 15, "op": "z", "keys": [[3, 0.5], [4, 0.75]]}          # strokes changed layer
+every entry has a sequence number, the snapshot keeps the number of the last entry it includes so
+the entries written before it are skipped even if the journal wasn't truncated yet.
+the files are written by a worker thread, the Tk thread only builds the (small) entries.
+"""
+import gzip
+import json
+import os
+import queue
+import sys
+import threading
+from typing import *
+
+from helper_funcs.save_funcs import columns_to_records, records_to_columns, stroke_to_record, v1_record
+
+if TYPE_CHECKING:
+    from stroke import Stroke
+
+Entry = Dict[str, Any]
+
+SNAPSHOT_FILE = "snapshot.json.gz"
+JOURNAL_FILE = "journal.jsonl"
+
+
+def stroke_entry(stroke: "Stroke") -> Entry:
+    """The journal entry of a stroke that was added or changed."""
+    record = stroke_to_record(stroke)
+    # the stroke may still change after the entry is written by the worker thread
+    record["coordinates"] = list(record["coordinates"])
+    return {"op": "put", "id": stroke.id, "z": stroke.z, "record": record}
+
+
+class Journal():
+    """Writes the journal and the snapshots of the drawing on a worker thread.
+
+    Attributes:
+        directory (str): the autosave directory.
+        snapshot_every (int): the number of journal entries after which a new snapshot is taken.
+        sequence (int): the number of the last entry.
+        since_snapshot (int): the number of entries written since the last snapshot.
+        error (Exception): the last error of the worker thread, if any.
+    """
+
+    def __init__(self, directory: str, snapshot_every: int = 500) -> None:
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.sequence = 0
+        self.since_snapshot = 0
+        self.error: Union[Literal[None], Exception] = None
+        self.tasks: "queue.Queue[Union[Literal[None], Tuple[str, Any]]]" = queue.Queue()
+        os.makedirs(directory, exist_ok=True)
+        # start over, entries of an older session must never be replayed on this one's snapshot
+        Journal.discard(directory)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def append(self, entries: List[Entry]) -> None:
+        """Add entries to the journal."""
+        for entry in entries:
+            self.sequence += 1
+            entry["seq"] = self.sequence
+        self.since_snapshot += len(entries)
+        self.tasks.put(("entries", entries))
+
+    def needs_snapshot(self) -> bool:
+        return self.since_snapshot >= self.snapshot_every
+
+    def snapshot(self, strokes: Iterable["Stroke"]) -> None:
+        """Save the whole drawing, the journal starts over after it.
+
+        Args:
+            strokes (Iterable[Stroke]): all the strokes, in layer order
+        """
+        entries = [stroke_entry(stroke) for stroke in strokes]
+        self.since_snapshot = 0
+        self.tasks.put(("snapshot", (self.sequence, entries)))
+
+    def close(self, discard: bool = True) -> None:
+        """Stop the worker thread after it wrote everything.
+
+        Args:
+            discard (bool, optional): whether to delete the autosave files, when the drawing doesn't need to be recovered. Default is True.
+        """
+        self.tasks.put(None)
+        self.thread.join()
+        if discard:
+            Journal.discard(self.directory)
+
+    def run(self) -> None:
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                return
+            try:
+                kind, data = task
+                if kind == "entries":
+                    self.write_entries(data)
+                else:
+                    self.write_snapshot(*data)
+            except Exception as error:
+                self.error = error
+                # the worker thread can't show a popup, the drawing is still in memory
+                print(f"autosave failed: {error}", file=sys.stderr)
+
+    def write_entries(self, entries: List[Entry]) -> None:
+        with open(os.path.join(self.directory, JOURNAL_FILE), "a", encoding="utf-8") as file:
+            file.write("".join(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries))
+
+    def write_snapshot(self, sequence: int, entries: List[Entry]) -> None:
+        data = records_to_columns(entry["record"] for entry in entries)
+        data["ids"] = [entry["id"] for entry in entries]
+        data["z"] = [entry["z"] for entry in entries]
+        data["sequence"] = sequence
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        with gzip.open(path + ".tmp", "wt", encoding="utf-8", compresslevel=1) as file:
+            file.write(json.dumps(data, separators=(",", ":")))
+        # replace the snapshot at once, a crash leaves either the old or the new one
+        os.replace(path + ".tmp", path)
+        open(os.path.join(self.directory, JOURNAL_FILE), "w").close()
+
+    @staticmethod
+    def discard(directory: str) -> None:
+        """Delete the autosave files."""
+        for name in (SNAPSHOT_FILE, SNAPSHOT_FILE + ".tmp", JOURNAL_FILE):
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def set_aside(directory: str) -> List[str]:
+        """Rename the autosave files to *.bak, so a drawing that couldn't be recovered is not deleted when
+        autosave starts over. older .bak files are replaced.
+
+        Returns:
+            List[str]: the paths of the renamed files
+        """
+        kept = []
+        for name in (SNAPSHOT_FILE, JOURNAL_FILE):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path):
+                os.replace(path, path + ".bak")
+                kept.append(path + ".bak")
+        return kept
+
+    @staticmethod
+    def read(directory: str) -> Tuple[List[Entry], List[Entry]]:
+        """Read what a previous session left in the directory.
+
+        Args:
+            directory (str): the autosave directory
+
+        Returns:
+            Tuple[List[Entry], List[Entry]]: the strokes of the snapshot as put entries, in layer order,
+                and the journal entries written after the snapshot
+        """
+        snapshot: List[Entry] = []
+        sequence = 0
+        path = os.path.join(directory, SNAPSHOT_FILE)
+        if os.path.isfile(path):
+            with gzip.open(path, "rt", encoding="utf-8") as file:
+                data = json.load(file)
+            sequence = data["sequence"]
+            snapshot = [{"op": "put", "id": stroke_id, "z": z, "record": record}
+                        for stroke_id, z, record in zip(data["ids"], data["z"], columns_to_records(data))]
+
+        entries: List[Entry] = []
+        path = os.path.join(directory, JOURNAL_FILE)
+        if os.path.isfile(path):
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # the last line may have been cut by the crash
+                        break
+                    if entry["seq"] > sequence:
+                        if entry["op"] == "put":
+                            v1_record(entry["record"])
+                        entries.append(entry)
+        return snapshot, entries
@@ -1,24 +1,92 @@
 import tkinter as tk
+from tkinter import messagebox
 
 from math import *
 from typing import *
 import sys
+import os
+import re
 
 from enums import State
 
 from toolbar import ToolBar
 from painter import Painter
+from stroke import Stroke
+from action import Action
+from viewport import Viewport
+from raster_cache import RasterCache
+from journal import Entry, Journal
+from profiler import Profiler
+from components.perf_overlay import PerfOverlay
 
 from helper_funcs.export_funcs import *
 
+# the painter handlers timed when profiling, see instrument
+PROFILED_HANDLERS = ["handle_drag", "handle_left_click", "handle_left_click_canvas", "handle_right_click",
+                     "handle_move_canvas", "handle_btn_release", "handle_typing", "handle_wheel", "flush_motion",
+                     "select_by_rect", "move_forward_backward_selected", "move_selected_one_step", "nudge_selected",
+                     "delete_selected", "delete_all", "copy_selected", "pasted_copied", "undo", "redo",
+                     "view_changed", "load_step"]
+
+
+def instrument(profiler: Profiler) -> None:
+    """time the painter handlers, the painting of the strokes, the undo and redo of the actions
+    and the deferred work of the viewport and the raster cache. must be called before the painter is created,
+    it binds its handlers when it is.
+    """
+    profiler.instrument(Painter, PROFILED_HANDLERS)
+    profiler.instrument_overrides(Stroke, ["paint"])
+    profiler.instrument_overrides(Action, ["undo", "redo"])
+    profiler.instrument(Viewport, ["flush"])
+    profiler.instrument(RasterCache, ["flush", "view_changed"])
+
+def usage_error(message: str) -> NoReturn:
+    """print what is wrong with the options and exit, like a command line tool does
+    """
+    print(f"main.py: error: {message}", file=sys.stderr)
+    print("run python3 main.py --help to see the options", file=sys.stderr)
+    sys.exit(2)
+
+
+def number_option(options: Dict[str, str], name: str, default: Any, kind: Callable[[str], Any] = float) -> Any:
+    """read a --name=value option that is a number >= 0
+
+    Args:
+        options (Dict[str, str]): the options given, by name
+        name (str): the name of the option
+        default (Any): the value when the option is not given
+        kind (Callable[[str], Any], optional): int or float. Default is float.
+    """
+    if name not in options:
+        return default
+    value = options[name]
+    try:
+        number = kind(value)
+    except ValueError:
+        number = None
+    if number is None or not isfinite(number) or number < 0:
+        usage_error(f"--{name} must be a {'whole ' if kind is int else ''}number >= 0, not {value!r}")
+    return number
+
 class Application(tk.Frame):
     """main application
     """
 
-    def __init__(self, master: tk.Misc) -> None:
+    def __init__(self, master: tk.Misc, simplify_tolerance: float = 1.0, frame_rate: int = 60, history_entries: int = 200, history_bytes: int = 64 * 1024 * 1024, compress_saves: bool = True, raster_cache: bool = False, document_size: Tuple[int, int] = (640, 480), profiler: Union[Literal[None], Profiler] = None) -> None:
         super().__init__(master)
         self.master = master
-        self.grid(row=0, column=0)
+        self.simplify_tolerance = simplify_tolerance
+        self.frame_rate = frame_rate
+        self.history_entries = history_entries
+        self.history_bytes = history_bytes
+        self.compress_saves = compress_saves
+        self.raster_cache = raster_cache
+        self.document_size = document_size
+        self.profiler = profiler
+        self.grid(row=0, column=0, sticky=tk.NSEW)
+        # the painter takes the space the window gets when it is resized
+        self.rowconfigure(1, weight=1)
+        self.columnconfigure(1, weight=1)
         self.color = tk.StringVar(self, "#ffffff")
         self.fill = tk.StringVar(self, "")
         self.state = tk.StringVar(self, State.PAINT.value)
@@ -44,7 +112,14 @@ class Application(tk.Frame):
             font_size=self.font_size,
             width=self.width,
             bold=self.bold,
-            italic=self.italic)
+            italic=self.italic,
+            simplify_tolerance=self.simplify_tolerance,
+            frame_rate=self.frame_rate,
+            history_entries=self.history_entries,
+            history_bytes=self.history_bytes,
+            compress_saves=self.compress_saves,
+            raster_cache=self.raster_cache,
+            document_size=self.document_size)
 
         self.toolbar = ToolBar(
             self, 
@@ -58,24 +133,67 @@ class Application(tk.Frame):
             italic=self.italic,
             export={
             "png": self.painter.export_to_png,
-            "svg": lambda: export_to_svg(self.painter.canvas, root),
-            "eps": lambda: export_to_eps(self.painter.canvas)
+            "png_dpi": self.painter.export_to_png_at_dpi,
+            "svg": lambda: export_to_svg(self.painter.exporter, self.painter.strokes, self.canvas_size(), root),
+            "eps": lambda: export_to_eps(self.painter.exporter, self.painter.strokes, self.canvas_size())
             },
             delete_all=self.painter.delete_all,
             save_to_json=self.painter.save_to_json,
             load_json=self.painter.restore_data_from_json,
             undo=self.painter.undo,
-            redo=self.painter.redo)
+            redo=self.painter.redo,
+            cancel_export=self.painter.exporter.cancel)
+        self.painter.exporter.on_update = self.toolbar.export_status.update_status
+
+        if self.profiler:
+            self.profiler.watch(self.painter.canvas)
+            self.perf_overlay = PerfOverlay(self.painter, self.profiler)
+            self.perf_overlay.place(in_=self.painter.canvas, relx=1.0, x=-4, y=4, anchor=tk.NE)
+
+    def canvas_size(self) -> Tuple[int, int]:
+        return self.painter.viewport.size
 
 
 if len(sys.argv) >= 2 and sys.argv[1] == "--help":
     print("To run this program, simply run main.py using python3:")
     print("python3 main.py")
     print("no arguments needed.")
+    print("options:")
+    print("  --simplify-tolerance=<pixels>  how much freestyle strokes are simplified when finished, 0 keeps every point (default 1)")
+    print("  --frame-rate=<hz>              how many times a second pointer motion is drawn, 0 draws every event (default 60)")
+    print("  --history-entries=<count>      how many actions can be undone and redone, 0 for no limit (default 200)")
+    print("  --history-mb=<megabytes>       about how much memory the undo history may use, 0 for no limit (default 64)")
+    print("  --autosave-dir=<path>          where changes are journaled for crash recovery, empty turns autosave off (default .autosave)")
+    print("  --compress-saves=<0|1>         whether saved files are gzip compressed (default 1)")
+    print("  --raster-cache=<0|1>           flatten the strokes that aren't edited into one image, faster for big drawings (default 0)")
+    print("  --document-size=<width>x<height>  the size of the drawing, what is exported, the view scrolls and zooms over it (default 640x480)")
+    print("  --profile=<path>               time the handlers, show their latencies over the canvas and write them to")
+    print("                                 a JSON file on exit, PAINTER_PROFILE=<path> does the same (default off)")
     
     
 else:
 
+    # options are given as --name=value
+    options = dict(arg[2:].split("=", 1) for arg in sys.argv[1:] if arg.startswith("--") and "=" in arg)
+    simplify_tolerance = number_option(options, "simplify-tolerance", 1.0)
+    frame_rate = number_option(options, "frame-rate", 60, int)
+    history_entries = number_option(options, "history-entries", 200, int)
+    history_bytes = int(number_option(options, "history-mb", 64) * 1024 * 1024)
+    compress_saves = options.get("compress-saves", "1") != "0"
+    raster_cache = options.get("raster-cache", "0") != "0"
+    autosave_dir = options.get("autosave-dir", ".autosave")
+    document_size_option = options.get("document-size", "640x480")
+    size_match = re.fullmatch(r"(\d+)x(\d+)", document_size_option.strip().lower())
+    document_size = (int(size_match.group(1)), int(size_match.group(2))) if size_match else (0, 0)
+    if min(document_size) <= 0:
+        usage_error(f"--document-size must be <width>x<height> in whole pixels > 0, like 1920x1080, not {document_size_option!r}")
+    profile_path = options.get("profile", os.environ.get("PAINTER_PROFILE", ""))
+
+    profiler: Union[Literal[None], Profiler] = None
+    if profile_path:
+        profiler = Profiler()
+        instrument(profiler)
+
     root = tk.Tk()
 
     def left_click(event: tk.Event) -> None:
@@ -95,7 +213,8 @@ else:
 
 
     root.geometry('850x680')
-    root.resizable(False, False)
+    root.rowconfigure(0, weight=1)
+    root.columnconfigure(0, weight=1)
 
 
     root.bind('<Button-1>', left_click)
@@ -103,5 +222,41 @@ else:
     root.bind('<Button-3>', right_click)
     root.bind('<Key>', handle_key_press)
 
-    app = Application(master=root)
+    app = Application(master=root, simplify_tolerance=simplify_tolerance, frame_rate=frame_rate,
+                      history_entries=history_entries, history_bytes=history_bytes, compress_saves=compress_saves, raster_cache=raster_cache,
+                      document_size=document_size, profiler=profiler)
+
+    if autosave_dir:
+        # a previous session that didn't close properly left its drawing in the autosave directory
+        recover: Union[Literal[None], Tuple[List[Entry], List[Entry]]] = None
+        try:
+            snapshot, entries = Journal.read(autosave_dir)
+            if (len(snapshot) or len(entries)) and \
+                messagebox.askyesno("Recover Drawing", "The last session was not closed properly.\nRecover its drawing?"):
+                recover = (snapshot, entries)
+        except Exception as error:
+            # autosave starts over in the directory, the files that couldn't be read are kept aside
+            kept = Journal.set_aside(autosave_dir)
+            error_popup(root, f"reading the autosave failed:\n{error}\n\nthe autosave was kept in:\n" + "\n".join(kept))
+        app.painter.start_autosave(autosave_dir, recover)
+
+    def close() -> None:
+        # closing already, clicking again does nothing
+        root.protocol("WM_DELETE_WINDOW", lambda: None)
+        # the exports and saves that were started are finished before the window closes, with their progress shown
+        if app.painter.exporter.busy():
+            root.title("painter - closing when the exports are written")
+        app.painter.exporter.close_when_done(closed)
+
+    def closed() -> None:
+        app.painter.stop_autosave()
+        if profiler:
+            try:
+                profiler.dump(profile_path)
+            except Exception as error:
+                # the window is closing, no popup
+                print(f"writing the profile failed: {error}", file=sys.stderr)
+        root.destroy()
+
+    root.protocol("WM_DELETE_WINDOW", close)
     app.mainloop()
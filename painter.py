@@ -1,28 +1,61 @@
 from copy import copy
 from typing import *
-import json
+import time
+from collections import deque
 from datetime import datetime
 import os.path
 
 import tkinter as tk
-from PIL import Image, ImageDraw, ImageFont
+from tkinter import simpledialog
 
 from stroke import *
 from action import *
 from enums import *
-from helper_funcs.calc_points_funcs import *
-from helper_funcs.load_available_fonts import load_available_fonts
+from spatial_index import union_bbox
+from stroke_store import Selection, StrokeStore
+from history import History
+from journal import Entry, Journal
+from helper_funcs.font_catalog import font_catalog
+from helper_funcs.save_funcs import Record, is_canvas_data, write_canvas_data
 from popups.shape_options import ShapeOptions
 from popups.text_options import TextOptions
+from popups.load_progress import LoadProgress
+from canvas_loader import CanvasLoader
+from export_worker import ExportWorker
+from raster_cache import RasterCache
+from viewport import Viewport
+from components.document_canvas import DocumentCanvas
+from helper_funcs.export_funcs import error_popup, export_to_png, snapshot_records
+
+# arrow keys move the selected strokes by one pixel in their direction
+NUDGES: Dict[str, Tuple[int, int]] = {"Left": (-1, 0), "Right": (1, 0), "Up": (0, -1), "Down": (0, 1)}
 
 
 class Painter(tk.Frame):
     """The Painter class handles the canvas and all actions performed on it
+
+    Attributes:
+        simplify_tolerance (float): the tolerance in pixels used to simplify a freestyle stroke when it
+            is finished, 0 keeps every point.
+        last_simplify_ratio (float): the reduction ratio (points before / points after) of the last simplified stroke.
+        frame_rate (int): the maximal number of times per second pointer motion is rendered, 0 renders every motion event.
+        history (History): the undo and redo stacks, limited to history_entries entries and about history_bytes
+            bytes (0 for no limit). history.memory_usage() gives its current estimated size.
+        compress_saves (bool): whether saved files are gzip compressed.
+        load_slice_ms (int): how long each step of drawing a loaded file may take before the Tk loop runs again.
+        exporter (ExportWorker): writes the exports and saves on a worker thread.
+        raster_cache (RasterCache): the image the strokes that aren't edited are flattened into, None if every
+            stroke keeps its canvas items.
+        viewport (Viewport): the zoom and the scrolling of the canvas, it only keeps items for the strokes in view
+            (unless the raster cache is on). the strokes, the selection and the events handled here are in
+            document coordinates, canvas.view gives the canvas coordinates of the items drawn here.
     """
-    def __init__(self, master: tk.Misc, root: tk.Misc, color: tk.StringVar, fill: tk.StringVar, state: tk.StringVar, bold: tk.BooleanVar, italic: tk.BooleanVar, width: tk.IntVar, font: tk.StringVar, font_size: tk.IntVar) -> None:
+    def __init__(self, master: tk.Misc, root: tk.Misc, color: tk.StringVar, fill: tk.StringVar, state: tk.StringVar, bold: tk.BooleanVar, italic: tk.BooleanVar, width: tk.IntVar, font: tk.StringVar, font_size: tk.IntVar, simplify_tolerance: float = 1.0, frame_rate: int = 60, history_entries: int = 200, history_bytes: int = 64 * 1024 * 1024, compress_saves: bool = True, raster_cache: bool = False, document_size: Tuple[int, int] = (640, 480)) -> None:
         super().__init__(master)
 
-        self.grid(row=1, column=1, padx=(50, 0), pady=(40, 40))
+        self.grid(row=1, column=1, padx=(50, 0), pady=(40, 40), sticky=tk.NSEW)
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
 
         self.root = root
 
@@ -35,31 +68,67 @@ class Painter(tk.Frame):
         self.italic = italic
         self.bold = bold
 
-        self.strokes: List[Stroke] = []
+        self.strokes: StrokeStore = StrokeStore()
         self.groups: Set[FrozenSet[Stroke]] = set()
-        self.canvas = tk.Canvas(self, width=640, height=480, bg="#000000")
-        self.canvas.pack()
+        self.canvas = DocumentCanvas(self, width=640, height=480, bg="#000000")
+        self.canvas.grid(row=0, column=0, sticky=tk.NSEW)
+        self.x_scrollbar = tk.Scrollbar(self, orient=tk.HORIZONTAL)
+        self.x_scrollbar.grid(row=1, column=0, sticky=tk.EW)
+        self.y_scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL)
+        self.y_scrollbar.grid(row=0, column=1, sticky=tk.NS)
 
         self.curr_stroke: Union[Literal[None], Stroke] = None
 
-        self.actions: List[Action] = []
-        self.undo_actions: List[Action] = []
+        self.history = History(self.strokes, max_entries=history_entries, max_bytes=history_bytes)
+        self.compress_saves = compress_saves
+        self.exporter = ExportWorker(self, on_error=lambda job, error: error_popup(self.root, f"{job.name} failed:\n{error}"))
+
+        # loading a saved file, see restore_data_from_json
+        self.loader: Union[Literal[None], CanvasLoader] = None
+        self.load_old_strokes: List[Stroke] = []
+        self.load_pending: Deque[Record] = deque()
+        self.load_progress: Union[Literal[None], LoadProgress] = None
+        self.load_slice_ms = 15
 
         self.active_select_start: Union[Tuple[int, int], Literal[None]] = None
         self.active_select_end: Union[Tuple[int, int], Literal[None]] = None
         self.active_selection_rect: Union[int, Literal[None]] = None
-        self.selected_strokes: List[Stroke] = []
+        self.selected_strokes: Selection = Selection()
         self.selected_rect: Union[Literal[None], int] = None
         self.selected_rect_locs: Union[Tuple[int, int, int, int], None] = None
 
+        # only the stroke being drawn and the selected strokes stay live, see keep_live
+        self.raster_cache: Union[Literal[None], RasterCache] = None
+        if raster_cache:
+            self.raster_cache = RasterCache(self.canvas, self.strokes, keep_live=self.keep_live)
+        # the flattened strokes have no items to cull
+        self.viewport = Viewport(self.canvas, self.strokes, size=document_size, cull=not raster_cache)
+        self.viewport.on_change = self.view_changed
+        self.canvas.configure(xscrollcommand=self.x_scrollbar.set, yscrollcommand=self.y_scrollbar.set)
+        self.x_scrollbar.configure(command=self.viewport.xview)
+        self.y_scrollbar.configure(command=self.viewport.yview)
+
+        self.simplify_tolerance = simplify_tolerance
+        self.last_simplify_ratio = 1.0
+
         self.drag_strokes = False
+        self.drag_start = (0, 0)
         self.prev_x = 0
         self.prev_y = 0
 
+        # pointer motion is queued and handled once per frame
+        self.frame_rate = frame_rate
+        self.pending_drags: List[tk.Event] = []
+        self.pending_move: Union[Literal[None], tk.Event] = None
+        self.frame_job: Union[Literal[None], str] = None
+        self.last_frame_time = 0.0
+
         self.selected_menu = tk.Menu(self, tearoff=0)
         self.selected_menu.add_command(label="Copy", command=self.copy_selected)
         self.selected_menu.add_command(label="Move Forward", command=lambda: self.move_forward_backward_selected(True))
         self.selected_menu.add_command(label="Move Backward", command=lambda: self.move_forward_backward_selected(False))
+        self.selected_menu.add_command(label="Move Forward One Step", command=lambda: self.move_selected_one_step(True))
+        self.selected_menu.add_command(label="Move Backward One Step", command=lambda: self.move_selected_one_step(False))
         self.selected_menu.add_command(label="Delete", command=self.delete_selected)
 
         self.menu = tk.Menu(self, tearoff=0)
@@ -75,68 +144,169 @@ class Painter(tk.Frame):
         self.active_polygon_line: Union[Literal[None], int] = None
 
         self.canvas.bind('<Button-1>', self.handle_left_click_canvas)
-        self.canvas.bind('<Motion>', self.handle_move_canvas)
-        self.canvas.bind('<B1-Motion>', self.handle_drag)
+        self.canvas.bind('<Motion>', self.queue_move_canvas)
+        self.canvas.bind('<B1-Motion>', self.queue_drag)
+        # the wheel scrolls, with shift it scrolls sideways and with control it zooms at the pointer
+        self.canvas.bind('<MouseWheel>', self.handle_wheel)
+        self.canvas.bind('<Button-4>', self.handle_wheel)
+        self.canvas.bind('<Button-5>', self.handle_wheel)
+        # dragging with the middle button pans
+        self.canvas.bind('<Button-2>', lambda event: self.viewport.pan_start(event.x, event.y))
+        self.canvas.bind('<B2-Motion>', lambda event: self.viewport.pan(event.x, event.y))
+
+    def to_document(self, event: tk.Event) -> tk.Event:
+        """moves the position of an event on the canvas to document coordinates
+
+        Args:
+            event (tk.Event): an event of the canvas, its x and y are in the window
+
+        Returns:
+            tk.Event: the same event
+        """
+        event.x, event.y = self.canvas.document_point(event.x, event.y)
+        return event
+
+    def handle_wheel(self, event: tk.Event) -> None:
+        """scrolls or zooms the view
+
+        Args:
+            event (tk.Event): the wheel event, Button-4 and Button-5 on X11
+        """
+        up = event.num == 4 or getattr(event, "delta", 0) > 0
+        if event.state & 0x4:
+            if up:
+                self.viewport.zoom_in(event.x, event.y)
+            else:
+                self.viewport.zoom_out(event.x, event.y)
+        elif event.state & 0x1:
+            self.viewport.scroll(-1 if up else 1, 0)
+        else:
+            self.viewport.scroll(0, -1 if up else 1)
+
+    def view_changed(self) -> None:
+        """puts the items drawn here (the selection, the text outline, the polygon line) back in place
+        after the view was scrolled or zoomed
+        """
+        canvas = self.canvas
+        if self.selected_rect and self.selected_rect_locs:
+            canvas.coords(self.selected_rect, *canvas.view_flat(list(self.selected_rect_locs)))
+            canvas.tag_raise(self.selected_rect)
+        if self.active_selection_rect and self.active_select_start and self.active_select_end:
+            canvas.coords(self.active_selection_rect, *canvas.view([self.active_select_start, self.active_select_end]))
+            canvas.tag_raise(self.active_selection_rect)
+        if self.active_polygon_line:
+            # drawn again on the next move
+            canvas.delete(self.active_polygon_line)
+            self.active_polygon_line = None
+        if self.curr_stroke and self.curr_stroke not in self.strokes:
+            # the unfinished polygon is not culled
+            self.curr_stroke.delete()
+            self.curr_stroke.paint()
+        self.create_outline_curr_text()
+        if self.raster_cache:
+            self.raster_cache.view_changed()
+
+    def queue_drag(self, event: tk.Event) -> None:
+        """queues a drag event, the queued events are handled by flush_motion on the next frame
+
+        Args:
+            event (tk.Event): the drag event object
+        """
+        self.pending_drags.append(self.to_document(event))
+        self.schedule_frame()
+
+    def queue_move_canvas(self, event: tk.Event) -> None:
+        """queues a move event on the canvas, only the latest one is handled on the next frame
+
+        Args:
+            event (tk.Event): the moving event object
+        """
+        self.pending_move = self.to_document(event)
+        self.schedule_frame()
+
+    def schedule_frame(self) -> None:
+        """schedules flush_motion for the next frame, at most frame_rate times a second
+        """
+        if self.frame_rate <= 0:
+            self.flush_motion()
+            return
+        if self.frame_job:
+            return
+        wait = self.last_frame_time + 1 / self.frame_rate - time.perf_counter()
+        if wait <= 0:
+            self.frame_job = self.after_idle(self.flush_motion)
+        else:
+            self.frame_job = self.after(int(wait * 1000) + 1, self.flush_motion)
+
+    def flush_motion(self) -> None:
+        """handles the queued motion events.
+        while drawing a freestyle stroke every queued point is added to it and the stroke is drawn once,
+        for everything else only the latest event matters.
+        """
+        if self.frame_job:
+            self.after_cancel(self.frame_job)
+            self.frame_job = None
+        self.last_frame_time = time.perf_counter()
+
+        drags, self.pending_drags = self.pending_drags, []
+        if len(drags):
+            # the first event may start a new stroke, a selection or a move
+            self.handle_drag(drags[0])
+            if len(drags) > 1:
+                if isinstance(self.curr_stroke, FreeStyleStroke) and not self.drag_strokes:
+                    for event in drags[1:]:
+                        self.curr_stroke.add_point(event.x, event.y)
+                    self.curr_stroke.refresh()
+                else:
+                    self.handle_drag(drags[-1])
+
+        if self.pending_move:
+            event, self.pending_move = self.pending_move, None
+            self.handle_move_canvas(event)
 
     def undo(self) -> None:
         """Reverts the last action, if available, and moves it to redo actions.
         """
-        if not len(self.actions):
-            return
-        new_action = self.actions[-1].undo()
-        
-        self.actions.pop()
-        self.undo_actions.append(new_action)
+        self.history.undo()
 
     def redo(self) -> None:
         """Redoes the last undone action, if available, and moves it back to actions.
         """
+        self.history.redo()
+
+    def move_forward_backward_selected(self, forward: bool) -> None:
+        """Move selected strokes to the front or the back of the canvas layer order.
 
-        if not len(self.undo_actions):
+        Args:
+            forward (bool): forward - True, Backward - False
+        """
+        if forward:
+            moved = self.strokes.bring_to_front(self.selected_strokes)
+        else:
+            moved = self.strokes.send_to_back(self.selected_strokes)
+        if not len(moved):
             return
-        new_action = self.undo_actions[-1].redo()
-        self.undo_actions.pop()
-        self.actions.append(new_action)
+        self.history.push(ChangeOrderAction(painter_strokes=self.strokes, og_keys=moved))
 
-    def move_forward_backward_selected(self, forward: bool) -> None:
-        """Move selected strokes forward or backward in canvas layer order.
+    def move_selected_one_step(self, forward: bool) -> None:
+        """Move each selected stroke one layer up or down, past the closest stroke that isn't selected.
 
         Args:
             forward (bool): forward - True, Backward - False
         """
-        not_selected_strokes = [
-            stroke for stroke in self.strokes if stroke not in self.selected_strokes]
-        not_selected_strokes_indexes = [self.strokes.index(
-            stroke) for stroke in self.strokes if stroke not in self.selected_strokes]
-        self.strokes.clear()
         if forward:
-            for stroke in not_selected_strokes:
-                self.strokes.append(stroke)
-            for stroke in self.selected_strokes:
-                self.strokes.append(stroke)
-            new_indexes = not_selected_strokes_indexes + \
-                [i for i, _ in enumerate(
-                    self.strokes) if i not in not_selected_strokes_indexes]
+            moved = self.strokes.forward_one_step(self.selected_strokes)
         else:
-            for stroke in self.selected_strokes:
-                self.strokes.append(stroke)
-            for stroke in not_selected_strokes:
-                self.strokes.append(stroke)
-            new_indexes = [i for i, _ in enumerate(
-                self.strokes) if i not in not_selected_strokes_indexes] + not_selected_strokes_indexes
-        self.actions.append(ChangeOrderAction(painter_strokes=self.strokes, 
-                                              og_indexes=new_indexes, 
-                                              canvas=self.canvas))
-        for stroke in self.strokes:
-            for i in stroke.tk_painting:
-                self.canvas.tag_raise(i)
+            moved = self.strokes.backward_one_step(self.selected_strokes)
+        if not len(moved):
+            return
+        self.history.push(ChangeOrderAction(painter_strokes=self.strokes, og_keys=moved))
 
     def copy_selected(self) -> None:
         """copies selected strokes
         """
         self.copied_strokes = []
-        self.copied_bbox = self.canvas.bbox(
-            *[p for stroke in self.selected_strokes for p in stroke.tk_painting])
+        self.copied_bbox = union_bbox(stroke.bbox() for stroke in self.selected_strokes)
         for stroke in self.selected_strokes:
             copied_stroke = copy(stroke)
             self.copied_strokes.append(copied_stroke)
@@ -151,16 +321,17 @@ class Painter(tk.Frame):
         dx, dy = self.paste_coordinates[0] - \
             copied_coordinates[0], self.paste_coordinates[1] - \
             copied_coordinates[1]
+        new_strokes: List[Stroke] = []
         for stroke in self.copied_strokes:
             new_stroke = copy(stroke)
             new_stroke.coordinates = [(co[0] + dx, co[1] + dy)
                                       for co in new_stroke.coordinates]
             new_stroke.paint()
             self.strokes.append(new_stroke)
+            new_strokes.append(new_stroke)
 
-        self.undo_actions = []
-        self.actions.append(CreateAction(painter_strokes=self.strokes, 
-                                         strokes=self.strokes[-len(self.copied_strokes):]))
+        self.history.push(CreateAction(painter_strokes=self.strokes, 
+                                         strokes=new_strokes))
 
     def handle_drag(self, event: tk.Event) -> None:
         """handles drag event according to the state, can handle the following states:
@@ -178,24 +349,13 @@ class Painter(tk.Frame):
             dx = event.x - self.prev_x
             dy = event.y - self.prev_y
 
-            self.canvas.delete(self.selected_rect)
+            self.canvas.move(self.selected_rect, self.canvas.view_width(dx), self.canvas.view_width(dy))
             self.selected_rect_locs = self.selected_rect_locs[0] + dx, self.selected_rect_locs[1] + \
                 dy, self.selected_rect_locs[2] + \
                 dx, self.selected_rect_locs[3] + dy
-            self.selected_rect = self.canvas.create_rectangle(
-                *self.selected_rect_locs, outline="green")
-            started_paint_flag = False
-            for stroke in self.strokes:
-                if not started_paint_flag:
-                    if stroke in self.selected_strokes:
-                        started_paint_flag = True
-                    else:
-                        continue
-                if stroke in self.selected_strokes:
-                    stroke.move(dx, dy)
-                else:
-                    for i in stroke.tk_painting:
-                        self.canvas.tag_raise(i)
+            # the items are moved in place, so the layer order of the strokes doesn't change
+            for stroke in self.selected_strokes:
+                stroke.move(dx, dy)
             self.prev_x = event.x
             self.prev_y = event.y
 
@@ -207,11 +367,8 @@ class Painter(tk.Frame):
                 self.drag_strokes = True
                 self.prev_x = event.x
                 self.prev_y = event.y
-                og_coordinates: List[Dict[str, Any]] = [{"coordinates": copy(stroke.coordinates)} for stroke in self.selected_strokes]
-                self.undo_actions = []
-                self.actions.append(ChangePropAction(painter_strokes=self.strokes, 
-                                                     og_props=og_coordinates, 
-                                                     strokes=[i for i in self.selected_strokes]))
+                # the move is recorded on release, as the total offset of the drag
+                self.drag_start = (event.x, event.y)
 
                 return
 
@@ -270,15 +427,30 @@ class Painter(tk.Frame):
                 if self.active_selection_rect:
                     self.canvas.delete(self.active_selection_rect)
                 self.active_selection_rect = self.canvas.create_rectangle(
-                    *self.active_select_start, event.x, event.y, outline="#fff")
+                    *self.canvas.view([self.active_select_start, (event.x, event.y)]), outline="#fff")
                 self.active_select_end = (event.x, event.y)
 
     def remove_select(self) -> None:
         """removes select if there were strokes selected
         """
-        self.selected_strokes = []
+        self.selected_strokes = Selection()
         if (self.selected_rect):
             self.canvas.delete(self.selected_rect)
+        self.refresh_raster()
+
+    def keep_live(self, stroke: Stroke) -> bool:
+        """whether a stroke keeps its canvas items when the strokes are flattened into the raster cache
+        """
+        return stroke is self.curr_stroke or stroke in self.selected_strokes
+
+    def refresh_raster(self, strokes: Iterable[Stroke] = ()) -> None:
+        """lets the raster cache know the stroke being drawn or the selection changed
+
+        Args:
+            strokes (Iterable[Stroke], optional): strokes that should be live now
+        """
+        if self.raster_cache:
+            self.raster_cache.refresh(strokes)
 
     def handle_left_click(self, event: tk.Event) -> None:
         """removes select if clicked outside selected rect
@@ -289,6 +461,8 @@ class Painter(tk.Frame):
         self.remove_empty_text()
         if not self.selected_rect_locs:
             return
+        if event.widget is self.canvas:
+            self.to_document(event)
         if not (event.x >= self.selected_rect_locs[0] and \
                 event.x <= self.selected_rect_locs[2] and \
                 event.y >= self.selected_rect_locs[1] and \
@@ -303,13 +477,13 @@ class Painter(tk.Frame):
                 self.canvas.delete(self.curr_text_rect)
             if self.curr_stroke.text == "":
                 self.curr_stroke.delete()
-                self.strokes.pop()
+                self.strokes.remove(self.curr_stroke)
             else:
-                self.undo_actions = []
-                self.actions.append(CreateAction(painter_strokes=self.strokes, 
+                self.history.push(CreateAction(painter_strokes=self.strokes, 
                                                  strokes=[self.curr_stroke]))
 
             self.curr_stroke = None
+            self.refresh_raster()
 
     def handle_left_click_canvas(self, event: tk.Event) -> Union[Literal[None], str]:
         """handles left click on canvas. does:
@@ -322,7 +496,9 @@ class Painter(tk.Frame):
         """
         
         self.root.focus()
+        self.flush_motion()
         self.remove_empty_text()
+        self.to_document(event)
         
         # create a new text stroke
         if self.state.get() == State.TEXT.value:
@@ -347,8 +523,8 @@ class Painter(tk.Frame):
                             self.curr_stroke = None
                             if self.active_polygon_line:
                                 self.canvas.delete(self.active_polygon_line)
-                            self.undo_actions = []
-                            self.actions.append(CreateAction(painter_strokes=self.strokes, 
+                                self.active_polygon_line = None
+                            self.history.push(CreateAction(painter_strokes=self.strokes, 
                                                              strokes=[polygon_stroke]))
         return None
 
@@ -360,10 +536,11 @@ class Painter(tk.Frame):
         """
         if self.state.get() == State.POLYGON.value and self.curr_stroke:
             if self.active_polygon_line:
-                self.canvas.delete(self.active_polygon_line)
-            self.active_polygon_line = self.canvas.create_line(*self.curr_stroke.coordinates[-1],
-                                                               event.x, event.y, fill=self.color.get(),
-                                                               width=self.width.get())
+                self.canvas.coords(self.active_polygon_line, *self.canvas.view([self.curr_stroke.coordinates[-1], (event.x, event.y)]))
+            else:
+                self.active_polygon_line = self.canvas.create_line(*self.canvas.view([self.curr_stroke.coordinates[-1], (event.x, event.y)]),
+                                                                   fill=self.color.get(),
+                                                                   width=self.canvas.view_width(self.width.get()))
 
     def create_text_stroke(self, x: int, y:int) -> None:
         """Create a text stroke on the canvas.
@@ -394,6 +571,10 @@ class Painter(tk.Frame):
             return
         if self.curr_text_rect:
             self.canvas.delete(self.curr_text_rect)
+            self.curr_text_rect = None
+        if not len(self.curr_stroke.tk_painting):
+            # scrolled out of view
+            return
         bbox = self.canvas.bbox(self.curr_stroke.tk_painting[0])
         self.curr_text_rect = self.canvas.create_rectangle(
             bbox, outline="green", fill="black")
@@ -405,15 +586,21 @@ class Painter(tk.Frame):
         SELECT: finish selecting, find the strokes in the selected rectangle and select them
         RECT, OVAL, TRIANGLE: finish create shape
         """
+        self.flush_motion()
         if self.state.get() == State.TEXT.value:
             return
         if self.drag_strokes:
             self.drag_strokes = False
+            dx, dy = self.prev_x - self.drag_start[0], self.prev_y - self.drag_start[1]
+            if dx or dy:
+                self.history.push(TranslateAction(self.strokes, [stroke.id for stroke in self.selected_strokes], dx, dy))
         if self.state.get() != State.SELECT.value and self.state.get() != State.POLYGON.value and self.curr_stroke:
-            self.undo_actions = []
-            self.actions.append(CreateAction(painter_strokes=self.strokes, 
+            if isinstance(self.curr_stroke, FreeStyleStroke) and self.simplify_tolerance > 0:
+                self.last_simplify_ratio = self.curr_stroke.simplify(self.simplify_tolerance)
+            self.history.push(CreateAction(painter_strokes=self.strokes, 
                                              strokes=[self.curr_stroke]))
             self.curr_stroke = None
+            self.refresh_raster()
         else:
             if self.active_selection_rect:
                 self.canvas.delete(self.active_selection_rect)
@@ -427,49 +614,16 @@ class Painter(tk.Frame):
         if not self.active_select_start or not self.active_select_end:
             return
         
-        rect_range_x = range(min(self.active_select_start[0], self.active_select_end[0]),
-                             max(self.active_select_start[0], self.active_select_end[0]))
-        rect_range_y = range(min(self.active_select_start[1], self.active_select_end[1]),
-                             max(self.active_select_start[1], self.active_select_end[1]))
+        x1, x2 = min(self.active_select_start[0], self.active_select_end[0]), max(self.active_select_start[0], self.active_select_end[0])
+        y1, y2 = min(self.active_select_start[1], self.active_select_end[1]), max(self.active_select_start[1], self.active_select_end[1])
 
-        selected_rect = [(i, j) for i in rect_range_x for j in rect_range_y]
-
-        for stroke in self.strokes:
+        candidates = self.strokes.spatial_index.query(x1, y1, x2, y2)
+        
+        # go over the candidates in layer order
+        for stroke in self.strokes.sorted(candidates):
             if stroke in self.selected_strokes:
                 continue
-            if (isinstance(stroke, ShapeStroke) and stroke.shape.value == Shape.RECT.value) or (isinstance(stroke, TextStroke)):
-                x1, y1, x2, y2 = self.canvas.bbox(stroke.tk_painting[0])
-                if x1 > rect_range_x.stop or x2 < rect_range_x.start:
-                    continue
-                if y1 > rect_range_y.stop or rect_range_y.start > y2:
-                    continue
-                if isinstance(stroke, ShapeStroke) and not stroke.fill:
-                    if x1 < rect_range_x.start and x2 > rect_range_x.stop and y1 < rect_range_y.start and y2 > rect_range_y.stop:
-                        continue
-            elif isinstance(stroke, PolygonStroke):
-                coordinates = []
-                for i, co in enumerate(stroke.coordinates):
-                    if i:
-                        coordinates += calculate_points_on_line(*stroke.coordinates[i - 1], *co)
-                if set(selected_rect).isdisjoint(coordinates):
-                    continue
-            elif isinstance(stroke, TriangleStroke):
-                is_in = False
-                for co in selected_rect:
-                    if is_point_inside_triangle(co, stroke.coordinates[0], ((stroke.coordinates[0][0] + stroke.coordinates[1][0])//2, stroke.coordinates[1][1]), (stroke.coordinates[1][0], stroke.coordinates[0][1])):
-                        is_in = True
-                        break
-                if not is_in:
-                    continue
-            elif isinstance(stroke, ShapeStroke) and stroke.shape.value == Shape.OVAL.value:
-                is_in = False
-                for co in selected_rect:
-                    if is_point_inside_oval(co, stroke.coordinates[0], stroke.coordinates[1]):
-                        is_in = True
-                        break
-                if not is_in:
-                    continue
-            elif set(selected_rect).isdisjoint(stroke.coordinates):
+            if not stroke.intersects_rect((x1, y1, x2, y2)):
                 continue
 
             group = next((group for group in self.groups if stroke in group), None)
@@ -479,12 +633,12 @@ class Painter(tk.Frame):
                     self.selected_strokes.append(s)
             else:
                 self.selected_strokes.append(stroke)
+        self.refresh_raster(self.selected_strokes)
 
-        if not len(self.selected_strokes):
+        bbox = union_bbox(stroke.bbox() for stroke in self.selected_strokes)
+        if not bbox:
             return
-
-        bbox = self.canvas.bbox(*[i for stroke in self.selected_strokes for i in stroke.tk_painting])
-        self.selected_rect = self.canvas.create_rectangle(*bbox, outline="green")
+        self.selected_rect = self.canvas.create_rectangle(*self.canvas.view_flat(list(bbox)), outline="green")
         self.selected_rect_locs = bbox
 
     def try_to_delete(self, label: str) -> None:
@@ -501,7 +655,9 @@ class Painter(tk.Frame):
         Args:
             event (tk.Event): tk click event
         """
-        
+        if event.widget is self.canvas:
+            self.to_document(event)
+
         if len(self.selected_strokes) > 0 and \
             self.selected_rect_locs and \
             event.x > self.selected_rect_locs[0] and \
@@ -520,7 +676,7 @@ class Painter(tk.Frame):
             # if there is a text stroke selected, add the Text Options option to the menu
             if any(is_text):
                 if len(list(filter(lambda i: i, is_text))) == 1:
-                    text_stroke = self.selected_strokes[is_text.index(True)]
+                    text_stroke = self.selected_strokes.first(lambda stroke: isinstance(stroke, TextStroke))
                     if isinstance(text_stroke, TextStroke):
                         font = text_stroke.font
                         font_size = text_stroke.font_size
@@ -556,7 +712,7 @@ class Painter(tk.Frame):
             # if there is a shape stroke selected, add the Shape Options option to the menu
             if any([not i for i in is_text]):
                 if len(list(filter(lambda i: not i, is_text))) == 1:
-                    shape_stroke = self.selected_strokes[is_text.index(False)]
+                    shape_stroke = self.selected_strokes.first(lambda stroke: not isinstance(stroke, TextStroke))
                     if hasattr(shape_stroke, "fill"):
                             fill = shape_stroke.fill
                     else:
@@ -615,6 +771,7 @@ class Painter(tk.Frame):
         """
         changed_strokes: List[Stroke] = []
         og_props: List[Dict[str, Any]] = []
+        font = font_catalog().resolve(font)
         for text_stroke in filter(lambda stroke: isinstance(stroke, TextStroke), self.selected_strokes):
             if not isinstance(text_stroke, TextStroke):
                 continue
@@ -624,26 +781,18 @@ class Painter(tk.Frame):
                              "color": text_stroke.color,
                              "bold": text_stroke.bold,
                              "italic": text_stroke.italic})
-            fonts = load_available_fonts()
-            if font in fonts:
-                text_stroke.font = font
-            else:
-                text_stroke.font = "Arial"
+            text_stroke.font = font
             text_stroke.font_size = font_size
             text_stroke.bold = bold
             text_stroke.italic = italic
             if len(color):
                 text_stroke.color = color
-        self.undo_actions = []
-        self.actions.append(ChangePropAction(painter_strokes=self.strokes, 
+        self.history.push(ChangePropAction(painter_strokes=self.strokes, 
                                              strokes=changed_strokes, 
                                              og_props=og_props))
-        for stroke in self.strokes:
-            if stroke in self.selected_strokes and isinstance(stroke, TextStroke):
-                stroke.paint()
-            else:
-                for i in stroke.tk_painting:
-                    self.canvas.tag_raise(i)
+        for stroke in changed_strokes:
+            stroke.paint()
+            self.strokes.restack(stroke)
 
     def on_save_shape(self, fill: str, color: str, width: int) -> None:
         """Update fill, color, and width properties of selected shape strokes and record the action.
@@ -666,35 +815,56 @@ class Painter(tk.Frame):
             shape_stroke.color = color
 
             shape_stroke.width = width
-        self.undo_actions = []
-        self.actions.append(ChangePropAction(painter_strokes=self.strokes, 
+        self.history.push(ChangePropAction(painter_strokes=self.strokes, 
                                              strokes=changed_strokes, 
                                              og_props=og_props))
-        for stroke in self.strokes:
-            if stroke in self.selected_strokes and not isinstance(stroke, TextStroke):
-                stroke.paint()
-            else:
-                for i in stroke.tk_painting:
-                    self.canvas.tag_raise(i)
+        for stroke in changed_strokes:
+            stroke.paint()
+            self.strokes.restack(stroke)
 
     def delete_selected(self) -> None:
         """delete selected strokes
         """
-        for stroke in self.selected_strokes:
+        deleted = list(self.selected_strokes)
+        for stroke in deleted:
             stroke.delete()
             self.strokes.remove(stroke)
-        self.actions.append(DeleteAction(self.strokes, self.selected_strokes))
+        self.history.push(DeleteAction(self.strokes, deleted))
         self.remove_select()
 
     def delete_all(self) -> None:
         """delete all strokes on canvas
         """
-        self.actions.append(ClearCanvasAction(painter_strokes=self.strokes, 
-                                              strokes=[i for i in self.strokes], 
-                                              canvas=self.canvas))
+        # cleared before the action is pushed, so it is journaled as a remove and its strokes count in the history size
+        action = ClearCanvasAction(painter_strokes=self.strokes, 
+                                   strokes=list(self.strokes), 
+                                   canvas=self.canvas)
         self.canvas.delete("all")
         self.strokes.clear()
         self.selected_strokes.clear()
+        self.history.push(action)
+
+    def nudge_selected(self, dx: int, dy: int) -> None:
+        """Move the selected strokes by a small offset.
+        consecutive nudges of the same strokes are merged into one action.
+
+        Args:
+            dx (int): the horizontal offset
+            dy (int): the vertical offset
+        """
+        if self.selected_rect and self.selected_rect_locs:
+            self.canvas.move(self.selected_rect, self.canvas.view_width(dx), self.canvas.view_width(dy))
+            x1, y1, x2, y2 = self.selected_rect_locs
+            self.selected_rect_locs = x1 + dx, y1 + dy, x2 + dx, y2 + dy
+        for stroke in self.selected_strokes:
+            stroke.move(dx, dy)
+
+        stroke_ids = [stroke.id for stroke in self.selected_strokes]
+        last_action = self.history.last()
+        if isinstance(last_action, TranslateAction) and last_action.merge(stroke_ids, dx, dy):
+            self.history.log(TranslateAction(self.strokes, stroke_ids, dx, dy))
+            return
+        self.history.push(TranslateAction(self.strokes, stroke_ids, dx, dy, nudge=True))
 
     def handle_typing(self, event: tk.Event) -> None:
         """handle typing event
@@ -704,6 +874,10 @@ class Painter(tk.Frame):
             event (tk.Event): typing event
         """
         if not self.curr_stroke or not isinstance(self.curr_stroke, TextStroke) or not isinstance(self.text_index, int):
+            if event.keysym in NUDGES and len(self.selected_strokes):
+                # shift makes bigger steps
+                step = 10 if event.state & 0x1 else 1
+                self.nudge_selected(NUDGES[event.keysym][0] * step, NUDGES[event.keysym][1] * step)
             return
         if event.keysym == 'BackSpace':
             if self.text_index <= 0:
@@ -727,155 +901,227 @@ class Painter(tk.Frame):
             self.create_outline_curr_text()
 
     def save_to_json(self) -> None:
-        """Save canvas data to a JSON file like canvas-data-<curr-time>.json.
-        """
-        strokes = [{
-            "type": stroke.__class__.__name__,
-            "coordinates": stroke.coordinates,
-            "color": stroke.color,
-            "fill": stroke.fill if hasattr(stroke, "fill") else "",
-            "width": stroke.width,
-            "font": stroke.font if hasattr(stroke, "font") else "",
-            "font_size": stroke.font_size if hasattr(stroke, "font_size") else "",
-            "shape": stroke.shape.name if hasattr(stroke, "shape") else "",
-            "italic": stroke.italic if hasattr(stroke, "italic") else "",
-            "bold": stroke.bold if hasattr(stroke, "bold") else "",
-            "text": stroke.text if hasattr(stroke, "text") else ""
-        } for stroke in self.strokes]
-
+        """Save canvas data to a file like canvas-data-<curr-time>.json, or .json.gz when compress_saves is set.
+        the file is written on the export worker, from a snapshot of the strokes.
+        """
         now = datetime.now()
         curr_date = now.strftime("%d%m%y-%H%M%S")
 
-        with open("canvas-data-"+curr_date + ".json", "w") as json_file:
-            json.dump(strokes, json_file, indent=4)
+        filename = "canvas-data-" + curr_date + (".json.gz" if self.compress_saves else ".json")
+        records = snapshot_records(self.strokes)
+        compress = self.compress_saves
+        self.exporter.submit(f"Saving {filename}", filename,
+                             lambda path, progress: write_canvas_data(path, records, compress=compress, progress=progress))
+
+    def stroke_from_record(self, stroke: Record) -> Stroke:
+        """Create a stroke on the canvas from its saved record (not painted and not added to the strokes).
+
+        Args:
+            stroke (Record): the saved record of the stroke
+
+        Returns:
+            Stroke: the new stroke
+        """
+        if stroke["type"] == "FreeStyleStroke":
+            s: Stroke = FreeStyleStroke(0, 0, 
+                                        stroke["color"], 
+                                        stroke["width"], 
+                                        self.canvas)
+        elif stroke["type"] == "PolygonStroke":
+            s = PolygonStroke(0, 0, 
+                              color=stroke["color"], 
+                              width=stroke["width"],
+                              canvas=self.canvas, 
+                              fill=stroke["fill"], 
+                              coordinates=list(stroke["coordinates"]))
+        elif stroke["type"] == "TextStroke":
+            s = TextStroke(stroke["coordinates"][0][0], 
+                           stroke["coordinates"][0][1], 
+                           color=stroke["color"],
+                           width=stroke["width"], 
+                           canvas=self.canvas, 
+                           font=stroke["font"], 
+                           bold=stroke["bold"],
+                           italic=stroke["italic"],
+                           font_size=stroke["font_size"], 
+                           text=stroke["text"])
+        elif stroke["type"] == "ShapeStroke":
+            s = ShapeStroke(0, 0, 
+                            color=stroke["color"],
+                            width=stroke["width"], 
+                            canvas=self.canvas, 
+                            fill=stroke["fill"], 
+                            shape=Shape[stroke["shape"]])
+        elif stroke["type"] == "TriangleStroke":
+            s = TriangleStroke(0, 0, 
+                               color=stroke["color"],
+                               width=stroke["width"], 
+                               canvas=self.canvas, 
+                               fill=stroke["fill"], 
+                               shape=Shape.TRIANGLE)
+        s.coordinates = list(stroke["coordinates"])
+        return s
 
     def restore_data_from_json(self, filename:str) -> bool:
-        """load data from a json file
+        """start loading data from a saved file, in any of the save formats.
+        the file is read on a worker thread and the strokes are drawn in time slices, see load_step.
 
         Args:
-            filename (str): the path to the json file
+            filename (str): the path to the saved file
 
         Returns:
-            bool: whether the action was successful or not
+            bool: whether the loading started or not
         """
-        try:
-            json_data = open(filename)
-            strokes = json.load(json_data)
-            old_strokes = [i for i in self.strokes]
-            self.canvas.delete("all")
-            self.strokes.clear()
-            self.selected_strokes.clear()
-
-            for stroke in strokes:
-                if stroke["type"] == "FreeStyleStroke":
-                    s: Stroke = FreeStyleStroke(0, 0, 
-                                                stroke["color"], 
-                                                stroke["width"], 
-                                                self.canvas)
-                elif stroke["type"] == "PolygonStroke":
-                    s = PolygonStroke(0, 0, 
-                                      color=stroke["color"], 
-                                      width=stroke["width"],
-                                      canvas=self.canvas, 
-                                      fill=stroke["fill"], 
-                                      coordinates=[tuple(co) for co in stroke["coordinates"]]) # type: ignore
-                elif stroke["type"] == "TextStroke":
-                    s = TextStroke(stroke["coordinates"][0][0], 
-                                   stroke["coordinates"][0][1], 
-                                   color=stroke["color"],
-                                   width=stroke["width"], 
-                                   canvas=self.canvas, 
-                                   font=stroke["font"], 
-                                   bold=stroke["bold"],
-                                   italic=stroke["italic"],
-                                   font_size=stroke["font_size"], 
-                                   text=stroke["text"])
-                elif stroke["type"] == "ShapeStroke":
-                    s = ShapeStroke(0, 0, 
-                                    color=stroke["color"],
-                                    width=stroke["width"], 
-                                    canvas=self.canvas, 
-                                    fill=stroke["fill"], 
-                                    shape=Shape[stroke["shape"]])
-                elif stroke["type"] == "TriangleStroke":
-                    s = TriangleStroke(0, 0, 
-                                       color=stroke["color"],
-                                       width=stroke["width"], 
-                                       canvas=self.canvas, 
-                                       fill=stroke["fill"], 
-                                       shape=Shape.TRIANGLE)
-                s.coordinates = [tuple(co) for co in stroke["coordinates"]] # type: ignore
-                s.paint()
-                self.strokes.append(s)
-            self.undo_actions = []
-            self.actions.append(LoadJsonAction(self.strokes, old_strokes))
-            return True
-        except Exception as error:
-            print(error)
+        if self.loader or not is_canvas_data(filename):
             return False
+        self.loader = CanvasLoader(filename)
+        self.load_old_strokes = list(self.strokes)
+        self.load_pending = deque()
+        self.canvas.delete("all")
+        self.strokes.clear()
+        self.remove_select()
+        self.load_progress = LoadProgress(self.root, on_cancel=self.cancel_load)
+        self.loader.start()
+        self.after(0, self.load_step)
+        return True
 
-    def export_to_png(self) -> None:
-        """Export canvas content to a PNG image.
+    def load_step(self) -> None:
+        """draw loaded strokes for up to load_slice_ms, then give the Tk loop back until the next step.
         """
-        
-        # create a PIL image and draw all strokes on it
-        img = Image.new("RGB", (self.canvas.winfo_width(),
-                        self.canvas.winfo_height()), "black")
-        draw = ImageDraw.Draw(img)
+        if not self.loader:
+            return
+        deadline = time.perf_counter() + self.load_slice_ms / 1000
+        while time.perf_counter() < deadline:
+            if not len(self.load_pending):
+                batch = self.loader.next_batch()
+                if batch is None:
+                    self.finish_load()
+                    return
+                if not len(batch):
+                    # the worker is still reading
+                    break
+                self.load_pending.extend(batch)
+            try:
+                s = self.stroke_from_record(self.load_pending.popleft())
+            except Exception as error:
+                self.cancel_load()
+                error_popup(self.root, f"loading the file failed:\n{error}")
+                return
+            s.paint()
+            self.strokes.append(s)
+        if self.load_progress:
+            self.load_progress.update_progress(self.loader.progress, len(self.strokes))
+        self.after(1, self.load_step)
+
+    def finish_load(self) -> None:
+        """record the loaded strokes as one action, or put the old strokes back if the file could not be read
+        """
+        if not self.loader:
+            return
+        if self.loader.error:
+            error = self.loader.error
+            self.cancel_load()
+            error_popup(self.root, f"loading the file failed:\n{error}")
+            return
+        self.loader = None
+        self.close_load_progress()
+        self.history.push(LoadJsonAction(self.strokes, self.load_old_strokes))
+        self.load_old_strokes = []
+
+    def cancel_load(self) -> None:
+        """stop loading, remove the strokes loaded so far and put the old strokes back
+        """
+        if not self.loader:
+            return
+        self.loader.cancel()
+        self.loader = None
+        self.load_pending.clear()
+        self.close_load_progress()
+        self.canvas.delete("all")
+        self.strokes.clear()
+        for stroke in self.load_old_strokes:
+            stroke.paint()
+            self.strokes.append(stroke)
+        self.load_old_strokes = []
+        # the old strokes got new layer keys
+        self.history.snapshot()
+
+    def close_load_progress(self) -> None:
+        if self.load_progress:
+            self.load_progress.destroy()
+            self.load_progress = None
 
+    def start_autosave(self, directory: str, recover: Union[Literal[None], Tuple[List[Entry], List[Entry]]] = None) -> None:
+        """Start writing every change to an autosave journal, see journal.py.
+
+        Args:
+            directory (str): the autosave directory
+            recover (Tuple[List[Entry], List[Entry]], optional): the snapshot and the journal entries
+                read from the directory, to rebuild the drawing of a session that didn't close properly.
+        """
+        if recover:
+            try:
+                self.recover(*recover)
+            except Exception as error:
+                # the new journal starts by deleting the files, they are the only copy of the drawing
+                kept = Journal.set_aside(directory)
+                error_popup(self.root, f"recovering the autosave failed:\n{error}\n\nthe autosave was kept in:\n" + "\n".join(kept))
+        self.history.journal = Journal(directory)
+        self.history.snapshot()
+
+    def stop_autosave(self) -> None:
+        """Stop the autosave journal and delete its files, the drawing was closed properly.
+        """
+        if self.history.journal:
+            self.history.journal.close(discard=True)
+            self.history.journal = None
+
+    def recover(self, snapshot: List[Entry], entries: List[Entry]) -> None:
+        """Rebuild a drawing from an autosave snapshot and the journal entries written after it.
+
+        Args:
+            snapshot (List[Entry]): the strokes of the snapshot, as put entries
+            entries (List[Entry]): the journal entries written after the snapshot
+        """
+        # the ids of the strokes in the old session
+        strokes: Dict[int, Stroke] = {}
+        for entry in snapshot + entries:
+            if entry["op"] == "put":
+                old = strokes.get(entry["id"])
+                if old:
+                    self.strokes.remove(old)
+                stroke = self.stroke_from_record(entry["record"])
+                stroke.z = entry["z"]
+                self.strokes.restore(stroke)
+                strokes[entry["id"]] = stroke
+            elif entry["op"] == "remove":
+                for stroke_id in entry["ids"]:
+                    if stroke_id in strokes:
+                        self.strokes.remove(strokes.pop(stroke_id))
+            elif entry["op"] == "move":
+                for stroke_id in entry["ids"]:
+                    if stroke_id in strokes:
+                        strokes[stroke_id].move(entry["dx"], entry["dy"])
+            elif entry["op"] == "z":
+                for stroke_id, z in entry["keys"]:
+                    if stroke_id in strokes:
+                        self.strokes.set_key(strokes[stroke_id], z)
+        # paint once the order is known
         for stroke in self.strokes:
-            
-            if isinstance(stroke, TriangleStroke):
-                mid = (
-                    stroke.coordinates[0][0] + stroke.coordinates[1][0])//2, stroke.coordinates[1][1]
-                draw.polygon([*stroke.coordinates[0], *mid, stroke.coordinates[1][0], stroke.coordinates[0][1]],
-                             fill=stroke.fill if len(stroke.fill) else None, outline=stroke.color, width=stroke.width)
-            
-            elif isinstance(stroke, PolygonStroke):
-                draw.polygon(stroke.coordinates, fill=stroke.fill if len(
-                    stroke.fill) else None, outline=stroke.color, width=stroke.width)
-           
-            elif isinstance(stroke, ShapeStroke):
-                coordinates = min(stroke.coordinates[0][0], stroke.coordinates[1][0]), min(stroke.coordinates[0][1], stroke.coordinates[1][1]), max(
-                    stroke.coordinates[0][0], stroke.coordinates[1][0]), max(stroke.coordinates[0][1], stroke.coordinates[1][1])
-                if stroke.shape.value == Shape.OVAL.value:
-                    draw.ellipse(coordinates, outline=stroke.color, fill=stroke.fill if len(
-                        stroke.fill) else None, width=stroke.width)
-                else:
-                    draw.rectangle(coordinates, outline=stroke.color, fill=stroke.fill if len(
-                        stroke.fill) else None, width=stroke.width)
-           
-            elif isinstance(stroke, FreeStyleStroke):
-                for i, co in enumerate(stroke.coordinates):
-                    if i == 0:
-                        continue
-                    draw.line(
-                        (*stroke.coordinates[i-1], *co), fill=stroke.color, width=stroke.width)
-           
-            elif isinstance(stroke, TextStroke):
-                font_file = f"./assets/fonts/{stroke.font}"
-                if stroke.bold:
-                    font_file += "-bold"
-                if stroke.italic:
-                    font_file += "-italic"
-                try:
-                    font: Union[ImageFont.FreeTypeFont] = ImageFont.truetype( f"{font_file}.ttf", 
-                                            int((stroke.font_size / 72) * 96))
-                    _, descent = font.getmetrics()
-                    text_width = font.getmask(stroke.text).getbbox()[2]
-                    text_height = font.getmask(stroke.text).getbbox()[3] + descent
-                    x = stroke.coordinates[0][0] - (text_width // 2)
-                    y = stroke.coordinates[0][1] - (text_height // 2)
-                    draw.text((x, y), stroke.text, fill=stroke.color, font=font)
-                except:
-                    pass
+            stroke.paint()
 
-                
-        # save the image to a png file
-        i = 1
-        while True:
-            if os.path.isfile(f"image{i}.png"):
-                i += 1
-            else:
-                img.save(f"image{i}.png")
-                break
+    def export_to_png(self, dpi: Union[Literal[None], float] = None) -> None:
+        """Export canvas content to a PNG image, on the export worker.
+
+        Args:
+            dpi (float, optional): the resolution to print the canvas at, the image is drawn in strips so it can be
+                much larger than the memory would hold at once. Default is the size of the document.
+        """
+        export_to_png(self.exporter, self.strokes, self.viewport.size, dpi)
+
+    def export_to_png_at_dpi(self) -> None:
+        """Ask for a resolution and export canvas content to a PNG image at it.
+        """
+        dpi = simpledialog.askinteger("Export As", "Resolution (dpi):", parent=self, initialvalue=300, minvalue=24, maxvalue=2400)
+        if dpi:
+            self.export_to_png(dpi)
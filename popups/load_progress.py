@@ -0,0 +1,30 @@
+from typing import *
+
+import tkinter as tk
+from tkinter import ttk
+
+class LoadProgress(tk.Toplevel):
+    """a popup showing the progress of loading a saved file, with a button to cancel it
+    """
+    def __init__(self, master: tk.Misc, on_cancel: Callable[[], None]) -> None:
+        super().__init__(master)
+        self.geometry("300x110+300+150")
+        self.grab_set()
+        self.title("Loading")
+        self.protocol("WM_DELETE_WINDOW", on_cancel)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.label = tk.Label(self, text="Loading... 0 strokes")
+        self.label.grid(row=0, column=0, sticky=tk.NSEW, pady=(10, 0))
+
+        self.progress = ttk.Progressbar(self, orient=tk.HORIZONTAL, mode="determinate", maximum=100)
+        self.progress.grid(row=1, column=0, sticky=tk.EW, padx=20, pady=10)
+
+        self.cancel_btn = tk.Button(self, text="Cancel", command=on_cancel)
+        self.cancel_btn.grid(row=2, column=0)
+
+    def update_progress(self, fraction: float, strokes: int) -> None:
+        """show the part of the file loaded and the number of strokes drawn
+        """
+        self.progress["value"] = fraction * 100
+        self.label.configure(text=f"Loading... {strokes} strokes")
@@ -13,7 +13,7 @@ class LoadSavedFile(tk.Toplevel):
         self.title("Load Saved File")
         self.grid_columnconfigure(0, weight=1)
         
-        self.label = tk.Label(self, text="Please enter a valid json file path.\n Please note that the current canvas will be deleted.")
+        self.label = tk.Label(self, text="Please enter a saved .json or .json.gz file path.\n Please note that the current canvas will be deleted.")
         self.label.grid(column=0, row=0, sticky=tk.NSEW, columnspan=3)
         
         self.entry = tk.Entry(self, width=1)
@@ -24,7 +24,7 @@ class LoadSavedFile(tk.Toplevel):
             if success:
                 self.destroy()
             else:
-                self.error_msg = tk.Label(self, text="invalid path or json file. please try again with a different file", fg="red")
+                self.error_msg = tk.Label(self, text="invalid path or canvas file. please try again with a different file", fg="red")
                 self.error_msg.grid(row=3, column=0, sticky=tk.NSEW, columnspan=3)
         
         self.load_btn = tk.Button(self, text="Load", command=command)
@@ -3,7 +3,7 @@ import tkinter as tk
 from typing import *
 
 from helper_funcs.validate_funcs import validate_font_size
-from helper_funcs.load_available_fonts import load_available_fonts
+from helper_funcs.font_catalog import font_catalog
 from components.color_btn import ColorBtn
 from components.icon_button import IconButton
 
@@ -24,7 +24,10 @@ class TextOptions(tk.Toplevel):
         self.on_save = on_save
         self.multiple = multiple
 
-        self.fonts = load_available_fonts()
+        self.fonts = font_catalog().fonts
+        # the font list is filtered a moment after the typing stops, not on every key
+        self.filter_delay_ms = 150
+        self.filter_job: Union[Literal[None], str] = None
         self.create_widgets()
         
         
@@ -120,22 +123,32 @@ class TextOptions(tk.Toplevel):
                      italic=self.italic)
         self.destroy()
 
+    def destroy(self) -> None:
+        if self.filter_job is not None:
+            self.after_cancel(self.filter_job)
+            self.filter_job = None
+        super().destroy()
+
     def  on_typing_font(self, event: tk.Event) -> None:
-        value = event.widget.get()
-        if value:
-            self.font_listbox.delete(0, tk.END)
-            for item in self.fonts:
-                if value.lower() in item.lower():
-                    self.font_listbox.insert(tk.END, item)
-        else:
-            self.font_listbox.delete(0, tk.END)
-            self.font_listbox.insert(tk.END, *self.fonts)
+        if self.filter_job is not None:
+            self.after_cancel(self.filter_job)
+        self.filter_job = self.after(self.filter_delay_ms, self.filter_fonts)
+
+    def filter_fonts(self) -> None:
+        """show the fonts that match the font entry in the listbox
+        """
+        self.filter_job = None
+        self.font_listbox.delete(0, tk.END)
+        self.font_listbox.insert(tk.END, *font_catalog().search(self.font_entry.get()))
 
     
     def on_select_font(self, event: tk.Event) -> None:
         selected_item = event.widget.get(tk.ACTIVE)
         if not selected_item:
             return
+        if self.filter_job is not None:
+            self.after_cancel(self.filter_job)
+            self.filter_job = None
         self.font_entry.delete(0, tk.END)
         self.font_entry.insert(tk.END, selected_item)
         self.font_listbox.delete(0, tk.END)
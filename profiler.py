@@ -0,0 +1,162 @@
+import json
+import math
+import time
+from datetime import datetime
+from functools import wraps
+from typing import *
+
+import tkinter as tk
+
+# the histograms have 4 buckets per doubling of the latency, from a microsecond up
+BUCKETS_PER_DOUBLING = 4
+SMALLEST_MS = 0.001
+
+
+class LatencyHistogram():
+    """The latencies of one handler, counted in buckets that grow exponentially (about 19% apart),
+    so the percentiles are known to a bucket without keeping every sample.
+
+    Attributes:
+        count (int): the number of calls.
+        total_ms (float): the time of all the calls.
+        max_ms (float): the slowest call.
+        buckets (Dict[int, int]): the number of calls in each bucket, see bucket().
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets: Dict[int, int] = {}
+
+    @staticmethod
+    def bucket(ms: float) -> int:
+        """The bucket of a latency, bucket i holds the latencies up to upper_bound(i)."""
+        if ms <= SMALLEST_MS:
+            return 0
+        return math.ceil(math.log2(ms / SMALLEST_MS) * BUCKETS_PER_DOUBLING)
+
+    @staticmethod
+    def upper_bound(bucket: int) -> float:
+        return SMALLEST_MS * 2 ** (bucket / BUCKETS_PER_DOUBLING)
+
+    def add(self, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        bucket = self.bucket(ms)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def percentile(self, fraction: float) -> float:
+        """The latency a fraction of the calls were faster than, the upper bound of its bucket (never above max_ms)."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.upper_bound(bucket), self.max_ms)
+        return self.max_ms
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": round(self.percentile(0.5), 3),
+            "p95_ms": round(self.percentile(0.95), 3),
+            "p99_ms": round(self.percentile(0.99), 3),
+            # the upper bound of each bucket and the number of calls in it
+            "histogram": {f"{self.upper_bound(bucket):.4g}": self.buckets[bucket] for bucket in sorted(self.buckets)},
+        }
+
+
+class Profiler():
+    """Opt-in latency instrumentation of the painter.
+
+    instrument() replaces methods of classes with wrappers that time every call into a histogram, so nothing is
+    timed (and nothing costs anything) unless it was instrumented. the painter binds its handlers when it is
+    created, so the classes are instrumented before that. nested calls are timed each on their own: the time of
+    handle_drag includes the paint calls it made.
+
+    Attributes:
+        histograms (Dict[str, LatencyHistogram]): the latencies of each instrumented method, by "Class.method".
+        canvas (tk.Canvas): the canvas the items are counted on, None before watch() is called.
+        canvas_items (int): the number of items on the canvas when they were last counted.
+        max_canvas_items (int): the most items counted on the canvas.
+        started (float): when the profiler was created (time.time()).
+    """
+
+    def __init__(self) -> None:
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.canvas: Union[Literal[None], tk.Canvas] = None
+        self.canvas_items = 0
+        self.max_canvas_items = 0
+        self.started = time.time()
+
+    def instrument(self, cls: type, names: Iterable[str]) -> None:
+        """Time the calls of methods of a class, the methods a subclass overrides are not affected.
+
+        Args:
+            cls (type): the class
+            names (Iterable[str]): the names of the methods, the ones the class doesn't have are skipped
+        """
+        for name in names:
+            method = getattr(cls, name, None)
+            if callable(method):
+                setattr(cls, name, self.timed(f"{cls.__name__}.{name}", method))
+
+    def instrument_overrides(self, base: type, names: Iterable[str]) -> None:
+        """Time the calls of methods in a class and in every subclass that defines them itself,
+        like Stroke.paint or Action.undo.
+        """
+        names = list(names)
+        classes = [base]
+        while len(classes):
+            cls = classes.pop()
+            self.instrument(cls, [name for name in names if name in vars(cls)])
+            classes.extend(cls.__subclasses__())
+
+    def timed(self, label: str, function: Callable[..., Any]) -> Callable[..., Any]:
+        histogram = self.histograms.setdefault(label, LatencyHistogram())
+
+        @wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.add((time.perf_counter() - start) * 1000)
+        return wrapper
+
+    def watch(self, canvas: tk.Canvas) -> None:
+        """Count the items of a canvas, see count_items."""
+        self.canvas = canvas
+
+    def count_items(self) -> int:
+        """Count the items on the canvas now (it takes a walk over them, so it is done on the overlay refresh)."""
+        if self.canvas is not None:
+            self.canvas_items = len(self.canvas.find_all())
+            self.max_canvas_items = max(self.max_canvas_items, self.canvas_items)
+        return self.canvas_items
+
+    def busiest(self, count: int) -> List[Tuple[str, LatencyHistogram]]:
+        """The handlers that took the most time so far."""
+        called = [(label, histogram) for label, histogram in self.histograms.items() if histogram.count]
+        return sorted(called, key=lambda item: item[1].total_ms, reverse=True)[:count]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "duration_s": round(time.time() - self.started, 3),
+            "canvas_items": {"last": self.canvas_items, "max": self.max_canvas_items},
+            "handlers": {label: histogram.stats() for label, histogram in sorted(self.histograms.items()) if histogram.count},
+        }
+
+    def dump(self, path: str) -> None:
+        """Write the stats to a JSON file."""
+        self.count_items()
+        with open(path, "w") as file:
+            json.dump(self.stats(), file, indent=2)
@@ -0,0 +1,315 @@
+from math import ceil, floor, inf
+from typing import *
+
+import tkinter as tk
+from PIL import Image, ImageDraw, ImageTk
+
+from helper_funcs.save_funcs import stroke_to_record
+from render import STRIP_OVERLAP, draw_record, record_bbox
+from spatial_index import BBox, bboxes_overlap, union_bbox
+
+if TYPE_CHECKING:
+    from components.document_canvas import DocumentCanvas
+    from stroke import Stroke
+    from stroke_store import StrokeStore
+
+# the tag of the image item, the live items are always kept above it
+FLOOR_TAG = "raster-cache"
+
+
+class RasterCache():
+    """Flattens the strokes into one image shown as a single canvas item, so the canvas only holds
+    the items of the strokes that are edited (the stroke being drawn and the selection).
+
+    the store tells the cache about every stroke that was added, removed, changed or moved to another layer,
+    the changes are handled together when Tk is idle: a stroke that should stay live is painted, any other stroke
+    loses its items and is drawn into the image. only the parts of the image the changed strokes were or are
+    drawn on are drawn again, and a new stroke above everything is drawn on top without drawing anything else.
+
+    the image covers the window, the strokes are drawn into it at the zoom of the canvas. when the view is
+    scrolled the image is shifted and only the parts that came into view are drawn, zooming or resizing draws it all.
+
+    the live items are shown above the image, so a selected stroke is shown on top of the strokes over it
+    until it is unselected.
+
+    Attributes:
+        canvas (DocumentCanvas): the canvas the image is shown on.
+        strokes (StrokeStore): the strokes on the canvas.
+        keep_live (Callable[[Stroke], bool]): whether a stroke should keep its canvas items.
+        background (str): the color of the canvas.
+        image (Image.Image): the flattened strokes in view.
+        photo (ImageTk.PhotoImage): the image, as shown by the canvas.
+        zoom (float): the zoom the image is drawn at.
+        origin (Tuple[int, int]): the canvas coordinates of the top left pixel of the image.
+        size (Tuple[int, int]): the size of the image, the size of the window.
+        drawn (Dict[Stroke, BBox]): the flattened strokes, and the part of the document each one is drawn on.
+        live (Set[Stroke]): the strokes that were kept live.
+        dirty (Set[Stroke]): the strokes that changed since the image was last updated.
+        to_stack (Set[Stroke]): the strokes whose items should be put back in their layer.
+        overhang (int): how far the drawing of a stroke reaches out of its bounding box at most (texts are measured
+            by the canvas but drawn with PIL), in the document.
+        max_width (int): the widest line flattened, in the document.
+        top_z (float): the highest layer key drawn into the image.
+        max_regions (int): from this number of changed parts, the image is drawn again in one part that covers them.
+    """
+
+    max_regions = 64
+
+    def __init__(self, canvas: "DocumentCanvas", strokes: "StrokeStore", keep_live: Callable[["Stroke"], bool]) -> None:
+        self.canvas = canvas
+        self.strokes = strokes
+        self.keep_live = keep_live
+        self.background = canvas["background"]
+        self.zoom, self.origin, self.size = self.view()
+        self.image = Image.new("RGB", self.size, self.background)
+        self.photo = ImageTk.PhotoImage(self.image, master=self.canvas)
+        self.drawn: Dict["Stroke", BBox] = {}
+        self.live: Set["Stroke"] = set()
+        self.dirty: Set["Stroke"] = set()
+        self.to_stack: Set["Stroke"] = set()
+        self.recheck = False
+        self.overhang = 0
+        self.max_width = 0
+        self.top_z = -inf
+        self.job: Union[Literal[None], str] = None
+        self.show()
+
+        strokes.raster_cache = self
+        for stroke in strokes:
+            self.invalidate(stroke)
+
+    def view(self) -> Tuple[float, Tuple[int, int], Tuple[int, int]]:
+        """The zoom of the canvas, the canvas coordinates of the top left corner of the window and the size of the window."""
+        canvas = self.canvas
+        width, height = canvas.winfo_width(), canvas.winfo_height()
+        if width <= 1 or height <= 1:
+            # not shown yet
+            width, height = int(canvas["width"]), int(canvas["height"])
+        return canvas.zoom, (round(canvas.canvasx(0)), round(canvas.canvasy(0))), (width, height)
+
+    def show(self) -> None:
+        """Create the image item, unless it is on the canvas already (canvas.delete("all") deletes it too)."""
+        if not self.canvas.find_withtag(FLOOR_TAG):
+            self.canvas.create_image(*self.origin, image=self.photo, anchor=tk.NW, tags=FLOOR_TAG)
+            self.canvas.tag_lower(FLOOR_TAG)
+
+    def view_changed(self) -> None:
+        """Follow the view of the canvas after it was scrolled, zoomed or resized."""
+        zoom, origin, size = self.view()
+        if (zoom, origin, size) == (self.zoom, self.origin, self.size):
+            return
+        dx, dy = self.origin[0] - origin[0], self.origin[1] - origin[1]
+        if zoom != self.zoom or size != self.size or abs(dx) >= size[0] or abs(dy) >= size[1]:
+            self.zoom, self.origin = zoom, origin
+            if size != self.size:
+                self.size = size
+                self.photo = ImageTk.PhotoImage(Image.new("RGB", size, self.background), master=self.canvas)
+                self.canvas.itemconfigure(FLOOR_TAG, image=self.photo)
+            self.image = Image.new("RGB", size, self.background)
+            exposed = [(0, 0, size[0], size[1])]
+        else:
+            # shift what is still in view, only draw what came into it
+            self.origin = origin
+            image = Image.new("RGB", size, self.background)
+            image.paste(self.image, (dx, dy))
+            self.image = image
+            width, height = size
+            # the old edge is drawn again too, strokes cut by the edge of the image are drawn a little differently there
+            edge = STRIP_OVERLAP + ceil(self.max_width * zoom)
+            exposed = []
+            if dx > 0:
+                exposed.append((0, 0, min(width, dx + edge), height))
+            elif dx < 0:
+                exposed.append((max(0, width + dx - edge), 0, width, height))
+            if dy > 0:
+                exposed.append((0, 0, width, min(height, dy + edge)))
+            elif dy < 0:
+                exposed.append((0, max(0, height + dy - edge), width, height))
+        for region in exposed:
+            self.redraw(region)
+        self.photo.paste(self.image)
+        self.show()
+        self.canvas.coords(FLOOR_TAG, *origin)
+
+    def schedule(self) -> None:
+        if self.job is None:
+            self.job = self.canvas.after_idle(self.flush)
+
+    def invalidate(self, stroke: "Stroke") -> None:
+        """A stroke was added, removed or changed."""
+        self.dirty.add(stroke)
+        self.schedule()
+
+    def refresh(self, strokes: Iterable["Stroke"] = ()) -> None:
+        """Check again which strokes should be live, e.g. after the selection changed.
+
+        Args:
+            strokes (Iterable[Stroke], optional): strokes that may have to be live now, the live strokes are always checked
+        """
+        self.dirty.update(strokes)
+        self.recheck = True
+        self.schedule()
+
+    def restack(self, stroke: "Stroke") -> None:
+        """Put the items of a stroke back in its layer, if it stays live."""
+        self.to_stack.add(stroke)
+        self.schedule()
+
+    def reset(self) -> None:
+        """Forget all the strokes, after they were cleared."""
+        if self.job is not None:
+            self.canvas.after_cancel(self.job)
+            self.job = None
+        self.drawn.clear()
+        self.live.clear()
+        self.dirty.clear()
+        self.to_stack.clear()
+        self.recheck = False
+        self.overhang = 0
+        self.max_width = 0
+        self.top_z = -inf
+        self.image = Image.new("RGB", self.size, self.background)
+        self.photo.paste(self.image)
+        self.show()
+
+    def region(self, stroke: "Stroke") -> BBox:
+        """The part of the image a stroke is drawn on, measured while the stroke still has its items."""
+        bbox = stroke.bbox()
+        self.max_width = max(self.max_width, stroke.width)
+        drawn = record_bbox(stroke_to_record(stroke))
+        if not drawn:
+            return bbox
+        self.overhang = max(self.overhang, bbox[0] - drawn[0], bbox[1] - drawn[1], drawn[2] - bbox[2], drawn[3] - bbox[3])
+        return union_bbox([bbox, drawn]) or bbox
+
+    def flush(self) -> None:
+        """Flatten or paint the strokes that changed, and draw the parts of the image they changed."""
+        if self.job is not None:
+            self.canvas.after_cancel(self.job)
+            self.job = None
+        dirty, self.dirty = self.dirty, set()
+        to_stack, self.to_stack = self.to_stack, set()
+        changed = dirty | to_stack
+        if self.recheck:
+            changed |= self.live
+            self.recheck = False
+
+        regions: List[BBox] = []
+        # strokes drawn into the image for the first time, drawn on top if they are above everything in it
+        new: List[Tuple["Stroke", BBox]] = []
+        top_z = self.top_z
+        for stroke in changed:
+            old = self.drawn.pop(stroke, None)
+            if stroke not in self.strokes:
+                self.live.discard(stroke)
+                if old:
+                    regions.append(old)
+            elif self.keep_live(stroke):
+                if old:
+                    regions.append(old)
+                if not len(stroke.tk_painting):
+                    stroke.paint()
+                    to_stack.add(stroke)
+                self.live.add(stroke)
+            elif old and stroke not in dirty and not len(stroke.tk_painting):
+                # only asked to restack, and it is already flattened
+                self.drawn[stroke] = old
+            else:
+                self.live.discard(stroke)
+                region = self.region(stroke)
+                stroke.delete()
+                if old:
+                    regions += [old, region]
+                    self.drawn[stroke] = region
+                    top_z = max(top_z, stroke.z)
+                else:
+                    new.append((stroke, region))
+
+        on_top: List[Tuple["Stroke", BBox]] = []
+        for stroke, region in new:
+            if stroke.z > top_z:
+                on_top.append((stroke, region))
+            else:
+                regions.append(region)
+                self.drawn[stroke] = region
+
+        for region in self.merge(regions):
+            self.redraw(region)
+        if len(on_top):
+            draw = ImageDraw.Draw(self.image)
+            for stroke, region in sorted(on_top, key=lambda item: item[0].z):
+                draw_record(draw, stroke_to_record(stroke), scale=self.zoom, top=self.origin[1], left=self.origin[0])
+                self.drawn[stroke] = region
+                top_z = max(top_z, stroke.z)
+        self.top_z = top_z
+        if len(regions) or len(on_top):
+            self.photo.paste(self.image)
+        # a flattened stroke is drawn without items, the z order has to find it in its layer
+        for stroke in self.drawn.keys() & changed:
+            self.strokes.show(stroke)
+
+        self.stack(to_stack)
+
+    def pixels(self, region: BBox) -> BBox:
+        """The pixels of the image a part of the document covers, (x1, y1, x2, y2) with x2 and y2 excluded."""
+        zoom, (left, top) = self.zoom, self.origin
+        return (floor(region[0] * zoom) - left, floor(region[1] * zoom) - top,
+                ceil(region[2] * zoom) - left + 1, ceil(region[3] * zoom) - top + 1)
+
+    def merge(self, regions: List[BBox]) -> List[BBox]:
+        """Clip the changed parts of the document to the image and join the ones that overlap.
+
+        Returns:
+            List[BBox]: the parts of the image to draw again, (x1, y1, x2, y2) with x2 and y2 excluded
+        """
+        width, height = self.size
+        clipped = [(max(0, x1), max(0, y1), min(width, x2), min(height, y2)) for x1, y1, x2, y2 in map(self.pixels, regions)]
+        clipped = [region for region in clipped if region[0] < region[2] and region[1] < region[3]]
+        if len(clipped) > self.max_regions:
+            return [cast(BBox, union_bbox(clipped))]
+        merged: List[BBox] = []
+        for region in clipped:
+            i = 0
+            while i < len(merged):
+                if bboxes_overlap(merged[i], region):
+                    region = cast(BBox, union_bbox([merged.pop(i), region]))
+                    i = 0
+                else:
+                    i += 1
+            merged.append(region)
+        return merged
+
+    def redraw(self, region: BBox) -> None:
+        """Draw a part of the image again, from the strokes drawn on it.
+
+        Args:
+            region (BBox): the pixels of the image, (x1, y1, x2, y2) with x2 and y2 excluded
+        """
+        x1, y1, x2, y2 = region
+        zoom, (left, top) = self.zoom, self.origin
+        # PIL draws the joints of wide lines a little differently where they are cut by the edge of the image,
+        # the part is drawn with extra pixels around it so it matches the rest of the image (like the strips of write_png)
+        pad = STRIP_OVERLAP + ceil(self.max_width * zoom)
+        tile = Image.new("RGB", (x2 - x1 + 2 * pad, y2 - y1 + 2 * pad), self.background)
+        draw = ImageDraw.Draw(tile)
+        # the part of the document the tile shows
+        around = (floor((x1 - pad + left) / zoom), floor((y1 - pad + top) / zoom),
+                  ceil((x2 + pad + left) / zoom), ceil((y2 + pad + top) / zoom))
+        margin = self.overhang
+        candidates = self.strokes.spatial_index.query(around[0] - margin, around[1] - margin, around[2] + margin, around[3] + margin)
+        for stroke in self.strokes.sorted(stroke for stroke in candidates
+                                          if stroke in self.drawn and bboxes_overlap(self.drawn[stroke], around)):
+            draw_record(draw, stroke_to_record(stroke), scale=zoom, top=top + y1 - pad, left=left + x1 - pad)
+        self.image.paste(tile.crop((pad, pad, pad + x2 - x1, pad + y2 - y1)), (x1, y1))
+
+    def stack(self, strokes: Set["Stroke"]) -> None:
+        """Put the items of live strokes in their layer between the other live strokes, above the image."""
+        strokes = {stroke for stroke in strokes if stroke in self.live and len(stroke.tk_painting)}
+        if not len(strokes):
+            return
+        below = FLOOR_TAG
+        for stroke in self.strokes.sorted(self.live):
+            if stroke in strokes:
+                self.canvas.tag_raise(stroke.tag, below)
+            if len(stroke.tk_painting):
+                below = stroke.tag
@@ -0,0 +1,508 @@
+"""Render saved canvas data to a PNG, SVG or EPS image, without Tk (no display needed).
+
+run from the repository root:
+    python -m render in.json out.png --scale 2
+    python -m render in.json poster.png --dpi 600
+"""
+import argparse
+import os
+from math import ceil
+import struct
+import sys
+import zlib
+from collections import Counter
+from functools import lru_cache
+from xml.sax.saxutils import escape, quoteattr
+from typing import *
+
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+from helper_funcs.calc_points_funcs import triangle_vertices
+from helper_funcs.font_catalog import FONTS_DIR, font_catalog
+from helper_funcs.save_funcs import Record, read_canvas_data
+
+CANVAS_SIZE = (640, 480)
+# the resolution the canvas is shown at, the font sizes are converted to pixels with it
+SCREEN_DPI = 96
+# the least rows drawn above and below every strip of write_png, more for wide lines
+STRIP_OVERLAP = 8
+
+
+# the fonts that were missing from the assets and replaced by a fallback, and how many texts used the fallback
+missing_fonts: "Counter[str]" = Counter()
+
+
+def font_path(font: str, bold: bool, italic: bool) -> str:
+    """The path of the ttf file of a font in the assets."""
+    font_file = os.path.join(FONTS_DIR, font)
+    if bold:
+        font_file += "-bold"
+    if italic:
+        font_file += "-italic"
+    return f"{font_file}.ttf"
+
+
+@lru_cache(maxsize=64)
+def load_font(font: str, bold: bool, italic: bool, size: int) -> ImageFont.ImageFont:
+    """Load a font from the assets, cached since loading a ttf file is much slower than drawing with it.
+
+    a font missing from the assets falls back to the regular style of its family, then to the default
+    font of PIL, and is counted in missing_fonts (a ttf file that can't be read counts as missing).
+
+    Args:
+        font (str): the family of the font
+        bold (bool): whether the font is bold
+        italic (bool): whether the font is italic
+        size (int): the size of the font in pixels
+
+    Returns:
+        ImageFont.ImageFont: the font
+    """
+    for path in (font_catalog().font_file(font, bold, italic), font_catalog().font_file(font)):
+        if path is None:
+            continue
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            # counted by count_missing_font, see font_readable
+            continue
+    return ImageFont.load_default(size)
+
+
+@lru_cache(maxsize=None)
+def font_readable(path: str) -> bool:
+    """Whether PIL can load a ttf file, checked once per file."""
+    try:
+        ImageFont.truetype(path, 12)
+        return True
+    except OSError:
+        return False
+
+
+@lru_cache(maxsize=4096)
+def text_extent(font: str, bold: bool, italic: bool, size: int, text: str) -> Tuple[int, int]:
+    """The width and height of a text drawn with a font, cached since the same labels are drawn again and again.
+
+    Returns:
+        Tuple[int, int]: the width and height of the text, from the origin of the text
+    """
+    box = load_font(font, bold, italic, size).getmask(text).getbbox()
+    return (box[2], box[3]) if box else (0, 0)
+
+
+def take_missing_fonts() -> Dict[str, int]:
+    """The fonts that fell back since the last call, and how many texts used the fallback."""
+    missing = dict(missing_fonts)
+    missing_fonts.clear()
+    return missing
+
+
+def report_missing_fonts(missing: Dict[str, int]) -> None:
+    """Print the fonts that fell back, if any, and the differences between fonts.json and the ttf files
+    that may be why."""
+    for name, count in sorted(missing.items()):
+        print(f"font {name} is missing from the assets, {count} texts were drawn with a fallback", file=sys.stderr)
+    if len(missing):
+        for problem in font_catalog().report():
+            print(problem, file=sys.stderr)
+
+
+def missing_font(font: str, bold: bool, italic: bool) -> bool:
+    """Whether a font falls back because its file is missing from the assets or can't be read."""
+    path = font_catalog().font_file(font, bold, italic)
+    return path is None or not font_readable(path)
+
+
+def text_layout(stroke: Record, scale: float) -> Tuple[ImageFont.ImageFont, float, float, int, int]:
+    """Where a text stroke is drawn: its font, the top left corner of the text and its width and height (with the descent)."""
+    size = int((stroke["font_size"] / 72) * SCREEN_DPI * scale)
+    font = load_font(stroke["font"], stroke["bold"], stroke["italic"], size)
+    _, descent = font.getmetrics()
+    text_width, text_height = text_extent(stroke["font"], stroke["bold"], stroke["italic"], size, stroke["text"])
+    x, y = stroke["coordinates"][0]
+    return font, round(x * scale) - (text_width // 2), round(y * scale) - ((text_height + descent) // 2), text_width, text_height + descent
+
+
+def count_missing_font(stroke: Record) -> None:
+    """Count a text stroke in missing_fonts if its font falls back."""
+    if stroke["type"] == "TextStroke" and stroke["text"] and missing_font(stroke["font"], stroke["bold"], stroke["italic"]):
+        missing_fonts[os.path.basename(font_path(stroke["font"], stroke["bold"], stroke["italic"]))] += 1
+
+
+def draw_record(draw: ImageDraw.ImageDraw, stroke: Record, scale: float = 1, top: int = 0, left: int = 0) -> None:
+    """Draw a stroke, like the canvas shows it.
+
+    Args:
+        draw (ImageDraw.ImageDraw): the image to draw on
+        stroke (Record): the record of the stroke
+        scale (float, optional): how much to enlarge the stroke. Default is 1.
+        top (int, optional): the row of the whole image the image to draw on starts at, when drawing a strip of it. Default is 0.
+        left (int, optional): the column of the whole image the image to draw on starts at. Default is 0.
+    """
+    # whole pixels, so a strip draws exactly the rows the whole image would
+    coordinates = [(round(x * scale) - left, round(y * scale) - top) for x, y in stroke["coordinates"]]
+    width = max(1, round(stroke["width"] * scale))
+    fill = stroke["fill"] if stroke["fill"] else None
+
+    if stroke["type"] == "TriangleStroke":
+        if len(coordinates) >= 2:
+            draw.polygon(triangle_vertices(coordinates[0], coordinates[1]), fill=fill, outline=stroke["color"], width=width)
+
+    elif stroke["type"] == "PolygonStroke":
+        if len(coordinates) >= 2:
+            draw.polygon(coordinates, fill=fill, outline=stroke["color"], width=width)
+
+    elif stroke["type"] == "ShapeStroke":
+        if len(coordinates) < 2:
+            return
+        (x1, y1), (x2, y2) = coordinates[0], coordinates[1]
+        box = min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+        if stroke["shape"] == "OVAL":
+            draw.ellipse(box, outline=stroke["color"], fill=fill, width=width)
+        else:
+            draw.rectangle(box, outline=stroke["color"], fill=fill, width=width)
+
+    elif stroke["type"] == "FreeStyleStroke":
+        if len(coordinates) >= 2:
+            # one polyline with round joints, like the line item on the canvas
+            draw.line(coordinates, fill=stroke["color"], width=width, joint="curve")
+
+    elif stroke["type"] == "TextStroke":
+        if not stroke["text"] or not len(coordinates):
+            return
+        font, x, y, _, _ = text_layout(stroke, scale)
+        draw.text((x - left, y - top), stroke["text"], fill=stroke["color"], font=font)
+
+
+def record_bbox(stroke: Record, scale: float = 1) -> Union[Literal[None], Tuple[int, int, int, int]]:
+    """The part of the image a stroke may draw on, None if it draws nothing.
+
+    Returns:
+        Tuple[int, int, int, int]: the first and last column and row (x1, y1, x2, y2), with a margin for the line width
+    """
+    if not len(stroke["coordinates"]):
+        return None
+    if stroke["type"] == "TextStroke":
+        if not stroke["text"]:
+            return None
+        _, x, y, width, height = text_layout(stroke, scale)
+        # glyphs like italics may reach a little out of the measured box
+        margin = height // 4 + 2
+        return x - margin, y - margin, x + width + margin, y + height + margin
+    xs = [round(x * scale) for x, _ in stroke["coordinates"]]
+    ys = [round(y * scale) for _, y in stroke["coordinates"]]
+    margin = max(1, round(stroke["width"] * scale)) + 2
+    return min(xs) - margin, min(ys) - margin, max(xs) + margin, max(ys) + margin
+
+
+def record_rows(stroke: Record, scale: float = 1) -> Union[Literal[None], Tuple[int, int]]:
+    """The rows of the image a stroke may draw on, None if it draws nothing.
+
+    Returns:
+        Tuple[int, int]: the first and last row, with a margin for the line width
+    """
+    bbox = record_bbox(stroke, scale)
+    return (bbox[1], bbox[3]) if bbox else None
+
+
+def render_records(records: Iterable[Record], size: Tuple[int, int] = CANVAS_SIZE, scale: float = 1, background: str = "black") -> Image.Image:
+    """Draw strokes on a new image, like the canvas shows them.
+
+    Args:
+        records (Iterable[Record]): the records of the strokes, in layer order
+        size (Tuple[int, int], optional): the size of the canvas. Default is 640x480.
+        scale (float, optional): how much to enlarge the image. Default is 1.
+        background (str, optional): the background color. Default is black.
+
+    Returns:
+        Image.Image: the image
+    """
+    img = Image.new("RGB", (round(size[0] * scale), round(size[1] * scale)), background)
+    draw = ImageDraw.Draw(img)
+
+    for stroke in records:
+        count_missing_font(stroke)
+        draw_record(draw, stroke, scale)
+
+    return img
+
+
+def png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def write_png(records: Iterable[Record], output_path: str, size: Tuple[int, int] = CANVAS_SIZE, scale: float = 1,
+              dpi: Union[Literal[None], float] = None, background: str = "black", strip_pixels: int = 1 << 22,
+              progress: Union[Literal[None], Callable[[float], None]] = None) -> None:
+    """Draw strokes to a PNG file a strip of rows at a time, so a large image never has to be held in memory.
+
+    every strip only draws the strokes that reach it, and its rows are compressed into the file before the next one is drawn.
+
+    Args:
+        records (Iterable[Record]): the records of the strokes, in layer order
+        output_path (str): the path of the PNG file
+        size (Tuple[int, int], optional): the size of the canvas. Default is 640x480.
+        scale (float, optional): how much to enlarge the image, ignored if dpi is given. Default is 1.
+        dpi (float, optional): the resolution to print the canvas at, the canvas is shown at 96 dpi. Default is the scale.
+        background (str, optional): the background color. Default is black.
+        strip_pixels (int, optional): the number of pixels in a strip, bounds the memory used. Default is 4M (12MB).
+        progress (Callable[[float], None], optional): called with the part of the image written (0 to 1) after every strip.
+    """
+    if dpi:
+        scale = dpi / SCREEN_DPI
+    width, height = max(1, round(size[0] * scale)), max(1, round(size[1] * scale))
+    strip_height = max(1, min(height, strip_pixels // width))
+
+    placed: List[Tuple[Record, Tuple[int, int]]] = []
+    # PIL rasterizes the joints of wide lines a little differently where they are cut by the edge of the image,
+    # the strips are drawn with extra rows around them so the seams match the image drawn at once
+    overlap = STRIP_OVERLAP
+    for stroke in records:
+        count_missing_font(stroke)
+        rows = record_rows(stroke, scale)
+        if rows is not None:
+            placed.append((stroke, rows))
+            overlap = max(overlap, STRIP_OVERLAP + round(stroke["width"] * scale))
+
+    # the strokes that reach every strip, in layer order
+    strips: List[List[Record]] = [[] for _ in range(0, height, strip_height)]
+    for stroke, (first_row, last_row) in placed:
+        if last_row + overlap < 0 or first_row - overlap >= height:
+            continue
+        for i in range(max(first_row - overlap, 0) // strip_height, min(last_row + overlap, height - 1) // strip_height + 1):
+            strips[i].append(stroke)
+
+    compressor = zlib.compressobj(6)
+    with open(output_path, "wb") as file:
+        file.write(b"\x89PNG\r\n\x1a\n")
+        # 8 bit RGB, no interlacing
+        file.write(png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        if dpi:
+            pixels_per_meter = round(dpi / 0.0254)
+            file.write(png_chunk(b"pHYs", struct.pack(">IIB", pixels_per_meter, pixels_per_meter, 1)))
+        for i, strip_records in enumerate(strips):
+            top = i * strip_height
+            rows = min(strip_height, height - top)
+            strip = Image.new("RGB", (width, rows + 2 * overlap), background)
+            draw = ImageDraw.Draw(strip)
+            for stroke in strip_records:
+                draw_record(draw, stroke, scale, top - overlap)
+            data = strip.crop((0, overlap, width, overlap + rows)).tobytes()
+            stride = width * 3
+            # every row starts with its filter type, 0 (none)
+            compressed = compressor.compress(b"".join(b"\x00" + data[row * stride:(row + 1) * stride] for row in range(rows)))
+            if compressed:
+                file.write(png_chunk(b"IDAT", compressed))
+            if progress:
+                progress((i + 1) / len(strips))
+        file.write(png_chunk(b"IDAT", compressor.flush()))
+        file.write(png_chunk(b"IEND", b""))
+
+
+def svg_style(stroke: Record) -> Union[Literal[None], Tuple[str, ...]]:
+    """The CSS declarations of the style of a stroke in SVG, strokes with the same ones share a class."""
+    if stroke["type"] == "TextStroke":
+        return (f"fill:{stroke['color']}", f"font-family:{css_string(stroke['font'])}", f"font-size:{stroke['font_size']}pt",
+                f"font-weight:{'bold' if stroke['bold'] else 'normal'}", f"font-style:{'italic' if stroke['italic'] else 'normal'}")
+    if stroke["type"] == "FreeStyleStroke":
+        return (f"stroke:{stroke['color']}", f"stroke-width:{stroke['width']}px", "fill:none")
+    if stroke["type"] in ("TriangleStroke", "PolygonStroke", "ShapeStroke"):
+        return (f"stroke:{stroke['color']}", f"stroke-width:{stroke['width']}px", f"fill:{stroke['fill'] or 'none'}")
+    return None
+
+
+def css_string(text: str) -> str:
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def svg_element(stroke: Record, style_class: str) -> str:
+    """The SVG element of a stroke, "" if it draws nothing."""
+    coordinates = stroke["coordinates"]
+    if stroke["type"] == "TextStroke":
+        if not stroke["text"] or not len(coordinates):
+            return ""
+        x, y = coordinates[0]
+        return f'<text class="{style_class}" x="{x}" y="{y}">{escape(stroke["text"])}</text>'
+    if len(coordinates) < 2:
+        return ""
+    if stroke["type"] == "TriangleStroke":
+        coordinates = triangle_vertices(coordinates[0], coordinates[1])
+    points = " ".join(f"{x},{y}" for x, y in coordinates)
+    if stroke["type"] == "FreeStyleStroke":
+        # one polyline for the whole stroke, like the line item on the canvas
+        return f'<polyline class="{style_class}" points="{points}"/>'
+    if stroke["type"] in ("TriangleStroke", "PolygonStroke"):
+        return f'<polygon class="{style_class}" points="{points}"/>'
+    (x1, y1), (x2, y2) = coordinates[0], coordinates[1]
+    if stroke["shape"] == "OVAL":
+        return f'<ellipse class="{style_class}" cx="{(x1 + x2) / 2}" cy="{(y1 + y2) / 2}" rx="{abs(x2 - x1) / 2}" ry="{abs(y2 - y1) / 2}"/>'
+    return f'<rect class="{style_class}" x="{min(x1, x2)}" y="{min(y1, y2)}" width="{abs(x2 - x1)}" height="{abs(y2 - y1)}"/>'
+
+
+def write_svg(records: Iterable[Record], output_path: str, size: Tuple[int, int] = CANVAS_SIZE, scale: float = 1,
+              background: str = "black", batch_size: int = 1000, progress: Union[Literal[None], Callable[[float], None]] = None) -> None:
+    """Write strokes to an SVG file, like the canvas shows them.
+
+    the styles the strokes share are written once as classes, then the elements are streamed to the file in batches.
+
+    Args:
+        records (Iterable[Record]): the records of the strokes, in layer order
+        output_path (str): the path of the SVG file
+        size (Tuple[int, int], optional): the size of the canvas. Default is 640x480.
+        scale (float, optional): how much to enlarge the image. Default is 1.
+        background (str, optional): the background color. Default is black.
+        batch_size (int, optional): the number of elements written to the file at a time. Default is 1000.
+        progress (Callable[[float], None], optional): called with the part of the strokes written (0 to 1) after every batch.
+    """
+    records = list(records)
+    classes: Dict[Tuple[str, ...], str] = {}
+    for stroke in records:
+        style = svg_style(stroke)
+        if style is not None and style not in classes:
+            classes[style] = f"c{len(classes)}"
+
+    with open(output_path, "w", encoding="utf-8") as file:
+        file.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{round(size[0] * scale)}" height="{round(size[1] * scale)}" '
+                   f'viewBox="0 0 {size[0]} {size[1]}">\n<style><![CDATA[\n')
+        # the canvas draws lines with butt ends and round joints, and texts centered on their point
+        file.write("polyline{stroke-linecap:butt;stroke-linejoin:round}\n"
+                   "text{text-anchor:middle;dominant-baseline:central;white-space:pre}\n")
+        file.write("".join(f".{name}{{{';'.join(style)}}}\n" for style, name in classes.items()))
+        file.write(f"]]></style>\n<rect width=\"100%\" height=\"100%\" fill={quoteattr(background)}/>\n")
+
+        for start in range(0, len(records), batch_size):
+            elements = (svg_element(stroke, classes[style]) for stroke in records[start:start + batch_size]
+                        for style in (svg_style(stroke),) if style is not None)
+            file.write("".join(element + "\n" for element in elements if element))
+            if progress:
+                progress(min(start + batch_size, len(records)) / len(records))
+        file.write("</svg>\n")
+
+
+# the standard PostScript fonts closest to the fonts of the painter, by family, bold and italic
+EPS_FONT_FAMILIES = {"times new roman": "Times", "courier new": "Courier", "lucida sans typewriter": "Courier"}
+EPS_FONT_STYLES = {
+    "Helvetica": ("Helvetica", "Helvetica-Bold", "Helvetica-Oblique", "Helvetica-BoldOblique"),
+    "Times": ("Times-Roman", "Times-Bold", "Times-Italic", "Times-BoldItalic"),
+    "Courier": ("Courier", "Courier-Bold", "Courier-Oblique", "Courier-BoldOblique"),
+}
+
+
+def eps_color(color: str) -> str:
+    r, g, b = ImageColor.getrgb(color)[:3]
+    return f"{r / 255:.3f} {g / 255:.3f} {b / 255:.3f} setrgbcolor"
+
+
+def eps_string(text: str) -> str:
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").replace("\n", "\\n") + ")"
+
+
+def eps_element(stroke: Record, height: int) -> str:
+    """The PostScript that draws a stroke, "" if it draws nothing. PostScript counts y up from the bottom."""
+    coordinates = [(x, height - y) for x, y in stroke["coordinates"]]
+    if stroke["type"] == "TextStroke":
+        if not stroke["text"] or not len(coordinates):
+            return ""
+        styles = EPS_FONT_STYLES[EPS_FONT_FAMILIES.get(stroke["font"].lower(), "Helvetica")]
+        font = styles[bool(stroke["bold"]) + 2 * bool(stroke["italic"])]
+        # in pixels, like the rest of the drawing
+        size = stroke["font_size"] * SCREEN_DPI / 72
+        x, y = coordinates[0]
+        # centered on the point, like the canvas
+        return (f"/{font} findfont {size:.2f} scalefont setfont {eps_color(stroke['color'])} {x} {y - size * 0.35:.2f} moveto "
+                f"{eps_string(stroke['text'])} dup stringwidth pop 2 div neg 0 rmoveto show")
+    if len(coordinates) < 2:
+        return ""
+
+    if stroke["type"] == "ShapeStroke" and stroke["shape"] == "OVAL":
+        (x1, y1), (x2, y2) = coordinates[0], coordinates[1]
+        rx, ry = max(abs(x2 - x1) / 2, 0.5), max(abs(y2 - y1) / 2, 0.5)
+        # scale a circle into the ellipse, and back before the outline is stroked so its width isn't scaled
+        path = f"matrix currentmatrix {(x1 + x2) / 2} {(y1 + y2) / 2} translate {rx} {ry} scale 0 0 1 0 360 arc setmatrix closepath"
+    else:
+        if stroke["type"] == "TriangleStroke":
+            coordinates = triangle_vertices(stroke["coordinates"][0], stroke["coordinates"][1])
+            coordinates = [(x, height - y) for x, y in coordinates]
+        elif stroke["type"] == "ShapeStroke":
+            (x1, y1), (x2, y2) = coordinates[0], coordinates[1]
+            coordinates = [(x1, y1), (x2, y1), (x2, y2), (x1, y2)]
+        (x, y), rest = coordinates[0], coordinates[1:]
+        path = f"{x} {y} moveto " + " ".join(f"{x} {y} lineto" for x, y in rest)
+        if stroke["type"] != "FreeStyleStroke":
+            path += " closepath"
+
+    commands = ["newpath", path]
+    if stroke["type"] != "FreeStyleStroke" and stroke["fill"]:
+        commands.append(f"gsave {eps_color(stroke['fill'])} fill grestore")
+    commands.append(f"{stroke['width']} setlinewidth {eps_color(stroke['color'])} stroke")
+    return " ".join(commands)
+
+
+def write_eps(records: Iterable[Record], output_path: str, size: Tuple[int, int] = CANVAS_SIZE, background: str = "black",
+              batch_size: int = 1000, progress: Union[Literal[None], Callable[[float], None]] = None) -> None:
+    """Write strokes to an EPS file, like the canvas shows them (texts use the closest standard PostScript font).
+
+    Args:
+        records (Iterable[Record]): the records of the strokes, in layer order
+        output_path (str): the path of the EPS file
+        size (Tuple[int, int], optional): the size of the canvas. Default is 640x480.
+        background (str, optional): the background color. Default is black.
+        batch_size (int, optional): the number of strokes written to the file at a time. Default is 1000.
+        progress (Callable[[float], None], optional): called with the part of the strokes written (0 to 1) after every batch.
+    """
+    records = list(records)
+    width, height = size
+    with open(output_path, "w", encoding="latin-1") as file:
+        # the drawing is in pixels, printed at the size it has on the screen like the canvas postscript
+        file.write(f"%!PS-Adobe-3.0 EPSF-3.0\n%%BoundingBox: 0 0 {ceil(width * 72 / SCREEN_DPI)} {ceil(height * 72 / SCREEN_DPI)}\n"
+                   f"%%Creator: painter\n%%EndComments\ngsave\n72 {SCREEN_DPI} div dup scale\n0 setlinecap 1 setlinejoin\n"
+                   f"{eps_color(background)} 0 0 {width} {height} rectfill\n")
+        for start in range(0, len(records), batch_size):
+            elements = (eps_element(stroke, height) for stroke in records[start:start + batch_size])
+            file.write("".join(element + "\n" for element in elements if element))
+            if progress:
+                progress(min(start + batch_size, len(records)) / len(records))
+        file.write("grestore\nshowpage\n%%EOF\n")
+
+
+def render_file(input_path: str, output_path: str, size: Tuple[int, int] = CANVAS_SIZE, scale: float = 1,
+                dpi: Union[Literal[None], float] = None) -> None:
+    """Render a saved canvas file (any save format) to a PNG, SVG or EPS file, by the extension of the output.
+
+    Args:
+        input_path (str): the path of the saved canvas file
+        output_path (str): the path of the PNG, SVG or EPS file
+        size (Tuple[int, int], optional): the size of the canvas. Default is 640x480.
+        scale (float, optional): how much to enlarge the image. Default is 1.
+        dpi (float, optional): the resolution to print a PNG at, instead of the scale. Default is the scale.
+    """
+    records = read_canvas_data(input_path)
+    if output_path.lower().endswith(".svg"):
+        write_svg(records, output_path, size, scale)
+    elif output_path.lower().endswith(".eps"):
+        write_eps(records, output_path, size)
+    else:
+        write_png(records, output_path, size, scale, dpi)
+
+
+def main(argv: Union[Literal[None], List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m render", description="Render a saved canvas file to a PNG, SVG or EPS image.")
+    parser.add_argument("input", help="the saved canvas file (.json or .json.gz)")
+    parser.add_argument("output", help="the image file to write, .svg for SVG, .eps for EPS, PNG otherwise")
+    parser.add_argument("--scale", type=float, default=1, help="how much to enlarge the image (default 1)")
+    parser.add_argument("--dpi", type=float, help="the resolution to print a PNG at, the canvas is shown at 96 dpi (overrides --scale)")
+    parser.add_argument("--width", type=int, default=CANVAS_SIZE[0], help=f"the width of the canvas (default {CANVAS_SIZE[0]})")
+    parser.add_argument("--height", type=int, default=CANVAS_SIZE[1], help=f"the height of the canvas (default {CANVAS_SIZE[1]})")
+    args = parser.parse_args(argv)
+    try:
+        render_file(args.input, args.output, (args.width, args.height), args.scale, args.dpi)
+    except Exception as error:
+        print(error, file=sys.stderr)
+        return 1
+    report_missing_fonts(take_missing_fonts())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+from typing import *
+
+if TYPE_CHECKING:
+    from stroke import Stroke
+
+BBox = Tuple[int, int, int, int]
+
+
+def union_bbox(boxes: Iterable[BBox]) -> Union[Literal[None], BBox]:
+    """Calculate the bounding box of several bounding boxes.
+
+    Args:
+        boxes (Iterable[BBox]): the boxes, each one is (x1, y1, x2, y2)
+
+    Returns:
+        Union[None, BBox]: the box containing all the boxes, None if there are no boxes
+    """
+    result: Union[Literal[None], BBox] = None
+    for box in boxes:
+        if not result:
+            result = box
+        else:
+            result = min(result[0], box[0]), min(result[1], box[1]), max(result[2], box[2]), max(result[3], box[3])
+    return result
+
+
+def bboxes_overlap(a: BBox, b: BBox) -> bool:
+    """Check if two bounding boxes overlap (touching edges count as overlapping)."""
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+class SpatialIndex():
+    """A uniform grid over the canvas, each cell holds the strokes whose bounding box touches it.
+
+    strokes that changed are only re-bucketed on the next query, so moving a stroke on every
+    drag event costs O(1).
+
+    Attributes:
+        cell_size (int): the size of a grid cell in pixels.
+        cells (Dict[Tuple[int, int], Set[Stroke]]): the strokes in each non-empty cell.
+        stroke_cells (Dict[Stroke, BBox]): the range of cells (col1, row1, col2, row2) each stroke is bucketed in.
+        dirty (Set[Stroke]): strokes that changed since they were last bucketed.
+        on_update (Callable[[Stroke], None]): called when a stroke in the index changed, if set.
+    """
+
+    def __init__(self, cell_size: int = 64) -> None:
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], Set["Stroke"]] = {}
+        self.stroke_cells: Dict["Stroke", BBox] = {}
+        self.dirty: Set["Stroke"] = set()
+        self.on_update: Union[Literal[None], Callable[["Stroke"], None]] = None
+
+    def cell_range(self, bbox: BBox) -> BBox:
+        """Calculate the range of cells a bounding box touches.
+
+        Args:
+            bbox (BBox): the bounding box
+
+        Returns:
+            BBox: the first and last column and row (col1, row1, col2, row2)
+        """
+        return (int(bbox[0] // self.cell_size), int(bbox[1] // self.cell_size),
+                int(bbox[2] // self.cell_size), int(bbox[3] // self.cell_size))
+
+    def insert(self, stroke: "Stroke") -> None:
+        """Add a stroke to the index."""
+        self.dirty.add(stroke)
+
+    def update(self, stroke: "Stroke") -> None:
+        """Mark a stroke in the index as changed."""
+        self.dirty.add(stroke)
+        if self.on_update:
+            self.on_update(stroke)
+
+    def remove(self, stroke: "Stroke") -> None:
+        """Remove a stroke from the index."""
+        self.dirty.discard(stroke)
+        cell_range = self.stroke_cells.pop(stroke, None)
+        if cell_range:
+            self.unbucket(stroke, cell_range)
+
+    def clear(self) -> None:
+        """Remove all strokes from the index."""
+        self.cells.clear()
+        self.stroke_cells.clear()
+        self.dirty.clear()
+
+    def unbucket(self, stroke: "Stroke", cell_range: BBox) -> None:
+        for col in range(cell_range[0], cell_range[2] + 1):
+            for row in range(cell_range[1], cell_range[3] + 1):
+                cell = self.cells.get((col, row))
+                if cell is None:
+                    continue
+                cell.discard(stroke)
+                if not len(cell):
+                    del self.cells[(col, row)]
+
+    def flush(self) -> None:
+        """Re-bucket the strokes that changed since the last query."""
+        for stroke in self.dirty:
+            cell_range = self.cell_range(stroke.bbox())
+            old_range = self.stroke_cells.get(stroke)
+            if old_range == cell_range:
+                continue
+            if old_range:
+                self.unbucket(stroke, old_range)
+            for col in range(cell_range[0], cell_range[2] + 1):
+                for row in range(cell_range[1], cell_range[3] + 1):
+                    self.cells.setdefault((col, row), set()).add(stroke)
+            self.stroke_cells[stroke] = cell_range
+        self.dirty.clear()
+
+    def query(self, x1: int, y1: int, x2: int, y2: int) -> Set["Stroke"]:
+        """Find the strokes whose bounding box overlaps a rectangle.
+
+        Args:
+            x1 (int): left of the rectangle
+            y1 (int): top of the rectangle
+            x2 (int): right of the rectangle
+            y2 (int): bottom of the rectangle
+
+        Returns:
+            Set[Stroke]: the candidate strokes
+        """
+        self.flush()
+        rect = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+        col1, row1, col2, row2 = self.cell_range(rect)
+        found: Set["Stroke"] = set()
+        if (col2 - col1 + 1) * (row2 - row1 + 1) > len(self.cells):
+            # the rectangle covers more cells than are in use, go over the used cells instead
+            for (col, row), cell in self.cells.items():
+                if col1 <= col <= col2 and row1 <= row <= row2:
+                    found |= cell
+        else:
+            for col in range(col1, col2 + 1):
+                for row in range(row1, row2 + 1):
+                    cell = self.cells.get((col, row))
+                    if cell:
+                        found |= cell
+        return {stroke for stroke in found if bboxes_overlap(stroke.bbox(), rect)}
+
@@ -1,6 +1,14 @@
 from typing import *
+from itertools import count
+import sys
 from enums import Shape
+from spatial_index import SpatialIndex, BBox, bboxes_overlap
+from helper_funcs.intersect_funcs import *
+from helper_funcs.calc_points_funcs import triangle_vertices
+from helper_funcs import batch_calc_points_funcs
+from helper_funcs.simplify_funcs import simplify_points
 import tkinter as tk
+from components.document_canvas import DocumentCanvas
 
 class Stroke():
     """
@@ -9,69 +17,224 @@ class Stroke():
     Attributes:
         color (str): The color of the stroke.
         coordinates (List[Tuple[int, int]]): The coordinates of the stroke.
+        offset (Tuple[int, int]): A move that was applied to the canvas items but not yet to the coordinates.
         width (int): The width of the stroke.
         tk_painting (List[int]): The Tkinter IDs of the drawn elements.
-        canvas (tk.Canvas): The canvas on which the stroke is drawn.
+        canvas (DocumentCanvas): The canvas on which the stroke is drawn, the coordinates are in the document it shows.
+        id (int): A number identifying the stroke, unique and never changed.
+        tag (str): A tag carried by all the drawn elements of the stroke.
+        batch_threshold (int): From this number of points, geometry tests use the vectorized functions.
+        spatial_index (SpatialIndex): The index of the strokes list the stroke is in, if any.
+        cached_bbox (Tuple[int, int, int, int]): The bounding box of the stroke, None until calculated.
+        z (float): The key of the stroke in the layer order of the canvas, kept when the stroke is removed.
     """
+    tag_ids = count(1)
+    batch_threshold = 64
 
-    def __init__(self, x: int, y: int, color: str, width: int, canvas: tk.Canvas) -> None:
+    def __init__(self, x: int, y: int, color: str, width: int, canvas: DocumentCanvas) -> None:
+        self.spatial_index: Union[Literal[None], SpatialIndex] = None
+        self.cached_bbox: Union[Literal[None], BBox] = None
+        self.z = 0.0
         self.color = color
-        self.coordinates: List[Tuple[int, int]] = [(x, y)]
+        self.coordinates = [(x, y)]
         self.width = width
         self.tk_painting: List[int] = []
         self.canvas = canvas
+        self.id = next(Stroke.tag_ids)
+        self.tag = f"stroke-{self.id}"
+
+    @property
+    def coordinates(self) -> List[Tuple[int, int]]:
+        """The coordinates of the stroke, applies the pending offset on first access after a move."""
+        if self.offset != (0, 0):
+            dx, dy = self.offset
+            self._coordinates = [(co[0] + dx, co[1] + dy) for co in self._coordinates]
+            self.offset = (0, 0)
+        return self._coordinates
+    
+    @coordinates.setter
+    def coordinates(self, coordinates: List[Tuple[int, int]]) -> None:
+        self._coordinates = coordinates
+        self.offset: Tuple[int, int] = (0, 0)
+        self.geometry_changed()
+
+    def bbox(self) -> BBox:
+        """The bounding box of the stroke (x1, y1, x2, y2) including its width, cached until the stroke changes."""
+        if not self.cached_bbox:
+            self.cached_bbox = self.calculate_bbox()
+        return self.cached_bbox
+    
+    def calculate_bbox(self) -> BBox:
+        """Calculates the bounding box of the stroke from its coordinates."""
+        pad = self.width // 2 + 1
+        xs = [co[0] for co in self.coordinates]
+        ys = [co[1] for co in self.coordinates]
+        return min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad
+    
+    def geometry_changed(self) -> None:
+        """Drops the cached bounding box and lets the spatial index know the stroke changed."""
+        self.cached_bbox = None
+        if self.spatial_index is not None:
+            self.spatial_index.update(self)
+    
+    def extend_bbox(self, x: int, y: int) -> None:
+        """Grows the cached bounding box to contain a new point of the stroke."""
+        if self.cached_bbox:
+            pad = self.width // 2 + 1
+            x1, y1, x2, y2 = self.cached_bbox
+            self.cached_bbox = min(x1, x - pad), min(y1, y - pad), max(x2, x + pad), max(y2, y + pad)
+        if self.spatial_index is not None:
+            self.spatial_index.update(self)
+
+    def memory_size(self) -> int:
+        """Estimate the memory the stroke keeps alive in bytes, the canvas items are not counted."""
+        size = sys.getsizeof(self) + sys.getsizeof(self.__dict__)
+        for value in vars(self).values():
+            if isinstance(value, list):
+                size += sys.getsizeof(value)
+                if len(value) and isinstance(value[0], tuple):
+                    size += len(value) * (sys.getsizeof(value[0]) + sum(sys.getsizeof(c) for c in value[0]))
+                elif len(value) and isinstance(value[0], int):
+                    size += len(value) * sys.getsizeof(value[0])
+            elif isinstance(value, str):
+                size += sys.getsizeof(value)
+        return size
 
     def delete(self) -> None:
         """Deletes the stroke from the canvas."""
-        for line in self.tk_painting:
-            self.canvas.delete(line)
+        self.canvas.delete(self.tag)
+        self.tk_painting = []
     
     def paint(self) -> None:
         """Paints the stroke on the canvas."""
         pass
     
     def move(self, dx:int, dy:int) -> None:
-        """Moves the stroke by the specified offset."""
-        self.coordinates = [(co[0] + dx, co[1] + dy) for co in self.coordinates]
-        self.paint()
+        """Moves the stroke by the specified offset.
+        the drawn elements are moved in place, the coordinates are only updated when next accessed.
+        """
+        self.offset = (self.offset[0] + dx, self.offset[1] + dy)
+        self.canvas.move(self.tag, dx * self.canvas.zoom, dy * self.canvas.zoom)
+        if self.cached_bbox:
+            x1, y1, x2, y2 = self.cached_bbox
+            self.cached_bbox = x1 + dx, y1 + dy, x2 + dx, y2 + dy
+        if self.spatial_index is not None:
+            self.spatial_index.update(self)
 
     
     def continue_stroke(self, x: int, y: int) -> None:
         """Continues the stroke."""
         pass
     
+    def intersects_rect(self, rect: Rect) -> bool:
+        """Checks if the stroke, including its width, intersects a rectangle.
+
+        Args:
+            rect (Rect): the rectangle (left, top, right, bottom)
+
+        Returns:
+            bool: True if the stroke intersects the rectangle
+        """
+        if len(self.coordinates) >= self.batch_threshold:
+            return batch_calc_points_funcs.polyline_intersects_rect(self.coordinates, expand_rect(rect, self.width / 2))
+        return polyline_intersects_rect(self.coordinates, expand_rect(rect, self.width / 2))
+    
     
 
 class FreeStyleStroke(Stroke):
     """a freestyle stroke
+
+    Attributes:
+        polyline (bool): draw the stroke as a single multi-point line item that is extended with
+            canvas.coords, instead of one line item per segment.
     """
-    def __init__(self, x: int, y: int, color: str, width: int, canvas: tk.Canvas):
+    polyline: bool = True
+
+    def __init__(self, x: int, y: int, color: str, width: int, canvas: DocumentCanvas):
         super().__init__(x, y, color, width, canvas) 
-        self.prev_x = x
-        self.prev_y = y
+        self.flat_coordinates: List[int] = [x, y]
 
 
     def paint(self) -> None:
         
         self.delete()
         
-        for i, co in enumerate(self.coordinates):
-            if i == len(self.coordinates) - 1: return
-            line = self.canvas.create_line(*co, *self.coordinates[i+1], fill=self.color, width=self.width)
-            self.tk_painting.append(line)
-            
+        if not self.polyline:
+            for i, co in enumerate(self.coordinates[:-1]):
+                line = self.canvas.create_line(*self.canvas.view([co, self.coordinates[i+1]]), fill=self.color, width=self.canvas.view_width(self.width), tags=self.tag)
+                self.tk_painting.append(line)
+        else:
+            self.flat_coordinates = [c for co in self.coordinates for c in co]
+            if len(self.coordinates) > 1:
+                self.tk_painting = [self.create_polyline()]
+        self.geometry_changed()
+    
+    def create_polyline(self) -> int:
+        """Creates the single line item of the stroke.
+        the caps and joins match the look of the per-segment lines (butt ends, round joints).
+
+        Returns:
+            int: the Tkinter ID of the line
+        """
+        return self.canvas.create_line(self.canvas.view_flat(self.flat_coordinates), 
+                                       fill=self.color, 
+                                       width=self.canvas.view_width(self.width), 
+                                       capstyle=tk.BUTT, 
+                                       joinstyle=tk.ROUND,
+                                       tags=self.tag)
     
     def continue_stroke(self, x: int, y: int) -> None:
-        
-        line = self.canvas.create_line(self.prev_x, self.prev_y,
-                                        x, y,
-                                        fill=self.color,
-                                        width=self.width)
-        self.tk_painting.append(line)
+        self.add_point(x, y)
+        self.refresh()
+    
+    def add_point(self, x: int, y: int) -> None:
+        """Adds a point to the stroke without drawing it, refresh draws all the points added since it last ran.
+
+        Args:
+            x (int): The x-coordinate of the point.
+            y (int): The y-coordinate of the point.
+        """
         self.coordinates.append((x,y))
-        self.prev_x = x
-        self.prev_y = y
+        self.flat_coordinates += (x, y)
+        self.extend_bbox(x, y)
+    
+    def refresh(self) -> None:
+        """Draws the points that were added to the stroke since the last refresh."""
+        if self.polyline:
+            if len(self.tk_painting):
+                self.canvas.coords(self.tk_painting[0], self.canvas.view_flat(self.flat_coordinates))
+            elif len(self.coordinates) > 1:
+                self.tk_painting = [self.create_polyline()]
+            return
+        # one line item per segment, draw the missing segments
+        for i in range(len(self.tk_painting), len(self.coordinates) - 1):
+            line = self.canvas.create_line(*self.canvas.view(self.coordinates[i:i+2]),
+                                           fill=self.color,
+                                           width=self.canvas.view_width(self.width),
+                                           tags=self.tag)
+            self.tk_painting.append(line)
         
+    def simplify(self, tolerance: float) -> float:
+        """Drops redundant points of the stroke with the Ramer-Douglas-Peucker algorithm and redraws it.
+
+        Args:
+            tolerance (float): the maximal distance in pixels between a dropped point and the new line
+
+        Returns:
+            float: the reduction ratio, the number of points before divided by the number of points after
+        """
+        before = len(self.coordinates)
+        simplified = simplify_points(self.coordinates, tolerance)
+        if len(simplified) == before:
+            return 1.0
+        self.coordinates = simplified
+        self.flat_coordinates = [c for co in self.coordinates for c in co]
+        if self.polyline and len(self.tk_painting):
+            self.canvas.coords(self.tk_painting[0], self.canvas.view_flat(self.flat_coordinates))
+        else:
+            self.paint()
+        return before / len(simplified)
+    
     def __copy__(self) -> Stroke:
         stroke =  FreeStyleStroke(self.coordinates[0][0], self.coordinates[0][1], color=self.color, width=self.width, canvas=self.canvas)
         stroke.coordinates = self.coordinates
@@ -81,25 +244,37 @@ class FreeStyleStroke(Stroke):
 class ShapeStroke(Stroke):
     """a shape stroke - rectangle or oval
     """
-    def __init__(self, x: int, y: int, color: str, width: int, canvas: tk.Canvas, fill: str, shape:Shape) -> None:
+    def __init__(self, x: int, y: int, color: str, width: int, canvas: DocumentCanvas, fill: str, shape:Shape) -> None:
         super().__init__(x, y, color, width, canvas)
         self.shape: Shape = shape
         self.fill = fill
         
     def continue_stroke(self, x: int, y: int) -> None:
-        if len(self.tk_painting):
-            self.canvas.delete(self.tk_painting[0])
         self.coordinates = [self.coordinates[0]]
         self.coordinates.append((x, y))
         self.paint()            
     
     def paint(self) -> None:
-        if len(self.tk_painting):
-            self.canvas.delete(self.tk_painting[0])
+        self.delete()
+        corners = self.canvas.view(self.coordinates[:2])
         if self.shape.value == Shape.OVAL.value:
-            self.tk_painting = [self.canvas.create_oval( *self.coordinates[0],*self.coordinates[1], outline=self.color, width=self.width, fill=self.fill)]
+            self.tk_painting = [self.canvas.create_oval(*corners, outline=self.color, width=self.canvas.view_width(self.width), fill=self.fill, tags=self.tag)]
         elif self.shape.value == Shape.RECT.value:
-            self.tk_painting = [self.canvas.create_rectangle( *self.coordinates[0],*self.coordinates[1], outline=self.color, width=self.width, fill=self.fill)]
+            self.tk_painting = [self.canvas.create_rectangle(*corners, outline=self.color, width=self.canvas.view_width(self.width), fill=self.fill, tags=self.tag)]
+        self.geometry_changed()
+    
+    def intersects_rect(self, rect: Rect) -> bool:
+        if len(self.coordinates) < 2:
+            return super().intersects_rect(rect)
+        # an unfilled shape is only selected by its outline
+        if self.shape.value == Shape.OVAL.value:
+            return oval_intersects_rect(self.coordinates[0], self.coordinates[1], 
+                                        expand_rect(rect, self.width / 2), 
+                                        filled=bool(self.fill))
+        x1, y1, x2, y2 = normalize_rect((*self.coordinates[0], *self.coordinates[1]))
+        return polygon_intersects_rect([(x1, y1), (x2, y1), (x2, y2), (x1, y2)], 
+                                       expand_rect(rect, self.width / 2), 
+                                       filled=bool(self.fill))
     
     def __copy__(self) -> Stroke:
         stroke =  ShapeStroke(self.coordinates[0][0], self.coordinates[0][1], color=self.color, width=self.width, canvas=self.canvas, shape=self.shape, fill=self.fill,)
@@ -110,7 +285,7 @@ class ShapeStroke(Stroke):
 class TextStroke(Stroke):
     """a text stroke
     """
-    def __init__(self, x: int, y: int, color: str, width: int, canvas: tk.Canvas,font:str, font_size:int, bold:bool, italic:bool, text:str = "") -> None:
+    def __init__(self, x: int, y: int, color: str, width: int, canvas: DocumentCanvas,font:str, font_size:int, bold:bool, italic:bool, text:str = "") -> None:
         super().__init__(x, y, color, width, canvas)
         self.text: str = text
         self.font_size = font_size
@@ -130,35 +305,46 @@ class TextStroke(Stroke):
         
     
     def paint(self) -> None:
-        if len(self.tk_painting):
-            self.canvas.delete(self.tk_painting[0])
-        font = [self.font,self.font_size]
+        self.delete()
+        font = [self.font, self.canvas.view_font_size(self.font_size)]
         if self.bold:
             font.append("bold")
         if self.italic:
             font.append("italic")
-        self.tk_painting = [self.canvas.create_text(*self.coordinates[0], text=self.text, fill=self.color, font=font)]
-            
+        self.tk_painting = [self.canvas.create_text(*self.canvas.view(self.coordinates[:1]), text=self.text, fill=self.color, font=font, tags=self.tag)]
+        self.geometry_changed()
+    
+    def calculate_bbox(self) -> BBox:
+        # the size of the text is only known to the canvas
+        bbox = self.canvas.bbox(self.tag) if len(self.tk_painting) else None
+        if not bbox:
+            return super().calculate_bbox()
+        return self.canvas.document_bbox(bbox)
+
+    def intersects_rect(self, rect: Rect) -> bool:
+        return bboxes_overlap(self.bbox(), rect)
 
     def __copy__(self) -> Stroke:
         stroke = TextStroke(*self.coordinates[0], color=self.color, width=self.width, canvas=self.canvas, text=self.text, bold=self.bold, italic=self.italic, font=self.font, font_size=self.font_size)
         stroke.delete()
-        stroke.tk_painting = []
         return stroke
 
 class PolygonStroke(Stroke):
     """a polygon stroke
     """
-    def __init__(self, x: int, y: int, color: str, width: int, canvas: tk.Canvas,fill:str, coordinates: List[Tuple[int, int]]) -> None:
+    def __init__(self, x: int, y: int, color: str, width: int, canvas: DocumentCanvas,fill:str, coordinates: List[Tuple[int, int]]) -> None:
         super().__init__(x, y, color, width, canvas)
         self.coordinates = coordinates
         self.fill = fill
         
     
     def paint(self) -> None:
-        if len(self.tk_painting):
-            self.canvas.delete(self.tk_painting[0])
-        self.tk_painting = [self.canvas.create_polygon(*self.coordinates,fill=self.fill, width=self.width, outline=self.color)]
+        self.delete()
+        self.tk_painting = [self.canvas.create_polygon(*self.canvas.view(self.coordinates),fill=self.fill, width=self.canvas.view_width(self.width), outline=self.color, tags=self.tag)]
+        self.geometry_changed()
+    
+    def intersects_rect(self, rect: Rect) -> bool:
+        return polygon_intersects_rect(self.coordinates, expand_rect(rect, self.width / 2), filled=bool(self.fill))
     
     def __copy__(self) -> Stroke:
         stroke = PolygonStroke(*self.coordinates[0], color=self.color, width=self.width, canvas=self.canvas, fill=self.fill, coordinates=self.coordinates)
@@ -170,25 +356,23 @@ class UnfinishedPolygonStroke(Stroke):
     """an unfinished polygon - used only to create a polygon stroke.
     """
     
-    def __init__(self, x: int, y: int, color: str, width: int, canvas: tk.Canvas, fill:str) -> None:
+    def __init__(self, x: int, y: int, color: str, width: int, canvas: DocumentCanvas, fill:str) -> None:
         self.fill = fill
         super().__init__(x, y, color, width, canvas)
     
     def continue_stroke(self, x: int, y: int) -> None:
-        self.tk_painting.append(self.canvas.create_line(*self.coordinates[-1], x, y, fill=self.color, width=self.width))
+        self.tk_painting.append(self.canvas.create_line(*self.canvas.view([self.coordinates[-1], (x, y)]), fill=self.color, width=self.canvas.view_width(self.width), tags=self.tag))
         self.coordinates.append((x, y))
     
     def paint(self) -> None:
         self.delete()
-        self.tk_painting = []
             
         for i, co in enumerate(self.coordinates):
             if i != 0:
-                self.tk_painting.append(self.canvas.create_line(*self.coordinates[i-1], co[0], co[1], fill=self.color, width=self.width))
+                self.tk_painting.append(self.canvas.create_line(*self.canvas.view([self.coordinates[i-1], co]), fill=self.color, width=self.canvas.view_width(self.width), tags=self.tag))
     
     def finish(self) -> PolygonStroke:
-        for painting in self.tk_painting:
-            self.canvas.delete(painting)
+        self.delete()
         stroke = PolygonStroke(0, 0, self.color, self.width, self.canvas, self.fill, self.coordinates)
         stroke.paint()
         return stroke
@@ -203,13 +387,22 @@ class TriangleStroke(ShapeStroke):
         self.paint()
         
     
+    def vertices(self) -> List[Tuple[int, int]]:
+        """The three vertices of the triangle: the first corner, the middle of the opposite side and the third corner."""
+        return triangle_vertices(self.coordinates[0], self.coordinates[1])
+    
     def paint(self) -> None:
-        for painting in self.tk_painting:
-            self.canvas.delete(painting)
-        self.tk_painting = []
+        self.delete()
             
-        mid = (self.coordinates[0][0] + self.coordinates[1][0])//2, self.coordinates[1][1]
-        self.tk_painting = [self.canvas.create_polygon([*self.coordinates[0], *mid, self.coordinates[1][0], self.coordinates[0][1]], outline=self.color, fill=self.fill, width=self.width)]
+        self.tk_painting = [self.canvas.create_polygon(self.canvas.view(self.vertices()), outline=self.color, fill=self.fill, width=self.canvas.view_width(self.width), tags=self.tag)]
+        self.geometry_changed()
+    
+    def intersects_rect(self, rect: Rect) -> bool:
+        if len(self.coordinates) < 2:
+            return super().intersects_rect(rect)
+        A, B, C = self.vertices()
+        # an unfilled triangle is only selected by its outline
+        return triangle_intersects_rect(A, B, C, expand_rect(rect, self.width / 2), filled=bool(self.fill))
    
     def __copy__(self) -> Stroke:
         stroke = TriangleStroke(*self.coordinates[0], color=self.color, width=self.width, canvas=self.canvas, fill=self.fill, shape=Shape.TRIANGLE)
@@ -0,0 +1,107 @@
+from typing import *
+
+from spatial_index import SpatialIndex
+from z_order import ZOrder
+
+if TYPE_CHECKING:
+    from raster_cache import RasterCache
+    from stroke import Stroke
+    from viewport import Viewport
+
+
+class StrokeStore(ZOrder):
+    """The strokes on the canvas: found by id, iterated in layer order, with a spatial index kept in sync.
+
+    the raster cache and the viewport are told about every stroke that was added, removed, changed or reordered.
+
+    Attributes:
+        spatial_index (SpatialIndex): the index of the strokes in the store.
+        raster_cache (RasterCache): the image the strokes are flattened into, if the painter uses one.
+            it puts the canvas items of the strokes in their layers.
+        viewport (Viewport): the part of the document the canvas shows, if any.
+    """
+
+    def __init__(self, strokes: Iterable["Stroke"] = ()) -> None:
+        self.spatial_index = SpatialIndex()
+        self.spatial_index.on_update = self.changed
+        self.raster_cache: Union[Literal[None], "RasterCache"] = None
+        self.viewport: Union[Literal[None], "Viewport"] = None
+        super().__init__(strokes)
+
+    def changed(self, stroke: "Stroke") -> None:
+        # a stroke is changed when it is painted, it may have items again
+        self.show(stroke)
+        if self.viewport:
+            self.viewport.invalidate(stroke)
+        if self.raster_cache:
+            self.raster_cache.invalidate(stroke)
+
+    def added(self, stroke: "Stroke") -> None:
+        stroke.spatial_index = self.spatial_index
+        self.spatial_index.insert(stroke)
+        self.changed(stroke)
+
+    def removed(self, stroke: "Stroke") -> None:
+        stroke.spatial_index = None
+        self.spatial_index.remove(stroke)
+        self.changed(stroke)
+
+    def reordered(self, stroke: "Stroke") -> None:
+        self.changed(stroke)
+
+    def visible(self, stroke: "Stroke") -> bool:
+        # a flattened stroke has no items, but it is still drawn
+        if self.raster_cache and stroke in self.raster_cache.drawn:
+            return stroke in self
+        return super().visible(stroke)
+
+    def restack(self, stroke: "Stroke") -> None:
+        if self.raster_cache:
+            self.raster_cache.restack(stroke)
+        else:
+            super().restack(stroke)
+
+    def clear(self) -> None:
+        for stroke in self:
+            stroke.spatial_index = None
+        # clearing the index at once is cheaper than removing the strokes one by one
+        self.spatial_index.clear()
+        self.reset()
+        if self.viewport:
+            self.viewport.reset()
+        if self.raster_cache:
+            self.raster_cache.reset()
+
+
+class Selection():
+    """The selected strokes, in the order they were selected, with O(1) membership, adding and removing.
+
+    Attributes:
+        strokes (Dict[Stroke, None]): the selected strokes, a dict keeps the insertion order.
+    """
+
+    def __init__(self, strokes: Iterable["Stroke"] = ()) -> None:
+        self.strokes: Dict["Stroke", None] = dict.fromkeys(strokes)
+
+    def __iter__(self) -> Iterator["Stroke"]:
+        return iter(self.strokes)
+
+    def __len__(self) -> int:
+        return len(self.strokes)
+
+    def __contains__(self, stroke: object) -> bool:
+        return stroke in self.strokes
+
+    def append(self, stroke: "Stroke") -> None:
+        """Select a stroke, does nothing if it is already selected."""
+        self.strokes[stroke] = None
+
+    def remove(self, stroke: "Stroke") -> None:
+        del self.strokes[stroke]
+
+    def clear(self) -> None:
+        self.strokes.clear()
+
+    def first(self, condition: Callable[["Stroke"], bool]) -> Union[Literal[None], "Stroke"]:
+        """Find the first selected stroke that matches a condition."""
+        return next((stroke for stroke in self.strokes if condition(stroke)), None)
@@ -6,16 +6,17 @@ from PIL import Image, ImageTk
 from enums import State
 from popups.text_options import TextOptions
 from helper_funcs.validate_funcs import validate_width
-from helper_funcs.load_available_fonts import load_available_fonts
+from helper_funcs.font_catalog import font_catalog
 from components.color_btn import ColorBtn
 from components.tooltip import Tooltip
 from components.icon_button import IconButton
+from components.export_status import ExportStatus
 from popups.load_saved_file import LoadSavedFile
 
 class ToolBar(tk.Frame):
     """the toolbar - controlling drawing tools and options.
     """
-    def __init__(self, root: tk.Misc, color: tk.StringVar, fill:tk.StringVar, state: tk.StringVar, width: tk.IntVar, bold: tk.BooleanVar, italic: tk.BooleanVar, export: Dict[str, Callable], font: tk.StringVar, font_size: tk.IntVar, delete_all: Callable, save_to_json:Callable, load_json:Callable, undo:Callable, redo:Callable) -> None:
+    def __init__(self, root: tk.Misc, color: tk.StringVar, fill:tk.StringVar, state: tk.StringVar, width: tk.IntVar, bold: tk.BooleanVar, italic: tk.BooleanVar, export: Dict[str, Callable], font: tk.StringVar, font_size: tk.IntVar, delete_all: Callable, save_to_json:Callable, load_json:Callable, undo:Callable, redo:Callable, cancel_export: Callable[[], None]) -> None:
         super().__init__(root)
         self.root = root
         self.grid(row=1, column=2, padx=(10, 30), pady=(40, 30))
@@ -36,6 +37,7 @@ class ToolBar(tk.Frame):
         self.load_json = load_json
         self.undo = undo
         self.redo = redo
+        self.cancel_export = cancel_export
         
         self.create_widgets()
         
@@ -68,6 +70,7 @@ class ToolBar(tk.Frame):
 
         self.export_menu = tk.Menu(self, tearoff=0)
         self.export_menu.add_command(label="png", command=self.export["png"])
+        self.export_menu.add_command(label="png (print dpi)", command=self.export["png_dpi"])
         self.export_menu.add_command(label="svg", command=self.export["svg"])
         self.export_menu.add_command(label="eps", command=self.export["eps"])
 
@@ -80,6 +83,8 @@ class ToolBar(tk.Frame):
         
         self.export_btn = tk.Button(self, text="Export As", command=open_export_menu)
         self.export_btn.pack()
+        # packed below the other widgets while an export or save is written
+        self.export_status = ExportStatus(self, on_cancel=self.cancel_export)
         
         self.save_frame = tk.Frame(self)
         self.save_frame.pack(pady=5)
@@ -158,11 +163,7 @@ class ToolBar(tk.Frame):
         self.text_btn.pack(side=tk.LEFT, padx=5)
         
         def on_save(font:str, font_size:int, color:str, bold: bool, italic: bool) -> None:
-            fonts = load_available_fonts()
-            if font in fonts:
-                self.font.set(font)
-            else:
-                self.font.set("Arial")
+            self.font.set(font_catalog().resolve(font))
 
             self.font_size.set(font_size)
             self.color.set(color)
@@ -0,0 +1,247 @@
+from math import ceil, floor
+from typing import *
+
+from spatial_index import BBox, bboxes_overlap, union_bbox
+
+if TYPE_CHECKING:
+    from components.document_canvas import DocumentCanvas
+    from stroke import Stroke
+    from stroke_store import StrokeStore
+
+# how much one step of zooming in enlarges the view
+ZOOM_STEP = 1.25
+
+
+class Viewport():
+    """The part of the document the canvas shows: the zoom, the scrolling and the culling of the strokes out of view.
+
+    the canvas shows the document times the zoom (see DocumentCanvas), and its scrollregion covers the document
+    and every stroke in it. when culling, only the strokes whose bounding box is in view have canvas items:
+    items are created and deleted as the view moves, and a stroke that changed out of view loses its items
+    when Tk is idle. the strokes keep their coordinates, so nothing is lost by deleting their items.
+
+    Attributes:
+        canvas (DocumentCanvas): the canvas the document is shown on.
+        strokes (StrokeStore): the strokes of the document.
+        size (Tuple[int, int]): the size of the document, what is exported.
+        document (BBox): the area that can be scrolled to, in document coordinates. it is the size of the
+            document and grows to contain the strokes.
+        cull (bool): whether the strokes out of view have no canvas items, off when the raster cache flattens them anyway.
+        margin (int): how far out of the window (in canvas pixels) strokes still get items, so a short scroll creates few items.
+        shown (Set[Stroke]): the strokes that have canvas items.
+        dirty (Set[Stroke]): the strokes that changed since they were last culled.
+        moved (bool): whether the view moved since the strokes were last culled.
+        zoomed (bool): whether the zoom changed since the items were last painted.
+        on_change (Callable[[], None]): called after the view moved or zoomed, once the items of the strokes are in place.
+    """
+
+    min_zoom = 0.1
+    max_zoom = 8.0
+
+    def __init__(self, canvas: "DocumentCanvas", strokes: "StrokeStore", size: Tuple[int, int] = (640, 480),
+                 cull: bool = True, margin: int = 64) -> None:
+        self.canvas = canvas
+        self.strokes = strokes
+        self.size = size
+        self.document: BBox = (0, 0, size[0], size[1])
+        self.cull = cull
+        self.margin = margin
+        self.shown: Set["Stroke"] = set()
+        self.dirty: Set["Stroke"] = set()
+        self.moved = True
+        self.zoomed = False
+        self.updating = False
+        self.on_change: Union[Literal[None], Callable[[], None]] = None
+        self.job: Union[Literal[None], str] = None
+
+        strokes.viewport = self
+        for stroke in strokes:
+            self.invalidate(stroke)
+        canvas.bind("<Configure>", lambda event: self.view_moved(), add="+")
+        self.scroll_region()
+
+    def schedule(self) -> None:
+        if self.job is None:
+            self.job = self.canvas.after_idle(self.flush)
+
+    def invalidate(self, stroke: "Stroke") -> None:
+        """A stroke was added, removed or changed."""
+        # painting the strokes that came into view tells about them again
+        if self.updating:
+            return
+        self.dirty.add(stroke)
+        self.schedule()
+
+    def view_moved(self) -> None:
+        """The view was scrolled or resized."""
+        self.moved = True
+        self.schedule()
+
+    def reset(self) -> None:
+        """Forget all the strokes, after they were cleared."""
+        self.shown.clear()
+        self.dirty.clear()
+        self.document = (0, 0, self.size[0], self.size[1])
+        self.scroll_region()
+
+    def scroll_region(self) -> None:
+        zoom = self.canvas.zoom
+        self.canvas.configure(scrollregion=tuple(round(c * zoom) for c in self.document))
+
+    def visible(self) -> BBox:
+        """The part of the document in view, with the margin."""
+        canvas = self.canvas
+        zoom = canvas.zoom
+        x1, y1 = canvas.canvasx(0) - self.margin, canvas.canvasy(0) - self.margin
+        x2, y2 = canvas.canvasx(canvas.winfo_width()) + self.margin, canvas.canvasy(canvas.winfo_height()) + self.margin
+        return floor(x1 / zoom), floor(y1 / zoom), ceil(x2 / zoom), ceil(y2 / zoom)
+
+    def xview(self, *args: Any) -> None:
+        """Scroll horizontally, the command of the scrollbar."""
+        self.canvas.xview(*args)
+        self.view_moved()
+
+    def yview(self, *args: Any) -> None:
+        """Scroll vertically, the command of the scrollbar."""
+        self.canvas.yview(*args)
+        self.view_moved()
+
+    def scroll(self, dx: int, dy: int) -> None:
+        """Scroll by a number of steps (a tenth of the window) in each direction."""
+        if dx:
+            self.canvas.xview_scroll(dx, "units")
+        if dy:
+            self.canvas.yview_scroll(dy, "units")
+        self.view_moved()
+
+    def pan_start(self, x: int, y: int) -> None:
+        """Start dragging the view from a point of the window."""
+        self.canvas.scan_mark(x, y)
+
+    def pan(self, x: int, y: int) -> None:
+        """Drag the view so that the point pan_start got is under a point of the window."""
+        self.canvas.scan_dragto(x, y, gain=1)
+        self.view_moved()
+
+    def set_zoom(self, zoom: float, x: Union[Literal[None], int] = None, y: Union[Literal[None], int] = None) -> None:
+        """Zoom the view, keeping the point of the document under a point of the window in place.
+
+        Args:
+            zoom (float): the new zoom, limited to min_zoom and max_zoom
+            x (int, optional): the point of the window that stays in place. Default is the middle of the window.
+            y (int, optional): the point of the window that stays in place. Default is the middle of the window.
+        """
+        canvas = self.canvas
+        zoom = min(max(zoom, self.min_zoom), self.max_zoom)
+        if zoom == canvas.zoom:
+            return
+        if x is None or y is None:
+            x, y = canvas.winfo_width() // 2, canvas.winfo_height() // 2
+        document_x, document_y = canvas.canvasx(x) / canvas.zoom, canvas.canvasy(y) / canvas.zoom
+        canvas.zoom = zoom
+        self.scroll_region()
+        x1, y1, x2, y2 = (round(c * zoom) for c in self.document)
+        canvas.xview_moveto((document_x * zoom - x - x1) / max(1, x2 - x1))
+        canvas.yview_moveto((document_y * zoom - y - y1) / max(1, y2 - y1))
+        self.zoomed = True
+        self.view_moved()
+
+    def zoom_in(self, x: Union[Literal[None], int] = None, y: Union[Literal[None], int] = None) -> None:
+        self.set_zoom(self.canvas.zoom * ZOOM_STEP, x, y)
+
+    def zoom_out(self, x: Union[Literal[None], int] = None, y: Union[Literal[None], int] = None) -> None:
+        self.set_zoom(self.canvas.zoom / ZOOM_STEP, x, y)
+
+    def flush(self) -> None:
+        """Grow the document to the strokes that changed, and create or delete the items of the strokes
+        that came into view or went out of it."""
+        if self.job is not None:
+            self.canvas.after_cancel(self.job)
+            self.job = None
+        dirty, self.dirty = self.dirty, set()
+        moved, self.moved = self.moved, False
+        zoomed, self.zoomed = self.zoomed, False
+
+        document = self.document
+        for stroke in dirty:
+            if stroke in self.strokes and len(stroke.tk_painting):
+                self.shown.add(stroke)
+            else:
+                self.shown.discard(stroke)
+            if stroke in self.strokes:
+                document = cast(BBox, union_bbox([document, stroke.bbox()]))
+        if document != self.document:
+            self.document = document
+            self.scroll_region()
+
+        self.updating = True
+        try:
+            if zoomed:
+                self.repaint()
+            elif self.cull and moved:
+                self.cull_view()
+            elif self.cull:
+                self.cull_strokes(dirty)
+        finally:
+            self.updating = False
+        if (moved or zoomed) and self.on_change:
+            self.on_change()
+
+    def repaint(self) -> None:
+        """Paint the strokes again at the new zoom, bottom to top so their items are in layer order."""
+        shown = [stroke for stroke in self.shown if len(stroke.tk_painting)]
+        if self.cull:
+            for stroke in shown:
+                stroke.delete()
+            view = self.visible()
+            shown = [stroke for stroke in self.strokes.spatial_index.query(*view) if bboxes_overlap(stroke.bbox(), view)]
+        self.shown = set()
+        for stroke in self.strokes.sorted(shown):
+            stroke.delete()
+            stroke.paint()
+            if len(stroke.tk_painting):
+                self.shown.add(stroke)
+
+    def cull_view(self) -> None:
+        """Delete the items of the strokes that went out of view and paint the ones that came into it."""
+        view = self.visible()
+        in_view = self.strokes.spatial_index.query(*view)
+        for stroke in self.shown - in_view:
+            stroke.delete()
+        self.shown &= in_view
+        self.show(stroke for stroke in in_view if not len(stroke.tk_painting))
+
+    def cull_strokes(self, strokes: Set["Stroke"]) -> None:
+        """Delete or create the items of strokes that changed, depending on whether they are in view."""
+        view = self.visible()
+        entering = []
+        for stroke in strokes:
+            if stroke not in self.strokes:
+                continue
+            in_view = bboxes_overlap(stroke.bbox(), view)
+            if not in_view and len(stroke.tk_painting):
+                stroke.delete()
+                self.shown.discard(stroke)
+            elif in_view and not len(stroke.tk_painting):
+                entering.append(stroke)
+        self.show(entering)
+
+    def show(self, strokes: Iterable["Stroke"]) -> None:
+        """Paint strokes and put their items in their layer between the shown strokes."""
+        entering = set()
+        for stroke in strokes:
+            stroke.paint()
+            if len(stroke.tk_painting):
+                entering.add(stroke)
+        if not len(entering):
+            return
+        self.shown |= entering
+        below: Union[Literal[None], "Stroke"] = None
+        for stroke in self.strokes.sorted(self.shown):
+            if stroke in entering:
+                if below:
+                    self.canvas.tag_raise(stroke.tag, below.tag)
+                else:
+                    self.canvas.tag_lower(stroke.tag)
+            if len(stroke.tk_painting):
+                below = stroke
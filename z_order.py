@@ -0,0 +1,406 @@
+from bisect import bisect_left, bisect_right
+from typing import *
+
+if TYPE_CHECKING:
+    from stroke import Stroke
+
+
+class ZOrder():
+    """The strokes on the canvas in layer order, bottom to top.
+
+    every stroke has a fractional key (stroke.z), a stroke is moved between two others by giving it a
+    key between theirs, so reordering k strokes costs O(k log n) instead of rebuilding the whole order.
+    the canvas items are kept in the same order with tag_raise / tag_lower on the stroke tags.
+
+    the strokes are found by their id in a dict, so membership and removal are O(1). a removed stroke
+    stays in the ordered lists as a tombstone, so restoring it (undo) is O(log n). the tombstones are
+    dropped once they outnumber the strokes.
+
+    the strokes that may be drawn are kept in their own sorted lists, so finding the closest drawn stroke
+    under or over a stroke is a bisect even when most of the strokes around it are outside the view and have
+    no items. a stroke is added to them when it is added, reordered or shown (painted again), and dropped
+    when a search finds it isn't drawn.
+
+    when the keys run out of precision they are all renumbered, the keys kept outside the order (in the history)
+    are moved to the new numbering by on_renumber.
+
+    Attributes:
+        keys (List[float]): the keys of the strokes and the tombstones, sorted.
+        ordered (List[Stroke]): the strokes and the tombstones, in the same order as their keys.
+        shown_keys (List[float]): the keys of the strokes that may be drawn, sorted.
+        shown (List[Stroke]): the strokes that may be drawn, in the same order as their keys.
+        by_id (Dict[int, Stroke]): the strokes in the order, by their id.
+        dead (int): the number of tombstones in the ordered lists.
+        renumbers (int): how many times the keys were renumbered.
+        on_renumber (Callable[[Callable[[float], float]], None]): called when the keys are renumbered, before
+            the strokes get their new keys, with a function that maps an old key to the new numbering.
+    """
+
+    compact_threshold = 64
+
+    def __init__(self, strokes: Iterable["Stroke"] = ()) -> None:
+        self.keys: List[float] = []
+        self.ordered: List["Stroke"] = []
+        self.shown_keys: List[float] = []
+        self.shown: List["Stroke"] = []
+        self.by_id: Dict[int, "Stroke"] = {}
+        self.dead = 0
+        self.renumbers = 0
+        self.on_renumber: Union[Literal[None], Callable[[Callable[[float], float]], None]] = None
+        for stroke in strokes:
+            self.append(stroke)
+
+    def __iter__(self) -> Iterator["Stroke"]:
+        by_id = self.by_id
+        return (stroke for stroke in self.ordered if by_id.get(stroke.id) is stroke)
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def __contains__(self, stroke: object) -> bool:
+        return self.by_id.get(getattr(stroke, "id", None)) is stroke
+
+    def get(self, stroke_id: int) -> Union[Literal[None], "Stroke"]:
+        """Find a stroke by its id. O(1)."""
+        return self.by_id.get(stroke_id)
+
+    def added(self, stroke: "Stroke") -> None:
+        """Called after a stroke is added."""
+        pass
+
+    def removed(self, stroke: "Stroke") -> None:
+        """Called after a stroke is removed."""
+        pass
+
+    def reordered(self, stroke: "Stroke") -> None:
+        """Called after a stroke got a new key."""
+        pass
+
+    def position(self, stroke: "Stroke") -> int:
+        """Find the position of a stroke (or its tombstone) in the ordered lists. O(log n)."""
+        i = bisect_left(self.keys, stroke.z)
+        if i == len(self.ordered) or self.ordered[i] is not stroke:
+            raise ValueError("stroke is not in the z order")
+        return i
+
+    def visible(self, stroke: "Stroke") -> bool:
+        """Check if a stroke is in the order and has items on the canvas."""
+        return stroke in self and len(stroke.tk_painting) > 0
+
+    def show(self, stroke: "Stroke") -> None:
+        """Let the order know a stroke may be drawn now (it was painted), so the searches find it. O(log n)."""
+        if stroke not in self:
+            return
+        i = bisect_left(self.shown_keys, stroke.z)
+        if i < len(self.shown) and self.shown[i] is stroke:
+            return
+        self.shown_keys.insert(i, stroke.z)
+        self.shown.insert(i, stroke)
+
+    def unshow(self, stroke: "Stroke") -> None:
+        """Drop a stroke from the strokes that may be drawn, before it is removed or gets a new key."""
+        i = bisect_left(self.shown_keys, stroke.z)
+        if i < len(self.shown) and self.shown[i] is stroke:
+            del self.shown_keys[i]
+            del self.shown[i]
+
+    def find_shown(self, i: int, step: int, skip: Container["Stroke"] = ()) -> Union[Literal[None], "Stroke"]:
+        """Find the first drawn stroke from position i of the shown lists, going up (step 1) or down (step -1).
+        the strokes passed that aren't drawn anymore are dropped from the lists.
+
+        Args:
+            i (int): the position in the shown lists to start from
+            step (int): 1 to go up, -1 to go down
+            skip (Container[Stroke], optional): strokes to pass over. Default is none.
+
+        Returns:
+            Stroke: the stroke found, None if there is none
+        """
+        j = i
+        found = None
+        while 0 <= j < len(self.shown):
+            stroke = self.shown[j]
+            if stroke not in skip and self.visible(stroke):
+                found = stroke
+                break
+            j += step
+        # the strokes passed are dropped in one go, deleting them one by one would be O(n) each
+        low, high = (i, j) if step > 0 else (j + 1, i + 1)
+        kept = [k for k in range(low, high) if self.shown[k] in skip]
+        if len(kept) < high - low:
+            self.shown_keys[low:high] = [self.shown_keys[k] for k in kept]
+            self.shown[low:high] = [self.shown[k] for k in kept]
+        return found
+
+    def key_between(self, i: int) -> float:
+        """Calculate a key for a stroke inserted at position i, between the strokes at i - 1 and i."""
+        if not len(self.keys):
+            return 0.0
+        if i == 0:
+            return self.keys[0] - 1
+        if i == len(self.keys):
+            return self.keys[-1] + 1
+        low, high = self.keys[i - 1], self.keys[i]
+        key = (low + high) / 2
+        if key == low or key == high:
+            # the keys ran out of precision here, spread them out again
+            self.renumber()
+            return i - 0.5
+        return key
+
+    def renumber(self) -> None:
+        """Give the strokes whole number keys again, keeping their order. O(n), needed very rarely."""
+        self.renumbers += 1
+        if self.on_renumber:
+            self.on_renumber(self.remap(list(self.keys)))
+        for i, stroke in enumerate(self.ordered):
+            stroke.z = float(i)
+        self.keys = [float(i) for i in range(len(self.ordered))]
+        # the new keys keep the order, the shown strokes stay sorted
+        self.shown_keys = [stroke.z for stroke in self.shown]
+
+    @staticmethod
+    def remap(keys: List[float]) -> Callable[[float], float]:
+        """Map the keys to the new numbering of renumber, the key at position i becomes i.
+
+        a key that is not in the order (a stroke moved or removed since) is placed between the same keys as
+        before, so the old keys keep their order with the new ones.
+
+        Args:
+            keys (List[float]): the sorted keys before renumbering
+
+        Returns:
+            Callable[[float], float]: the function mapping an old key to a new one
+        """
+        def remap(key: float) -> float:
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                return float(i)
+            if i == 0:
+                return key - keys[0]
+            if i == len(keys):
+                return i - 1 + key - keys[-1]
+            return i - 1 + (key - keys[i - 1]) / (keys[i] - keys[i - 1])
+        return remap
+
+    def insert_at(self, i: int, stroke: "Stroke") -> None:
+        stroke.z = self.key_between(i)
+        self.keys.insert(i, stroke.z)
+        self.ordered.insert(i, stroke)
+        self.by_id[stroke.id] = stroke
+        self.show(stroke)
+        self.added(stroke)
+
+    def append(self, stroke: "Stroke") -> None:
+        """Add a stroke on top of all the others."""
+        self.insert_at(len(self.ordered), stroke)
+
+    def restore(self, stroke: "Stroke") -> None:
+        """Add a stroke back at the layer it had before it was removed (its key is kept on the stroke)."""
+        if stroke in self:
+            return
+        i = bisect_left(self.keys, stroke.z)
+        if i < len(self.ordered) and self.ordered[i] is stroke:
+            # the tombstone of the stroke is still in place
+            self.dead -= 1
+        elif i < len(self.keys) and self.keys[i] == stroke.z:
+            # the key was taken in the meantime, go just below the stroke that has it
+            self.insert_at(i, stroke)
+            return
+        else:
+            self.keys.insert(i, stroke.z)
+            self.ordered.insert(i, stroke)
+        self.by_id[stroke.id] = stroke
+        self.show(stroke)
+        self.added(stroke)
+
+    def restore_many(self, strokes: Iterable["Stroke"]) -> List["Stroke"]:
+        """Add many strokes back at their layers. O(k log n) while their tombstones are in place,
+        otherwise the strokes are merged into the order in one O(n + k log k) pass.
+
+        Args:
+            strokes (Iterable[Stroke]): the strokes to restore
+
+        Returns:
+            List[Stroke]: the restored strokes, bottom to top
+        """
+        restored = [stroke for stroke in self.sorted(strokes) if stroke not in self]
+        merged: List["Stroke"] = []
+        for stroke in restored:
+            i = bisect_left(self.keys, stroke.z)
+            if i < len(self.ordered) and self.ordered[i] is stroke:
+                self.dead -= 1
+                self.by_id[stroke.id] = stroke
+                self.show(stroke)
+                self.added(stroke)
+            else:
+                merged.append(stroke)
+        if len(merged) < self.compact_threshold:
+            for stroke in merged:
+                self.restore(stroke)
+            return restored
+
+        # on equal keys the restored stroke goes first, like in restore
+        entries = sorted([(stroke.z, 0, stroke) for stroke in merged] +
+                         [(key, 1, stroke) for key, stroke in zip(self.keys, self.ordered)],
+                         key=lambda entry: entry[:2])
+        self.keys = [key for key, _, _ in entries]
+        self.ordered = [stroke for _, _, stroke in entries]
+        if any(self.keys[i] == self.keys[i - 1] for i in range(1, len(self.keys))):
+            self.renumber()
+        for stroke in merged:
+            self.by_id[stroke.id] = stroke
+            self.show(stroke)
+            self.added(stroke)
+        return restored
+
+    def remove(self, stroke: "Stroke") -> None:
+        """Remove a stroke, it keeps its key so it can be restored to the same layer. O(1) amortized."""
+        if stroke not in self:
+            raise ValueError("stroke is not in the z order")
+        self.unshow(stroke)
+        del self.by_id[stroke.id]
+        self.dead += 1
+        self.removed(stroke)
+        if self.dead > self.compact_threshold and self.dead > len(self.by_id):
+            self.compact()
+
+    def compact(self) -> None:
+        """Drop the tombstones from the ordered lists. O(n)."""
+        by_id = self.by_id
+        live = [i for i, stroke in enumerate(self.ordered) if by_id.get(stroke.id) is stroke]
+        self.keys = [self.keys[i] for i in live]
+        self.ordered = [self.ordered[i] for i in live]
+        self.dead = 0
+
+    def clear(self) -> None:
+        for stroke in list(self):
+            self.removed(stroke)
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget all the strokes and tombstones, without calling removed."""
+        self.keys.clear()
+        self.ordered.clear()
+        self.shown_keys.clear()
+        self.shown.clear()
+        self.by_id.clear()
+        self.dead = 0
+
+    def move_to(self, stroke: "Stroke", i: int) -> None:
+        """Move a stroke so that it ends up before the stroke that is currently at position i."""
+        current = self.position(stroke)
+        self.unshow(stroke)
+        del self.keys[current]
+        del self.ordered[current]
+        if current < i:
+            i -= 1
+        stroke.z = self.key_between(i)
+        self.keys.insert(i, stroke.z)
+        self.ordered.insert(i, stroke)
+        self.show(stroke)
+        self.reordered(stroke)
+
+    def set_key(self, stroke: "Stroke", key: float) -> None:
+        """Move a stroke to the layer of a key it had before."""
+        current = self.position(stroke)
+        self.unshow(stroke)
+        del self.keys[current]
+        del self.ordered[current]
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            stroke.z = self.key_between(i)
+        else:
+            stroke.z = key
+        self.keys.insert(i, stroke.z)
+        self.ordered.insert(i, stroke)
+        self.show(stroke)
+        self.reordered(stroke)
+
+    def below(self, stroke: "Stroke") -> Union[Literal[None], "Stroke"]:
+        """Find the closest stroke under a stroke that has items on the canvas. O(log n) amortized."""
+        return self.find_shown(bisect_left(self.shown_keys, stroke.z) - 1, -1)
+
+    def restack(self, stroke: "Stroke") -> None:
+        """Put the canvas items of a stroke back in its layer, e.g. after it was repainted on top of everything."""
+        below = self.below(stroke)
+        if below:
+            stroke.canvas.tag_raise(stroke.tag, below.tag)
+        else:
+            stroke.canvas.tag_lower(stroke.tag)
+
+    def sorted(self, strokes: Iterable["Stroke"]) -> List["Stroke"]:
+        """Sort some of the strokes by layer, bottom to top. O(k log k)."""
+        return sorted(strokes, key=lambda stroke: stroke.z)
+
+    def bring_to_front(self, strokes: Iterable["Stroke"]) -> List[Tuple["Stroke", float]]:
+        """Move strokes above all the others, keeping their order between them.
+
+        Args:
+            strokes (Iterable[Stroke]): the strokes to move
+
+        Returns:
+            List[Tuple[Stroke, float]]: the moved strokes and their keys before the move
+        """
+        moved = []
+        for stroke in self.sorted(strokes):
+            moved.append((stroke, stroke.z))
+            self.move_to(stroke, len(self.ordered))
+            self.restack(stroke)
+        return moved
+
+    def send_to_back(self, strokes: Iterable["Stroke"]) -> List[Tuple["Stroke", float]]:
+        """Move strokes below all the others, keeping their order between them.
+
+        Args:
+            strokes (Iterable[Stroke]): the strokes to move
+
+        Returns:
+            List[Tuple[Stroke, float]]: the moved strokes and their keys before the move
+        """
+        moved = []
+        for stroke in reversed(self.sorted(strokes)):
+            moved.append((stroke, stroke.z))
+            self.move_to(stroke, 0)
+            self.restack(stroke)
+        return moved
+
+    def forward_one_step(self, strokes: Iterable["Stroke"]) -> List[Tuple["Stroke", float]]:
+        """Move each stroke above the closest stroke over it that isn't moved as well.
+
+        Args:
+            strokes (Iterable[Stroke]): the strokes to move
+
+        Returns:
+            List[Tuple[Stroke, float]]: the moved strokes and their keys before the move
+        """
+        moving = set(strokes)
+        moved = []
+        for stroke in reversed(self.sorted(moving)):
+            over = self.find_shown(bisect_right(self.shown_keys, stroke.z), 1, moving)
+            if not over:
+                continue
+            moved.append((stroke, stroke.z))
+            self.move_to(stroke, self.position(over) + 1)
+            self.restack(stroke)
+        return moved
+
+    def backward_one_step(self, strokes: Iterable["Stroke"]) -> List[Tuple["Stroke", float]]:
+        """Move each stroke under the closest stroke below it that isn't moved as well.
+
+        Args:
+            strokes (Iterable[Stroke]): the strokes to move
+
+        Returns:
+            List[Tuple[Stroke, float]]: the moved strokes and their keys before the move
+        """
+        moving = set(strokes)
+        moved = []
+        for stroke in self.sorted(moving):
+            under = self.find_shown(bisect_left(self.shown_keys, stroke.z) - 1, -1, moving)
+            if not under:
+                continue
+            moved.append((stroke, stroke.z))
+            self.move_to(stroke, self.position(under))
+            self.restack(stroke)
+        return moved